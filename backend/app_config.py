@@ -1,4 +1,5 @@
 import os
+import asyncio
 from typing import Dict, Any, Optional, List
 from pathlib import Path
 from pydantic_settings import BaseSettings
@@ -154,10 +155,34 @@ def create_app() -> FastAPI:
     from backend.logging_config import set_log_level
     set_log_level(settings.log_level)
 
+    @app.on_event("startup")
+    async def startup_event():
+        """预先映射扑克牌型表和麻将向听表；缺少的表在工作进程里后台生成，不阻塞启动"""
+        from backend.game_engine import mahjong_shanten, poker_eval
+        from backend.game_engine.workers import run_in_worker
+
+        async def prepare(exists, generate, load):
+            try:
+                if not exists():
+                    await run_in_worker(generate)
+                load()
+            except Exception as e:
+                logger.error(f"准备查表数据失败: {e}")
+
+        # 保留任务引用，避免后台任务被回收
+        app.state.table_tasks = [
+            asyncio.ensure_future(prepare(poker_eval.tables_exist, poker_eval.generate_tables,
+                                          poker_eval.load_tables)),
+            asyncio.ensure_future(prepare(mahjong_shanten.table_exists, mahjong_shanten.generate_table,
+                                          mahjong_shanten.load_table)),
+        ]
+
     @app.on_event("shutdown")
     def shutdown_event():
-        """应用关闭时停止配置监控"""
+        """应用关闭时停止配置监控并关闭引擎工作进程池"""
+        from backend.game_engine.workers import shutdown_workers
         observer.stop()
         observer.join()
+        shutdown_workers()
 
     return app
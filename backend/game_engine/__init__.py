@@ -1,6 +1,7 @@
 # Game engine package initialization
 from .chess_engine import ChessEngine
 from .cn_chess_engine import CNChessEngine
+from .doudizhu_engine import DouDizhuEngine
 from .go_engine import GoEngine
 from .gomoku_engine import GomokuEngine
 from .poker_engine import PokerEngine
@@ -0,0 +1,472 @@
+"""Bitboard move generation for ChessEngine.
+
+Squares are numbered ``row * 8 + col`` using the same (row, col) layout as
+``ChessEngine.board``: row 0 is black's back rank (rank 8) and row 7 is
+white's back rank (rank 1), so a FEN string can be read square by square.
+
+Moves are packed into ints: ``from | to << 6 | promotion << 12 | flag << 16``.
+"""
+import random
+from typing import Dict, List, Optional, Tuple
+
+from .zobrist import ZOBRIST_SEED, random_keys
+
+WHITE, BLACK = 0, 1
+
+# 棋子种类编号，棋子索引 = color * 6 + kind
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(6)
+PIECE_CHARS = 'PNBRQKpnbrqk'
+PIECE_INDEX = {c: i for i, c in enumerate(PIECE_CHARS)}
+PROMOTION_CHARS = {KNIGHT: 'n', BISHOP: 'b', ROOK: 'r', QUEEN: 'q'}
+PROMOTION_KINDS = {c: k for k, c in PROMOTION_CHARS.items()}
+
+# 走法标记
+FLAG_NORMAL, FLAG_DOUBLE_PUSH, FLAG_EN_PASSANT, FLAG_CASTLE = range(4)
+
+# 易位权利位
+WHITE_KING_SIDE, WHITE_QUEEN_SIDE, BLACK_KING_SIDE, BLACK_QUEEN_SIDE = 1, 2, 4, 8
+
+START_FEN = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+
+FULL = (1 << 64) - 1
+
+
+def square(row: int, col: int) -> int:
+    return row * 8 + col
+
+
+def square_to_coords(sq: int) -> Tuple[int, int]:
+    return sq >> 3, sq & 7
+
+
+def square_name(sq: int) -> str:
+    return 'abcdefgh'[sq & 7] + str(8 - (sq >> 3))
+
+
+def parse_square(name: str) -> int:
+    return square(8 - int(name[1]), 'abcdefgh'.index(name[0]))
+
+
+def encode_move(from_sq: int, to_sq: int, promotion: int = 0, flag: int = FLAG_NORMAL) -> int:
+    return from_sq | (to_sq << 6) | (promotion << 12) | (flag << 16)
+
+
+def move_from(move: int) -> int:
+    return move & 63
+
+
+def move_to(move: int) -> int:
+    return (move >> 6) & 63
+
+
+def move_promotion(move: int) -> int:
+    return (move >> 12) & 7
+
+
+def move_flag(move: int) -> int:
+    return move >> 16
+
+
+def move_key(move: int) -> Tuple[int, int, int]:
+    """Key used for legal-move lookups: (from, to, promotion kind)"""
+    return move & 63, (move >> 6) & 63, (move >> 12) & 7
+
+
+def move_to_uci(move: int) -> str:
+    promotion = move_promotion(move)
+    suffix = PROMOTION_CHARS[promotion] if promotion else ''
+    return square_name(move_from(move)) + square_name(move_to(move)) + suffix
+
+
+def _build_leaper_table(offsets) -> List[int]:
+    table = []
+    for sq in range(64):
+        row, col = square_to_coords(sq)
+        bb = 0
+        for dr, dc in offsets:
+            r, c = row + dr, col + dc
+            if 0 <= r < 8 and 0 <= c < 8:
+                bb |= 1 << square(r, c)
+        table.append(bb)
+    return table
+
+
+KNIGHT_ATTACKS = _build_leaper_table(
+    [(-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1)])
+KING_ATTACKS = _build_leaper_table(
+    [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)])
+# PAWN_ATTACKS[color][sq]: 该颜色的兵在 sq 上攻击的格子（白兵向 row 0 前进）
+PAWN_ATTACKS = [
+    _build_leaper_table([(-1, -1), (-1, 1)]),
+    _build_leaper_table([(1, -1), (1, 1)]),
+]
+
+# 滑动方向：(行增量, 列增量)。方向编号 0-3 为直线，4-7 为斜线
+DIRECTIONS = [(-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (-1, 1), (1, -1), (1, 1)]
+ORTHOGONAL = (0, 1, 2, 3)
+DIAGONAL = (4, 5, 6, 7)
+# 方向是否朝着格子编号增大的一侧，决定取最低位还是最高位作为最近阻挡
+POSITIVE = [dr > 0 or (dr == 0 and dc > 0) for dr, dc in DIRECTIONS]
+
+
+def _build_rays() -> List[List[int]]:
+    rays = []
+    for dr, dc in DIRECTIONS:
+        table = []
+        for sq in range(64):
+            row, col = square_to_coords(sq)
+            bb = 0
+            r, c = row + dr, col + dc
+            while 0 <= r < 8 and 0 <= c < 8:
+                bb |= 1 << square(r, c)
+                r, c = r + dr, c + dc
+            table.append(bb)
+        rays.append(table)
+    return rays
+
+
+RAYS = _build_rays()
+
+# 任一格子被动过后需要保留的易位权利
+CASTLING_MASK = [15] * 64
+CASTLING_MASK[square(7, 4)] = 15 & ~(WHITE_KING_SIDE | WHITE_QUEEN_SIDE)
+CASTLING_MASK[square(7, 7)] = 15 & ~WHITE_KING_SIDE
+CASTLING_MASK[square(7, 0)] = 15 & ~WHITE_QUEEN_SIDE
+CASTLING_MASK[square(0, 4)] = 15 & ~(BLACK_KING_SIDE | BLACK_QUEEN_SIDE)
+CASTLING_MASK[square(0, 7)] = 15 & ~BLACK_KING_SIDE
+CASTLING_MASK[square(0, 0)] = 15 & ~BLACK_QUEEN_SIDE
+
+# 易位时车的起止格，按王的目标格索引
+CASTLING_ROOK_MOVES = {
+    square(7, 6): (square(7, 7), square(7, 5)),
+    square(7, 2): (square(7, 0), square(7, 3)),
+    square(0, 6): (square(0, 7), square(0, 5)),
+    square(0, 2): (square(0, 0), square(0, 3)),
+}
+
+
+# Zobrist 随机数：棋子-格子、行棋方、易位权利组合、过路兵所在列
+_zobrist_rng = random.Random(ZOBRIST_SEED)
+ZOBRIST_PIECES = [random_keys(64, _zobrist_rng) for _ in range(12)]
+ZOBRIST_SIDE = _zobrist_rng.getrandbits(64)
+ZOBRIST_CASTLING = random_keys(16, _zobrist_rng)
+ZOBRIST_EP = random_keys(8, _zobrist_rng)
+
+
+def _slide(sq: int, occupied: int, directions) -> int:
+    attacks = 0
+    for d in directions:
+        ray = RAYS[d][sq]
+        blockers = ray & occupied
+        if blockers:
+            if POSITIVE[d]:
+                blocker = (blockers & -blockers).bit_length() - 1
+            else:
+                blocker = blockers.bit_length() - 1
+            ray ^= RAYS[d][blocker]
+        attacks |= ray
+    return attacks
+
+
+def rook_attacks(sq: int, occupied: int) -> int:
+    return _slide(sq, occupied, ORTHOGONAL)
+
+
+def bishop_attacks(sq: int, occupied: int) -> int:
+    return _slide(sq, occupied, DIAGONAL)
+
+
+def _iter_bits(bb: int):
+    while bb:
+        low = bb & -bb
+        yield low.bit_length() - 1
+        bb ^= low
+
+
+class Position:
+    """Bitboard position with legal move generation and make/unmake"""
+
+    def __init__(self):
+        self.pieces = [0] * 12
+        self.occupancy = [0, 0]
+        self.mailbox: List[int] = [-1] * 64
+        self.side = WHITE
+        self.castling = 0
+        self.ep_square = -1
+        self.halfmove_clock = 0
+        self.fullmove_number = 1
+        self.key = 0
+
+    @classmethod
+    def from_fen(cls, fen: str = START_FEN) -> 'Position':
+        fields = fen.split()
+        position = cls()
+        for row, rank in enumerate(fields[0].split('/')):
+            col = 0
+            for ch in rank:
+                if ch.isdigit():
+                    col += int(ch)
+                else:
+                    position._put(PIECE_INDEX[ch], square(row, col))
+                    col += 1
+        position.side = WHITE if len(fields) < 2 or fields[1] == 'w' else BLACK
+        rights = fields[2] if len(fields) > 2 else '-'
+        position.castling = (
+            (WHITE_KING_SIDE if 'K' in rights else 0) |
+            (WHITE_QUEEN_SIDE if 'Q' in rights else 0) |
+            (BLACK_KING_SIDE if 'k' in rights else 0) |
+            (BLACK_QUEEN_SIDE if 'q' in rights else 0)
+        )
+        ep = fields[3] if len(fields) > 3 else '-'
+        position.ep_square = parse_square(ep) if ep != '-' else -1
+        position.halfmove_clock = int(fields[4]) if len(fields) > 4 else 0
+        position.fullmove_number = int(fields[5]) if len(fields) > 5 else 1
+        position.key = position.compute_key()
+        return position
+
+    @classmethod
+    def from_board(cls, board: List[List[str]], side: int, castling: int,
+                   ep_square: int = -1, halfmove_clock: int = 0,
+                   fullmove_number: int = 1) -> 'Position':
+        """Build a position from ChessEngine's ``List[List[str]]`` board"""
+        position = cls()
+        for row in range(8):
+            for col in range(8):
+                ch = board[row][col]
+                if ch:
+                    position._put(PIECE_INDEX[ch], square(row, col))
+        position.side = side
+        position.castling = castling
+        position.ep_square = ep_square
+        position.halfmove_clock = halfmove_clock
+        position.fullmove_number = fullmove_number
+        position.key = position.compute_key()
+        return position
+
+    def _ep_key(self) -> int:
+        """过路兵只在行棋方确实能吃时计入哈希，避免同一局面得到不同的键"""
+        ep = self.ep_square
+        if ep >= 0 and PAWN_ATTACKS[self.side ^ 1][ep] & self.pieces[self.side * 6 + PAWN]:
+            return ZOBRIST_EP[ep & 7]
+        return 0
+
+    def compute_key(self) -> int:
+        """Zobrist key computed from scratch; make_move keeps ``key`` equal to it"""
+        key = 0
+        for sq, piece in enumerate(self.mailbox):
+            if piece >= 0:
+                key ^= ZOBRIST_PIECES[piece][sq]
+        if self.side == BLACK:
+            key ^= ZOBRIST_SIDE
+        return key ^ ZOBRIST_CASTLING[self.castling] ^ self._ep_key()
+
+    def fen(self) -> str:
+        ranks = []
+        for row in range(8):
+            rank, empty = '', 0
+            for col in range(8):
+                piece = self.mailbox[square(row, col)]
+                if piece < 0:
+                    empty += 1
+                    continue
+                if empty:
+                    rank += str(empty)
+                    empty = 0
+                rank += PIECE_CHARS[piece]
+            ranks.append(rank + (str(empty) if empty else ''))
+        rights = ''.join(ch for bit, ch in ((WHITE_KING_SIDE, 'K'), (WHITE_QUEEN_SIDE, 'Q'),
+                                            (BLACK_KING_SIDE, 'k'), (BLACK_QUEEN_SIDE, 'q'))
+                         if self.castling & bit) or '-'
+        ep = square_name(self.ep_square) if self.ep_square >= 0 else '-'
+        return (f"{'/'.join(ranks)} {'wb'[self.side]} {rights} {ep} "
+                f"{self.halfmove_clock} {self.fullmove_number}")
+
+    def to_board(self) -> List[List[str]]:
+        return [[PIECE_CHARS[p] if p >= 0 else '' for p in self.mailbox[row * 8:row * 8 + 8]]
+                for row in range(8)]
+
+    def _put(self, piece: int, sq: int) -> None:
+        bit = 1 << sq
+        self.pieces[piece] |= bit
+        self.occupancy[piece // 6] |= bit
+        self.mailbox[sq] = piece
+        self.key ^= ZOBRIST_PIECES[piece][sq]
+
+    def _remove(self, piece: int, sq: int) -> None:
+        bit = 1 << sq
+        self.pieces[piece] ^= bit
+        self.occupancy[piece // 6] ^= bit
+        self.mailbox[sq] = -1
+        self.key ^= ZOBRIST_PIECES[piece][sq]
+
+    def king_square(self, color: int) -> int:
+        king = self.pieces[color * 6 + KING]
+        return (king & -king).bit_length() - 1
+
+    def is_square_attacked(self, sq: int, by_color: int) -> bool:
+        pieces = self.pieces
+        base = by_color * 6
+        if PAWN_ATTACKS[by_color ^ 1][sq] & pieces[base + PAWN]:
+            return True
+        if KNIGHT_ATTACKS[sq] & pieces[base + KNIGHT]:
+            return True
+        if KING_ATTACKS[sq] & pieces[base + KING]:
+            return True
+        occupied = self.occupancy[0] | self.occupancy[1]
+        queens = pieces[base + QUEEN]
+        if bishop_attacks(sq, occupied) & (pieces[base + BISHOP] | queens):
+            return True
+        return bool(rook_attacks(sq, occupied) & (pieces[base + ROOK] | queens))
+
+    def in_check(self, color: Optional[int] = None) -> bool:
+        color = self.side if color is None else color
+        return self.is_square_attacked(self.king_square(color), color ^ 1)
+
+    def pseudo_legal_moves(self) -> List[int]:
+        us = self.side
+        them = us ^ 1
+        base = us * 6
+        pieces = self.pieces
+        own = self.occupancy[us]
+        enemy = self.occupancy[them]
+        occupied = own | enemy
+        empty = ~occupied & FULL
+        moves = []
+        append = moves.append
+
+        # 兵：单步、双步、吃子、吃过路兵和升变
+        forward = -8 if us == WHITE else 8
+        start_row = 6 if us == WHITE else 1
+        promotion_row = 0 if us == WHITE else 7
+        for from_sq in _iter_bits(pieces[base + PAWN]):
+            to_sq = from_sq + forward
+            targets = PAWN_ATTACKS[us][from_sq] & enemy
+            if (empty >> to_sq) & 1:
+                targets |= 1 << to_sq
+                if from_sq >> 3 == start_row and (empty >> (to_sq + forward)) & 1:
+                    append(encode_move(from_sq, to_sq + forward, 0, FLAG_DOUBLE_PUSH))
+            for to_sq in _iter_bits(targets):
+                if to_sq >> 3 == promotion_row:
+                    for kind in (QUEEN, ROOK, BISHOP, KNIGHT):
+                        append(encode_move(from_sq, to_sq, kind))
+                else:
+                    append(from_sq | (to_sq << 6))
+            if self.ep_square >= 0 and PAWN_ATTACKS[us][from_sq] & (1 << self.ep_square):
+                append(encode_move(from_sq, self.ep_square, 0, FLAG_EN_PASSANT))
+
+        not_own = ~own & FULL
+        for from_sq in _iter_bits(pieces[base + KNIGHT]):
+            for to_sq in _iter_bits(KNIGHT_ATTACKS[from_sq] & not_own):
+                append(from_sq | (to_sq << 6))
+        for from_sq in _iter_bits(pieces[base + BISHOP]):
+            for to_sq in _iter_bits(bishop_attacks(from_sq, occupied) & not_own):
+                append(from_sq | (to_sq << 6))
+        for from_sq in _iter_bits(pieces[base + ROOK]):
+            for to_sq in _iter_bits(rook_attacks(from_sq, occupied) & not_own):
+                append(from_sq | (to_sq << 6))
+        for from_sq in _iter_bits(pieces[base + QUEEN]):
+            attacks = rook_attacks(from_sq, occupied) | bishop_attacks(from_sq, occupied)
+            for to_sq in _iter_bits(attacks & not_own):
+                append(from_sq | (to_sq << 6))
+
+        king_sq = self.king_square(us)
+        for to_sq in _iter_bits(KING_ATTACKS[king_sq] & not_own):
+            append(king_sq | (to_sq << 6))
+
+        # 易位：路径为空，王不在将军中，且不经过被攻击的格子
+        if self.castling:
+            row = 7 if us == WHITE else 0
+            king_side, queen_side = ((WHITE_KING_SIDE, WHITE_QUEEN_SIDE) if us == WHITE
+                                     else (BLACK_KING_SIDE, BLACK_QUEEN_SIDE))
+            e, f, g = square(row, 4), square(row, 5), square(row, 6)
+            b, c, d = square(row, 1), square(row, 2), square(row, 3)
+            if (self.castling & king_side
+                    and not occupied & ((1 << f) | (1 << g))
+                    and not self.is_square_attacked(e, them)
+                    and not self.is_square_attacked(f, them)
+                    and not self.is_square_attacked(g, them)):
+                append(encode_move(e, g, 0, FLAG_CASTLE))
+            if (self.castling & queen_side
+                    and not occupied & ((1 << b) | (1 << c) | (1 << d))
+                    and not self.is_square_attacked(e, them)
+                    and not self.is_square_attacked(d, them)
+                    and not self.is_square_attacked(c, them)):
+                append(encode_move(e, c, 0, FLAG_CASTLE))
+        return moves
+
+    def legal_moves(self) -> List[int]:
+        us = self.side
+        legal = []
+        for move in self.pseudo_legal_moves():
+            undo = self.make_move(move)
+            if not self.is_square_attacked(self.king_square(us), us ^ 1):
+                legal.append(move)
+            self.unmake_move(move, undo)
+        return legal
+
+    def make_move(self, move: int) -> tuple:
+        """Play ``move`` and return the record needed by ``unmake_move``"""
+        from_sq = move & 63
+        to_sq = (move >> 6) & 63
+        promotion = (move >> 12) & 7
+        flag = move >> 16
+        us = self.side
+        piece = self.mailbox[from_sq]
+        captured = self.mailbox[to_sq]
+        undo = (captured, self.castling, self.ep_square, self.halfmove_clock, self.key)
+        self.key ^= self._ep_key() ^ ZOBRIST_CASTLING[self.castling] ^ ZOBRIST_SIDE
+
+        if flag == FLAG_EN_PASSANT:
+            captured_sq = to_sq + (8 if us == WHITE else -8)
+            self._remove(self.mailbox[captured_sq], captured_sq)
+        elif captured >= 0:
+            self._remove(captured, to_sq)
+        self._remove(piece, from_sq)
+        self._put(us * 6 + promotion if promotion else piece, to_sq)
+        if flag == FLAG_CASTLE:
+            rook_from, rook_to = CASTLING_ROOK_MOVES[to_sq]
+            rook = self.mailbox[rook_from]
+            self._remove(rook, rook_from)
+            self._put(rook, rook_to)
+
+        self.castling &= CASTLING_MASK[from_sq] & CASTLING_MASK[to_sq]
+        self.ep_square = (from_sq + to_sq) >> 1 if flag == FLAG_DOUBLE_PUSH else -1
+        if piece % 6 == PAWN or captured >= 0:
+            self.halfmove_clock = 0
+        else:
+            self.halfmove_clock += 1
+        if us == BLACK:
+            self.fullmove_number += 1
+        self.side = us ^ 1
+        self.key ^= ZOBRIST_CASTLING[self.castling] ^ self._ep_key()
+        return undo
+
+    def unmake_move(self, move: int, undo: tuple) -> None:
+        from_sq = move & 63
+        to_sq = (move >> 6) & 63
+        promotion = (move >> 12) & 7
+        flag = move >> 16
+        self.side ^= 1
+        us = self.side
+        if us == BLACK:
+            self.fullmove_number -= 1
+        captured, self.castling, self.ep_square, self.halfmove_clock, key = undo
+
+        moved = self.mailbox[to_sq]
+        self._remove(moved, to_sq)
+        self._put(us * 6 + PAWN if promotion else moved, from_sq)
+        if captured >= 0:
+            self._put(captured, to_sq)
+        if flag == FLAG_EN_PASSANT:
+            self._put((us ^ 1) * 6 + PAWN, to_sq + (8 if us == WHITE else -8))
+        elif flag == FLAG_CASTLE:
+            rook_from, rook_to = CASTLING_ROOK_MOVES[to_sq]
+            rook = self.mailbox[rook_to]
+            self._remove(rook, rook_to)
+            self._put(rook, rook_from)
+        self.key = key
+
+
+def legal_move_map(position: Position) -> Dict[Tuple[int, int, int], int]:
+    """Map (from, to, promotion) keys to packed legal moves"""
+    return {move_key(move): move for move in position.legal_moves()}
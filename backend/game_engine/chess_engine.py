@@ -2,6 +2,12 @@ from .rule_base import GameEngineBase
 from shared.protocol import GameType, PlayerColor, GameState, PlayerAction
 from typing import List, Tuple, Dict, Optional
 import enum
+from .chess_bitboard import (
+    Position, WHITE, BLACK, PROMOTION_CHARS, PROMOTION_KINDS, QUEEN,
+    WHITE_KING_SIDE, WHITE_QUEEN_SIDE, BLACK_KING_SIDE, BLACK_QUEEN_SIDE,
+    legal_move_map, square, square_to_coords,
+)
+from .zobrist import PositionCache, RepetitionTracker
 
 class PieceType(enum.Enum):
     PAWN = 'p'
@@ -12,6 +18,8 @@ class PieceType(enum.Enum):
     KING = 'k'
 
 class ChessEngine(GameEngineBase):
+    supports_undo = True
+
     def __init__(self):
         super().__init__()
         self.game_type = GameType.CHESS
@@ -25,6 +33,11 @@ class ChessEngine(GameEngineBase):
         self.en_passant_target = None
         self.halfmove_clock = 0
         self.fullmove_number = 1
+        self.position = self._build_position()
+        # 以 Zobrist 键缓存合法走法
+        self.legal_move_cache = PositionCache()
+        self.repetitions = RepetitionTracker()
+        self.repetitions.reset(self.position.key)
 
     def _create_initial_board(self) -> List[List[str]]:
         return [
@@ -48,43 +61,160 @@ class ChessEngine(GameEngineBase):
         self.en_passant_target = None
         self.halfmove_clock = 0
         self.fullmove_number = 1
+        self.position = self._build_position()
+        self.repetitions.reset(self.position.key)
+        self.journal.clear()
+        self.redo_stack.clear()
         return super().initialize_game(players)
 
-    def validate_action(self, action: Dict, state: dict) -> bool:
+    def _build_position(self) -> Position:
+        """Build the bitboard position from board, castling_rights and en_passant_target"""
+        rights = self.castling_rights
+        castling = (
+            (WHITE_KING_SIDE if rights[PlayerColor.WHITE]['king_side'] else 0) |
+            (WHITE_QUEEN_SIDE if rights[PlayerColor.WHITE]['queen_side'] else 0) |
+            (BLACK_KING_SIDE if rights[PlayerColor.BLACK]['king_side'] else 0) |
+            (BLACK_QUEEN_SIDE if rights[PlayerColor.BLACK]['queen_side'] else 0)
+        )
+        ep_square = square(*self.en_passant_target) if self.en_passant_target else -1
+        side = WHITE if self.current_player == PlayerColor.WHITE else BLACK
+        return Position.from_board(self.board, side, castling, ep_square,
+                                   self.halfmove_clock, self.fullmove_number)
+
+    def _sync_from_position(self) -> None:
+        """Mirror the bitboard position back into the public attributes"""
+        position = self.position
+        mailbox_board = position.to_board()
+        for row in range(self.board_size):
+            self.board[row][:] = mailbox_board[row]
+        self.current_player = PlayerColor.WHITE if position.side == WHITE else PlayerColor.BLACK
+        self.castling_rights = {
+            PlayerColor.WHITE: {'king_side': bool(position.castling & WHITE_KING_SIDE),
+                                'queen_side': bool(position.castling & WHITE_QUEEN_SIDE)},
+            PlayerColor.BLACK: {'king_side': bool(position.castling & BLACK_KING_SIDE),
+                                'queen_side': bool(position.castling & BLACK_QUEEN_SIDE)}
+        }
+        self.en_passant_target = square_to_coords(position.ep_square) if position.ep_square >= 0 else None
+        self.halfmove_clock = position.halfmove_clock
+        self.fullmove_number = position.fullmove_number
+
+    def load_fen(self, fen: str) -> None:
+        """Set up the board from a FEN string"""
+        self.position = Position.from_fen(fen)
+        self.repetitions.reset(self.position.key)
+        self.journal.clear()
+        self.redo_stack.clear()
+        self.board = self.position.to_board()
+        self._sync_from_position()
+
+    def fen(self) -> str:
+        return self.position.fen()
+
+    @property
+    def zobrist_key(self) -> int:
+        return self.position.key
+
+    def legal_moves(self) -> Dict[Tuple[int, int, int], int]:
+        """Legal moves of the current position, cached by Zobrist key"""
+        moves = self.legal_move_cache.get(self.position.key)
+        if moves is None:
+            moves = legal_move_map(self.position)
+            self.legal_move_cache.put(self.position.key, moves)
+        return moves
+
+    def _action_key(self, action: Dict) -> Tuple[int, int, int]:
+        """Convert a ``{'from', 'to', 'promotion'}`` action into a legal-move key"""
+        x1, y1 = action['from']
+        x2, y2 = action['to']
+        if not all(0 <= v < self.board_size for v in (x1, y1, x2, y2)):
+            raise IndexError('square out of range')
+        from_sq, to_sq = square(x1, y1), square(x2, y2)
+        promotion = action.get('promotion')
+        if promotion:
+            kind = PROMOTION_KINDS[promotion.lower()]
+        elif self.position.mailbox[from_sq] % 6 == 0 and x2 in (0, 7):
+            # 未指定升变棋子时默认升后
+            kind = QUEEN
+        else:
+            kind = 0
+        return from_sq, to_sq, kind
+
+    def validate_action(self, action: Dict, state: dict = None) -> bool:
         """Validate if action is legal"""
         if not isinstance(action, dict):
             return False
             
         try:
-            x1, y1 = action['from']
-            x2, y2 = action['to']
-            piece = self.board[x1][y1]
-            
-            if not piece:
-                return False
-                
-            # Validate piece movement rules
-            # (Implementation of chess rules would go here)
-            return True
-        except (KeyError, TypeError, IndexError):
+            return self._action_key(action) in self.legal_moves()
+        except (KeyError, TypeError, IndexError, ValueError, AttributeError):
             return False
 
+    def get_legal_actions(self, state: dict = None) -> List[Dict]:
+        """Get list of legal actions for current position"""
+        actions = []
+        for from_sq, to_sq, promotion in self.legal_moves():
+            action = {'from': square_to_coords(from_sq), 'to': square_to_coords(to_sq)}
+            if promotion:
+                action['promotion'] = PROMOTION_CHARS[promotion]
+            actions.append(action)
+        return actions
+
     def apply_move(self, action: PlayerAction) -> GameState:
-        x1, y1 = action.action_data['from']
-        x2, y2 = action.action_data['to']
-        piece = self.board[x1][y1]
-        
-        # Handle special moves (castling, en passant, promotion)
-        # Update game state
-        
-        self.board[x2][y2] = piece
-        self.board[x1][y1] = ''
-        
-        # Switch players
-        self.current_player = PlayerColor.BLACK if self.current_player == PlayerColor.WHITE else PlayerColor.WHITE
+        try:
+            move = self.legal_moves().get(self._action_key(action.action_data))
+        except (KeyError, TypeError, IndexError, ValueError, AttributeError):
+            move = None
+        if move is None:
+            raise ValueError(f"Illegal move: {action.action_data}")
+
+        self.record_move(move, self._play(move))
         
         return self.get_game_state()
 
+    def _play(self, move: int) -> tuple:
+        """Play a legal packed move and return its undo data"""
+        # 易位、吃过路兵和升变由位棋盘统一处理
+        position_undo = self.position.make_move(move)
+        self._sync_from_position()
+        if self.halfmove_clock == 0:
+            # 吃子或动兵后之前的局面不可能再出现
+            dropped_repetitions = self.repetitions.reset(self.position.key)
+        else:
+            dropped_repetitions = None
+            self.repetitions.push(self.position.key)
+        return position_undo, dropped_repetitions
+
+    def unmake_record(self, record) -> None:
+        position_undo, dropped_repetitions = record.undo
+        if dropped_repetitions is None:
+            self.repetitions.pop(self.position.key)
+        else:
+            self.repetitions.restore(dropped_repetitions)
+        self.position.unmake_move(record.action, position_undo)
+        self._sync_from_position()
+
+    def remake_record(self, record) -> tuple:
+        return self._play(record.action)
+
+    def is_threefold_repetition(self) -> bool:
+        return self.repetitions.count(self.position.key) >= 3
+
+    def is_checkmate(self) -> bool:
+        return not self.legal_moves() and self.position.in_check()
+
+    def is_stalemate(self) -> bool:
+        return not self.legal_moves() and not self.position.in_check()
+
+    def is_game_over(self) -> bool:
+        """Checkmate, stalemate, threefold repetition or the fifty-move rule"""
+        return (not self.legal_moves() or self.is_threefold_repetition()
+                or self.halfmove_clock >= 100)
+
+    def get_winner(self) -> Optional[PlayerColor]:
+        if self.is_checkmate():
+            return PlayerColor.BLACK if self.current_player == PlayerColor.WHITE else PlayerColor.WHITE
+        return None
+
     def get_game_state(self) -> GameState:
         return GameState(
             game_id=self.game_id,
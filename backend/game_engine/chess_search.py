@@ -0,0 +1,344 @@
+"""Time-budgeted alpha-beta fallback player for ChessEngine.
+
+Used when an LLM times out or keeps producing illegal moves: iterative
+deepening negamax with a Zobrist-keyed transposition table, MVV-LVA and
+killer move ordering, quiescence search on captures and a hard wall-clock
+budget. ``choose_move`` runs the search in a worker process so the event
+loop is never blocked.
+"""
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+from .chess_bitboard import (
+    Position, WHITE, PAWN, QUEEN, FLAG_EN_PASSANT,
+    PROMOTION_CHARS, move_to_uci, square_to_coords,
+)
+from .workers import run_in_worker
+
+INFINITY = 1_000_000
+MATE = 100_000
+MAX_PLY = 128
+# 每搜索这么多个节点检查一次时间
+TIME_CHECK_INTERVAL = 256
+# 工作进程返回结果的额外宽限时间（秒）
+WORKER_GRACE = 2.0
+
+PIECE_VALUES = [100, 320, 330, 500, 900, 0]
+
+# 位置分表，从白方视角按 row 0 = 第 8 横线排列；黑方棋子上下翻转后查表
+_PAWN_TABLE = [
+    0, 0, 0, 0, 0, 0, 0, 0,
+    50, 50, 50, 50, 50, 50, 50, 50,
+    10, 10, 20, 30, 30, 20, 10, 10,
+    5, 5, 10, 25, 25, 10, 5, 5,
+    0, 0, 0, 20, 20, 0, 0, 0,
+    5, -5, -10, 0, 0, -10, -5, 5,
+    5, 10, 10, -20, -20, 10, 10, 5,
+    0, 0, 0, 0, 0, 0, 0, 0,
+]
+_KNIGHT_TABLE = [
+    -50, -40, -30, -30, -30, -30, -40, -50,
+    -40, -20, 0, 0, 0, 0, -20, -40,
+    -30, 0, 10, 15, 15, 10, 0, -30,
+    -30, 5, 15, 20, 20, 15, 5, -30,
+    -30, 0, 15, 20, 20, 15, 0, -30,
+    -30, 5, 10, 15, 15, 10, 5, -30,
+    -40, -20, 0, 5, 5, 0, -20, -40,
+    -50, -40, -30, -30, -30, -30, -40, -50,
+]
+_BISHOP_TABLE = [
+    -20, -10, -10, -10, -10, -10, -10, -20,
+    -10, 0, 0, 0, 0, 0, 0, -10,
+    -10, 0, 5, 10, 10, 5, 0, -10,
+    -10, 5, 5, 10, 10, 5, 5, -10,
+    -10, 0, 10, 10, 10, 10, 0, -10,
+    -10, 10, 10, 10, 10, 10, 10, -10,
+    -10, 5, 0, 0, 0, 0, 5, -10,
+    -20, -10, -10, -10, -10, -10, -10, -20,
+]
+_ROOK_TABLE = [
+    0, 0, 0, 0, 0, 0, 0, 0,
+    5, 10, 10, 10, 10, 10, 10, 5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    0, 0, 0, 5, 5, 0, 0, 0,
+]
+_QUEEN_TABLE = [
+    -20, -10, -10, -5, -5, -10, -10, -20,
+    -10, 0, 0, 0, 0, 0, 0, -10,
+    -10, 0, 5, 5, 5, 5, 0, -10,
+    -5, 0, 5, 5, 5, 5, 0, -5,
+    0, 0, 5, 5, 5, 5, 0, -5,
+    -10, 5, 5, 5, 5, 5, 0, -10,
+    -10, 0, 5, 0, 0, 0, 0, -10,
+    -20, -10, -10, -5, -5, -10, -10, -20,
+]
+_KING_TABLE = [
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -20, -30, -30, -40, -40, -30, -30, -20,
+    -10, -20, -20, -20, -20, -20, -20, -10,
+    20, 20, 0, 0, 0, 0, 20, 20,
+    20, 30, 10, 0, 0, 10, 30, 20,
+]
+_TABLES = [_PAWN_TABLE, _KNIGHT_TABLE, _BISHOP_TABLE, _ROOK_TABLE, _QUEEN_TABLE, _KING_TABLE]
+
+# PIECE_SQUARE[piece][sq]：子力价值加位置分，白方为正、黑方为负
+PIECE_SQUARE = (
+    [[PIECE_VALUES[kind] + _TABLES[kind][sq] for sq in range(64)] for kind in range(6)] +
+    [[-(PIECE_VALUES[kind] + _TABLES[kind][sq ^ 56]) for sq in range(64)] for kind in range(6)]
+)
+
+# 置换表条目类型
+EXACT, LOWER_BOUND, UPPER_BOUND = range(3)
+
+
+class SearchTimeout(Exception):
+    """Raised inside the search when the wall-clock budget is spent"""
+
+
+@dataclass
+class SearchResult:
+    move: Optional[int]
+    score: int
+    depth: int
+    nodes: int
+    seconds: float
+
+    @property
+    def nodes_per_second(self) -> float:
+        return self.nodes / self.seconds if self.seconds > 0 else 0.0
+
+    @property
+    def uci(self) -> Optional[str]:
+        return move_to_uci(self.move) if self.move is not None else None
+
+    def to_action(self) -> Optional[Dict]:
+        """The best move as a ChessEngine action dict"""
+        if self.move is None:
+            return None
+        action = {'from': square_to_coords(self.move & 63),
+                  'to': square_to_coords((self.move >> 6) & 63)}
+        promotion = (self.move >> 12) & 7
+        if promotion:
+            action['promotion'] = PROMOTION_CHARS[promotion]
+        return action
+
+
+def evaluate(position: Position) -> int:
+    """Static evaluation in centipawns from the side to move's point of view"""
+    score = 0
+    for sq, piece in enumerate(position.mailbox):
+        if piece >= 0:
+            score += PIECE_SQUARE[piece][sq]
+    return score if position.side == WHITE else -score
+
+
+class AlphaBetaSearcher:
+    """Iterative-deepening negamax searcher with a transposition table"""
+
+    def __init__(self, tt_size: int = 1 << 18):
+        self.tt_size = tt_size
+        self.tt: Dict[int, tuple] = {}
+        self.nodes = 0
+        self.deadline = 0.0
+        self.killers: List[List[int]] = [[0, 0] for _ in range(MAX_PLY)]
+        self._path: List[int] = []
+        self._history_keys = frozenset()
+
+    def search(self, position: Position, time_limit: float = 1.0, max_depth: int = 64,
+               history_keys: Iterable[int] = ()) -> SearchResult:
+        """Search ``position`` until ``time_limit`` seconds or ``max_depth`` plies.
+
+        ``history_keys`` are Zobrist keys of earlier game positions; reaching
+        one of them again is scored as a draw.
+        """
+        start = time.perf_counter()
+        self.deadline = start + time_limit
+        self.nodes = 0
+        self.killers = [[0, 0] for _ in range(MAX_PLY)]
+        self._path = []
+        self._history_keys = frozenset(history_keys)
+        if len(self.tt) > self.tt_size:
+            self.tt.clear()
+
+        legal = position.legal_moves()
+        best = SearchResult(legal[0] if legal else None, 0, 0, 0, 0.0)
+        if len(legal) <= 1:
+            best.seconds = time.perf_counter() - start
+            return best
+
+        for depth in range(1, max_depth + 1):
+            try:
+                score = self._negamax(position, depth, -INFINITY, INFINITY, 0)
+            except SearchTimeout:
+                break
+            entry = self.tt.get(position.key)
+            if entry and entry[3]:
+                best = SearchResult(entry[3], score, depth, self.nodes, 0.0)
+            if abs(score) >= MATE - MAX_PLY:
+                break
+        best.nodes = self.nodes
+        best.seconds = time.perf_counter() - start
+        return best
+
+    def _check_time(self) -> None:
+        if time.perf_counter() > self.deadline:
+            raise SearchTimeout()
+
+    def _order(self, position: Position, moves: List[int], tt_move: int, ply: int) -> List[int]:
+        mailbox = position.mailbox
+        killers = self.killers[ply]
+        scored = []
+        for move in moves:
+            if move == tt_move:
+                score = 1 << 20
+            else:
+                victim = mailbox[(move >> 6) & 63]
+                if victim >= 0 or move >> 16 == FLAG_EN_PASSANT:
+                    # MVV-LVA：先吃价值高的子，再用价值低的子去吃
+                    victim_kind = victim % 6 if victim >= 0 else PAWN
+                    score = (1 << 16) + PIECE_VALUES[victim_kind] * 8 - mailbox[move & 63] % 6
+                elif (move >> 12) & 7:
+                    score = 1 << 15
+                elif move == killers[0]:
+                    score = 1 << 14
+                elif move == killers[1]:
+                    score = (1 << 14) - 1
+                else:
+                    score = 0
+            scored.append((score, move))
+        scored.sort(reverse=True)
+        return [move for _, move in scored]
+
+    def _negamax(self, position: Position, depth: int, alpha: int, beta: int, ply: int) -> int:
+        self.nodes += 1
+        if self.nodes % TIME_CHECK_INTERVAL == 0:
+            self._check_time()
+        key = position.key
+        if ply:
+            if position.halfmove_clock >= 100 or key in self._path or key in self._history_keys:
+                return 0
+        if depth <= 0 or ply >= MAX_PLY - 1:
+            return self._quiesce(position, alpha, beta, ply)
+
+        tt_move = 0
+        entry = self.tt.get(key)
+        if entry is not None:
+            entry_depth, entry_score, entry_flag, tt_move = entry
+            if ply and entry_depth >= depth:
+                entry_score = _score_from_tt(entry_score, ply)
+                if entry_flag == EXACT:
+                    return entry_score
+                if entry_flag == LOWER_BOUND and entry_score >= beta:
+                    return entry_score
+                if entry_flag == UPPER_BOUND and entry_score <= alpha:
+                    return entry_score
+
+        moves = position.legal_moves()
+        if not moves:
+            return -MATE + ply if position.in_check() else 0
+
+        original_alpha = alpha
+        best_score = -INFINITY
+        best_move = 0
+        self._path.append(key)
+        try:
+            for move in self._order(position, moves, tt_move, ply):
+                undo = position.make_move(move)
+                try:
+                    score = -self._negamax(position, depth - 1, -beta, -alpha, ply + 1)
+                finally:
+                    position.unmake_move(move, undo)
+                if score > best_score:
+                    best_score = score
+                    best_move = move
+                if score > alpha:
+                    alpha = score
+                if alpha >= beta:
+                    if undo[0] < 0 and not (move >> 12) & 7:
+                        killers = self.killers[ply]
+                        if killers[0] != move:
+                            killers[1] = killers[0]
+                            killers[0] = move
+                    break
+        finally:
+            self._path.pop()
+
+        if best_score <= original_alpha:
+            flag = UPPER_BOUND
+        elif best_score >= beta:
+            flag = LOWER_BOUND
+        else:
+            flag = EXACT
+        self.tt[key] = (depth, _score_to_tt(best_score, ply), flag, best_move)
+        return best_score
+
+    def _quiesce(self, position: Position, alpha: int, beta: int, ply: int) -> int:
+        self.nodes += 1
+        if self.nodes % TIME_CHECK_INTERVAL == 0:
+            self._check_time()
+        stand_pat = evaluate(position)
+        if stand_pat >= beta or ply >= MAX_PLY - 1:
+            return stand_pat
+        if stand_pat > alpha:
+            alpha = stand_pat
+
+        us = position.side
+        mailbox = position.mailbox
+        captures = [move for move in position.pseudo_legal_moves()
+                    if mailbox[(move >> 6) & 63] >= 0 or move >> 16 == FLAG_EN_PASSANT
+                    or (move >> 12) & 7 == QUEEN]
+        for move in self._order(position, captures, 0, ply):
+            undo = position.make_move(move)
+            try:
+                if position.is_square_attacked(position.king_square(us), us ^ 1):
+                    continue
+                score = -self._quiesce(position, -beta, -alpha, ply + 1)
+            finally:
+                position.unmake_move(move, undo)
+            if score >= beta:
+                return score
+            if score > alpha:
+                alpha = score
+        return alpha
+
+
+def _score_to_tt(score: int, ply: int) -> int:
+    """将杀分数按距根节点的步数换算成相对当前节点的值再存表"""
+    if score >= MATE - MAX_PLY:
+        return score + ply
+    if score <= -MATE + MAX_PLY:
+        return score - ply
+    return score
+
+
+def _score_from_tt(score: int, ply: int) -> int:
+    if score >= MATE - MAX_PLY:
+        return score - ply
+    if score <= -MATE + MAX_PLY:
+        return score + ply
+    return score
+
+
+def search_fen(fen: str, time_limit: float = 1.0, max_depth: int = 64,
+               history_keys: Iterable[int] = ()) -> SearchResult:
+    """Worker-process entry point: search the position given as FEN"""
+    return AlphaBetaSearcher().search(Position.from_fen(fen), time_limit, max_depth, history_keys)
+
+
+async def choose_move(engine, time_limit: float = 1.0, max_depth: int = 64) -> SearchResult:
+    """Pick a move for ``engine``'s side to move without blocking the event loop"""
+    history_keys = [key for key in engine.repetitions.counts if key != engine.zobrist_key]
+    result = await run_in_worker(search_fen, engine.fen(), time_limit, max_depth, history_keys,
+                                 timeout=time_limit + WORKER_GRACE)
+    engine.logger.info(
+        f"Fallback search: {result.uci} depth {result.depth} score {result.score} "
+        f"{result.nodes} nodes {result.nodes_per_second:,.0f} nps")
+    return result
@@ -1,8 +1,21 @@
 from .rule_base import GameEngineBase
-from typing import Dict, List
+from typing import Dict, List, NamedTuple, Optional, Tuple
 from shared.protocol import GameType, PlayerColor, GameState, PlayerAction
+from .xiangqi_movegen import (
+    XiangqiPosition, RED, BLACK, PIECE_CHARS, legal_move_map, square, square_to_coords,
+)
+from .zobrist import PositionCache, RepetitionTracker
+
+
+class PlyInfo(NamedTuple):
+    """Per-ply record used to judge repetitions (长将/长捉)"""
+    key: int
+    checking: bool  # 这一步是否将军
+    chased: frozenset  # 这一步新捉的对方棋子所在格
 
 class CNChessEngine(GameEngineBase):
+    supports_undo = True
+
     def __init__(self):
         super().__init__()
         self.game_type = GameType.CHINESE_CHESS
@@ -10,56 +23,194 @@ class CNChessEngine(GameEngineBase):
         self.board = self._create_initial_board()
         self.current_player = PlayerColor.WHITE
         self.river_row = 4  # River is between row 4 and 5
-        self.palace_white = [(0, 3), (0, 4), (0, 5), (1, 3), (1, 4), (1, 5)]
-        self.palace_black = [(9, 3), (9, 4), (9, 5), (8, 3), (8, 4), (8, 5)]
+        self.palace_white = [(r, c) for r in (0, 1, 2) for c in (3, 4, 5)]
+        self.palace_black = [(r, c) for r in (9, 8, 7) for c in (3, 4, 5)]
+        self.position = self._build_position()
+        # 以 Zobrist 键缓存合法走法
+        self.legal_move_cache = PositionCache()
+        self.repetitions = RepetitionTracker()
+        # 自上次吃子以来每一步的局面键、将军与捉子情况
+        self.ply_history: List[PlyInfo] = []
+        self._reset_history()
 
     def _create_initial_board(self) -> List[List[str]]:
+        # 红方（WHITE）在 0-4 行，黑方在 5-9 行
         return [
-            ['車', '馬', '象', '士', '帥', '士', '象', '馬', '車'],
+            ['俥', '傌', '相', '仕', '帥', '仕', '相', '傌', '俥'],
             ['', '', '', '', '', '', '', '', ''],
-            ['', '砲', '', '', '', '', '', '砲', ''],
+            ['', '炮', '', '', '', '', '', '炮', ''],
             ['兵', '', '兵', '', '兵', '', '兵', '', '兵'],
             ['', '', '', '', '', '', '', '', ''],
             ['', '', '', '', '', '', '', '', ''],
-            ['兵', '', '兵', '', '兵', '', '兵', '', '兵'],
+            ['卒', '', '卒', '', '卒', '', '卒', '', '卒'],
             ['', '砲', '', '', '', '', '', '砲', ''],
             ['', '', '', '', '', '', '', '', ''],
-            ['車', '馬', '象', '士', '帥', '士', '象', '馬', '車']
+            ['車', '馬', '象', '士', '將', '士', '象', '馬', '車']
         ]
 
     def initialize_game(self, players):
         self.board = self._create_initial_board()
         self.current_player = PlayerColor.WHITE
+        self.position = self._build_position()
+        self._reset_history()
         return super().initialize_game(players)
 
+    def _build_position(self) -> XiangqiPosition:
+        side = RED if self.current_player == PlayerColor.WHITE else BLACK
+        return XiangqiPosition.from_board(self.board, side)
+
+    def load_fen(self, fen: str) -> None:
+        """Set up the board from a xiangqi FEN string"""
+        self.position = XiangqiPosition.from_fen(fen)
+        self.board = self.position.to_board()
+        self.current_player = PlayerColor.WHITE if self.position.side == RED else PlayerColor.BLACK
+        self._reset_history()
+
+    def _reset_history(self) -> None:
+        self.repetitions.reset(self.position.key)
+        self.ply_history = [PlyInfo(self.position.key, self.position.in_check(), frozenset())]
+        self.journal.clear()
+        self.redo_stack.clear()
+
+    def fen(self) -> str:
+        return self.position.fen()
+
+    @property
+    def zobrist_key(self) -> int:
+        return self.position.key
+
+    def legal_moves(self) -> Dict[Tuple[int, int], int]:
+        """Legal moves of the current position, cached by Zobrist key"""
+        moves = self.legal_move_cache.get(self.position.key)
+        if moves is None:
+            moves = legal_move_map(self.position)
+            self.legal_move_cache.put(self.position.key, moves)
+        return moves
+
+    def _action_key(self, action: Dict) -> Tuple[int, int]:
+        x1, y1 = action['from']
+        x2, y2 = action['to']
+        rows, cols = self.board_size
+        if not (0 <= x1 < rows and 0 <= x2 < rows and 0 <= y1 < cols and 0 <= y2 < cols):
+            raise IndexError('square out of range')
+        return square(x1, y1), square(x2, y2)
+
+    def _lookup_move(self, action: Dict) -> Optional[int]:
+        try:
+            return self.legal_moves().get(self._action_key(action))
+        except (KeyError, TypeError, IndexError, ValueError):
+            return None
+
     def validate_move(self, action: PlayerAction) -> bool:
-        x1, y1 = action.action_data['from']
-        x2, y2 = action.action_data['to']
-        piece = self.board[x1][y1]
-        
-        if not piece:
-            return False
-            
-        # Validate piece movement rules
-        # (Implementation of Chinese chess rules would go here)
-        return True
+        return self._lookup_move(action.action_data) is not None
+
+    def get_legal_actions(self, state: dict = None) -> List[Dict]:
+        """Get list of legal actions for current position"""
+        return [{'from': square_to_coords(from_sq), 'to': square_to_coords(to_sq)}
+                for from_sq, to_sq in self.legal_moves()]
 
     def apply_move(self, action: PlayerAction) -> GameState:
-        x1, y1 = action.action_data['from']
-        x2, y2 = action.action_data['to']
-        piece = self.board[x1][y1]
-        
-        # Handle special moves (cannon capture, river crossing, palace restrictions)
-        # Update game state
-        
-        self.board[x2][y2] = piece
-        self.board[x1][y1] = ''
-        
-        # Switch players
-        self.current_player = PlayerColor.BLACK if self.current_player == PlayerColor.WHITE else PlayerColor.WHITE
-        
+        move = self._lookup_move(action.action_data)
+        if move is None:
+            raise ValueError(f"Illegal move: {action.action_data}")
+        self.record_move(move, self._play(move))
         return self.get_game_state()
 
+    def _sync_squares(self, move: int) -> None:
+        """Mirror the two squares touched by ``move`` into the list board"""
+        for sq in (move & 127, move >> 7):
+            x, y = square_to_coords(sq)
+            piece = self.position.board[sq]
+            self.board[x][y] = PIECE_CHARS[piece] if piece >= 0 else ''
+        self.current_player = PlayerColor.WHITE if self.position.side == RED else PlayerColor.BLACK
+
+    def _play(self, move: int) -> tuple:
+        """Play a legal packed move and return the data needed to take it back"""
+        position = self.position
+        from_sq, to_sq = move & 127, move >> 7
+        chased_before = position.chased_squares(from_sq)
+        # 蹩马腿、塞象眼、炮架、九宫和过河规则均由走法生成保证
+        position_undo = position.make_move(move)
+        self._sync_squares(move)
+        # 只看走动的棋子：是否将军，以及新捉了哪些子
+        info = PlyInfo(position.key, position.in_check(),
+                       position.chased_squares(to_sq) - chased_before)
+        if position_undo[0] >= 0:
+            # 吃子后之前的局面不可能再出现
+            dropped = (self.repetitions.reset(position.key), self.ply_history)
+            self.ply_history = [info]
+        else:
+            dropped = None
+            self.repetitions.push(position.key)
+            self.ply_history.append(info)
+        return position_undo, dropped
+
+    def unmake_record(self, record) -> None:
+        position_undo, dropped = record.undo
+        if dropped is None:
+            self.repetitions.pop(self.position.key)
+            self.ply_history.pop()
+        else:
+            dropped_repetitions, self.ply_history = dropped
+            self.repetitions.restore(dropped_repetitions)
+        self.position.unmake_move(record.action, position_undo)
+        self._sync_squares(record.action)
+
+    def remake_record(self, record) -> tuple:
+        return self._play(record.action)
+
+    def is_threefold_repetition(self) -> bool:
+        return self.repetitions.count(self.position.key) >= 3
+
+    def is_in_check(self) -> bool:
+        """Whether the side to move is in check (recorded when the last move was made)"""
+        return self.ply_history[-1].checking
+
+    def is_checkmate(self) -> bool:
+        return not self.legal_moves() and self.is_in_check()
+
+    def is_stalemate(self) -> bool:
+        """困毙：无子可动但未被将军，在象棋中同样判负"""
+        return not self.legal_moves() and not self.is_in_check()
+
+    def repetition_loser(self) -> Optional[PlayerColor]:
+        """Judge a threefold repetition with the Asian rules.
+
+        Within the repeated cycle, a side that checked on every move
+        (perpetual check) loses; failing that, a side that chased an
+        undefended piece on every move (perpetual chase) loses. If both or
+        neither side did so the repetition is a draw and None is returned.
+        """
+        if not self.is_threefold_repetition():
+            return None
+        history = self.ply_history
+        key = history[-1].key
+        start = next(i for i in range(len(history) - 2, -1, -1) if history[i].key == key)
+        last_mover = history[-1:start:-2]
+        other = history[-2:start:-2]
+        mover_color = PlayerColor.BLACK if self.current_player == PlayerColor.WHITE else PlayerColor.WHITE
+        for rule in (lambda ply: ply.checking, lambda ply: bool(ply.chased)):
+            mover_violates = all(rule(ply) for ply in last_mover)
+            other_violates = all(rule(ply) for ply in other)
+            if mover_violates != other_violates:
+                return mover_color if mover_violates else self.current_player
+            if mover_violates:
+                break
+        return None
+
+    def is_game_over(self) -> bool:
+        """Checkmate, stalemate or a threefold repetition"""
+        return not self.legal_moves() or self.is_threefold_repetition()
+
+    def get_winner(self) -> Optional[PlayerColor]:
+        if not self.legal_moves():
+            loser = self.current_player
+        else:
+            loser = self.repetition_loser()
+        if loser is None:
+            return None
+        return PlayerColor.BLACK if loser == PlayerColor.WHITE else PlayerColor.WHITE
+
     def get_game_state(self) -> GameState:
         return GameState(
             game_id=self.game_id,
@@ -85,9 +236,11 @@ class CNChessEngine(GameEngineBase):
             history=[]
         )
 
-    def validate_action(self, action: Dict, state: dict) -> bool:
+    def validate_action(self, action: Dict, state: dict = None) -> bool:
         """验证动作是否合法"""
-        return self.validate_move(action)
+        if not isinstance(action, dict):
+            return False
+        return self._lookup_move(action) is not None
 
     def is_healthy(self) -> bool:
         """检查引擎是否健康"""
@@ -0,0 +1,197 @@
+from .rule_base import GameEngineBase
+from shared.protocol import GameType, GameState, PlayerAction
+from typing import Dict, List, Optional
+from .doudizhu_moves import (
+    BOMB, EMPTY_HAND, RANK_NAMES, ROCKET, Hand, Play, legal_plays, match_play,
+    parse_cards, subtract, to_text,
+)
+
+HAND_SIZE = 17
+BOTTOM_SIZE = 3
+MAX_BID = 3
+
+class DouDizhuEngine(GameEngineBase):
+    def __init__(self, seed: Optional[int] = None):
+        super().__init__(seed)
+        self.game_type = GameType.DOUDIZHU
+        self.deck = self.create_deck()
+        self.hands: Dict[str, Hand] = {}  # 玩家手牌，15 格点数计数
+        self.bottom_cards: Hand = EMPTY_HAND  # 三张底牌
+        self.phase = 'bidding'  # bidding -> playing -> finished
+        self.bids: Dict[str, int] = {}
+        self.landlord: Optional[str] = None
+        self.current_turn: Optional[str] = None
+        self.last_play: Optional[Play] = None
+        self.last_player: Optional[str] = None
+        self.multiplier = 1
+        self.winner: Optional[str] = None  # 'landlord' 或 'peasants'
+
+    def create_deck(self) -> List[str]:
+        # 斗地主不分花色，3..2 各四张加大小王
+        return [rank for rank in RANK_NAMES[:13] for _ in range(4)] + ['X', 'D']
+
+    def initialize_game(self, players, seed: Optional[int] = None):
+        super().initialize_game([getattr(player, 'id', player) for player in players], seed)
+        self.deal_cards()
+        return self.get_game_state()
+
+    def deal_cards(self):
+        self.deck = self.create_deck()
+        self.rng.shuffle(self.deck)
+        self.hands = {
+            player_id: parse_cards(self.deck[i * HAND_SIZE:(i + 1) * HAND_SIZE])
+            for i, player_id in enumerate(self.players)
+        }
+        self.bottom_cards = parse_cards(self.deck[-BOTTOM_SIZE:])
+        self.phase = 'bidding'
+        self.bids = {}
+        self.landlord = None
+        self.last_play = None
+        self.last_player = None
+        self.multiplier = 1
+        self.winner = None
+        self.current_turn = self.players[0] if self.players else None
+
+    def _previous_play(self) -> Optional[Play]:
+        """要压的牌；其余两家都不要时轮到的人自由出牌"""
+        if self.last_player is None or self.last_player == self.current_turn:
+            return None
+        return self.last_play
+
+    def _next_player(self, player_id: str) -> str:
+        return self.players[(self.players.index(player_id) + 1) % len(self.players)]
+
+    def _match(self, action: PlayerAction) -> Optional[Play]:
+        """The play an action makes, or None if it is not a legal reply"""
+        hand = self.hands[action.player_id]
+        if action.action_type == 'pass':
+            counts, kind = EMPTY_HAND, None
+        else:
+            # kind 可选，用来指定同一组牌的读法（如飞机带翅膀还是更长的飞机）
+            counts = parse_cards(action.action_data.get('cards', ''))
+            kind = action.action_data.get('kind')
+        return match_play(hand, counts, self._previous_play(), kind)
+
+    def validate_action(self, action: PlayerAction, state: dict = None) -> bool:
+        if self.phase == 'finished' or action.player_id != self.current_turn:
+            return False
+        try:
+            if self.phase == 'bidding':
+                if action.action_type != 'bid':
+                    return False
+                score = int(action.action_data.get('score', 0))
+                # 叫分必须高于当前最高分，0 表示不叫
+                return score == 0 or max(self.bids.values(), default=0) < score <= MAX_BID
+            if action.action_type not in ('play', 'pass'):
+                return False
+            return self._match(action) is not None
+        except (KeyError, TypeError, ValueError, AttributeError):
+            return False
+
+    def get_legal_actions(self, state: dict = None) -> List[Dict]:
+        """Legal actions of the player to move as ``PlayerAction`` fields.
+
+        ``apply_action(PlayerAction(**action))`` plays any of them.
+        """
+        if self.phase == 'bidding':
+            highest = max(self.bids.values(), default=0)
+            return [self._action('bid', {'score': score})
+                    for score in [0] + list(range(highest + 1, MAX_BID + 1))]
+        if self.phase != 'playing':
+            return []
+        actions = []
+        for play in legal_plays(self.hands[self.current_turn], self._previous_play()):
+            if play.size:
+                actions.append(self._action('play', {'cards': str(play), 'kind': play.kind}))
+            else:
+                actions.append(self._action('pass', {}))
+        return actions
+
+    def _action(self, action_type: str, action_data: Dict) -> Dict:
+        return {'player_id': self.current_turn, 'action_type': action_type, 'action_data': action_data}
+
+    def apply_action(self, action: PlayerAction) -> GameState:
+        if not self.validate_action(action):
+            raise ValueError(f"Illegal action: {action.action_type} {action.action_data}")
+        self.log_action(action)
+        if self.phase == 'bidding':
+            self.handle_bid(action.player_id, int(action.action_data.get('score', 0)))
+        else:
+            self.handle_play(action.player_id, self._match(action))
+        return self.get_game_state()
+
+    def handle_bid(self, player_id: str, score: int):
+        self.bids[player_id] = score
+        if score < MAX_BID and len(self.bids) < len(self.players):
+            self.current_turn = self._next_player(player_id)
+            return
+        highest = max(self.bids.values())
+        if highest == 0:
+            # 无人叫分，重新发牌
+            self.deal_cards()
+            return
+        self.landlord = max(self.bids, key=self.bids.get)
+        self.multiplier = highest
+        self.hands[self.landlord] = tuple(
+            a + b for a, b in zip(self.hands[self.landlord], self.bottom_cards))
+        self.phase = 'playing'
+        self.current_turn = self.landlord
+
+    def handle_play(self, player_id: str, play: Play):
+        if play.size:
+            self.hands[player_id] = subtract(self.hands[player_id], play.counts)
+            self.last_play = play
+            self.last_player = player_id
+            if play.kind in (BOMB, ROCKET):
+                self.multiplier *= 2
+            if not any(self.hands[player_id]):
+                self.winner = 'landlord' if player_id == self.landlord else 'peasants'
+                self.phase = 'finished'
+                return
+        self.current_turn = self._next_player(player_id)
+
+    def is_game_over(self) -> bool:
+        return self.phase == 'finished'
+
+    def get_winner(self) -> Optional[str]:
+        return self.winner
+
+    def get_game_state(self) -> GameState:
+        previous = self._previous_play() if self.phase == 'playing' else None
+        return GameState(
+            game_id=self.game_id,
+            game_type=self.game_type,
+            players=self.players,
+            current_turn=self.current_turn,
+            board_state={
+                'phase': self.phase,
+                'landlord': self.landlord,
+                'bids': dict(self.bids),
+                'bottom_cards': to_text(self.bottom_cards) if self.landlord else '',
+                'hand_sizes': {player_id: sum(hand) for player_id, hand in self.hands.items()},
+                'last_play': {'player': self.last_player, 'cards': str(previous),
+                              'kind': previous.kind} if previous else None,
+                'multiplier': self.multiplier,
+            },
+            history=self.history,
+            winner=self.winner
+        )
+
+    def get_hand(self, player_id: str) -> str:
+        """玩家手牌文本，如 '3445TTJQKA2X'"""
+        return to_text(self.hands[player_id])
+
+    def initial_state(self) -> GameState:
+        """返回游戏的初始状态"""
+        return GameState(
+            game_id=self.game_id,
+            game_type=self.game_type,
+            players=self.players,
+            current_turn=self.players[0] if self.players else None,
+            board_state={'phase': 'bidding', 'landlord': None, 'bids': {}, 'bottom_cards': '',
+                         'hand_sizes': {}, 'last_play': None, 'multiplier': 1},
+            history=[]
+        )
+
+    def is_healthy(self) -> bool:
+        return True
@@ -0,0 +1,259 @@
+"""Dou Dizhu hand representation and legal-play enumeration.
+
+A hand is a 15-slot tuple of rank counts: index 0..12 are 3 4 5 6 7 8 9 T
+J Q K A 2, index 13 the black joker and 14 the red joker. Tuples are
+hashable, so everything derived from a hand is memoized on it:
+``all_plays`` decomposes a hand once into every play it can make, grouped
+by (kind, chain length) and sorted by rank. ``legal_plays`` then only
+scans the group of the play to beat, plus bombs and the rocket.
+
+Rules follow the common three-player ruleset: chains may not include 2 or
+the jokers, kickers may not reuse a rank of the main part, and the two
+jokers never appear together as kickers.
+"""
+from functools import lru_cache
+from itertools import combinations
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+Hand = Tuple[int, ...]
+
+RANK_NAMES = ['3', '4', '5', '6', '7', '8', '9', 'T', 'J', 'Q', 'K', 'A', '2', 'X', 'D']
+RANK_COUNT = 15
+TWO, BLACK_JOKER, RED_JOKER = 12, 13, 14
+CHAIN_END = TWO  # 顺子、连对、飞机最大到 A
+
+PASS = 'pass'
+SINGLE = 'single'
+PAIR = 'pair'
+TRIO = 'trio'
+TRIO_SINGLE = 'trio_single'
+TRIO_PAIR = 'trio_pair'
+STRAIGHT = 'straight'
+PAIR_CHAIN = 'pair_chain'
+AIRPLANE = 'airplane'
+AIRPLANE_SINGLES = 'airplane_singles'
+AIRPLANE_PAIRS = 'airplane_pairs'
+FOUR_TWO_SINGLES = 'four_two_singles'
+FOUR_TWO_PAIRS = 'four_two_pairs'
+BOMB = 'bomb'
+ROCKET = 'rocket'
+
+# 各连续牌型的最短长度
+MIN_CHAIN = {STRAIGHT: 5, PAIR_CHAIN: 3, AIRPLANE: 2, AIRPLANE_SINGLES: 2, AIRPLANE_PAIRS: 2}
+# 带牌的牌型
+WITH_KICKERS = {TRIO_SINGLE, TRIO_PAIR, AIRPLANE_SINGLES, AIRPLANE_PAIRS, FOUR_TWO_SINGLES, FOUR_TWO_PAIRS}
+
+EMPTY_HAND: Hand = (0,) * RANK_COUNT
+
+
+class Play(NamedTuple):
+    kind: str
+    rank: int  # 主体部分的最小点数
+    length: int  # 连续牌型的长度，其余为 1
+    counts: Hand
+
+    @property
+    def size(self) -> int:
+        return sum(self.counts)
+
+    def beats(self, previous: Optional['Play']) -> bool:
+        if self.kind == PASS:
+            return False
+        if previous is None or previous.kind == PASS:
+            return True
+        if self.kind == ROCKET:
+            return True
+        if previous.kind == ROCKET:
+            return False
+        if self.kind == BOMB:
+            return previous.kind != BOMB or self.rank > previous.rank
+        return (self.kind == previous.kind and self.length == previous.length
+                and self.rank > previous.rank)
+
+    def __str__(self) -> str:
+        return to_text(self.counts) if self.kind != PASS else PASS
+
+
+PASS_PLAY = Play(PASS, -1, 0, EMPTY_HAND)
+
+
+def parse_cards(text) -> Hand:
+    """'33344X' / ['3', '10', 'D'] -> count vector"""
+    if isinstance(text, str):
+        text = text.upper().replace('10', 'T')
+        tokens = [ch for ch in text if not ch.isspace() and ch != ',']
+    else:
+        tokens = [str(card).upper().replace('10', 'T') for card in text]
+    counts = [0] * RANK_COUNT
+    for token in tokens:
+        if token not in RANK_NAMES:
+            raise ValueError(f"Unknown card: {token}")
+        counts[RANK_NAMES.index(token)] += 1
+    return tuple(counts)
+
+
+def to_text(counts: Sequence[int]) -> str:
+    return ''.join(RANK_NAMES[rank] * count for rank, count in enumerate(counts))
+
+
+def subtract(hand: Hand, counts: Hand) -> Hand:
+    return tuple(a - b for a, b in zip(hand, counts))
+
+
+def contains(hand: Hand, counts: Hand) -> bool:
+    return all(a >= b for a, b in zip(hand, counts))
+
+
+def _counts(parts: Dict[int, int]) -> Hand:
+    counts = [0] * RANK_COUNT
+    for rank, count in parts.items():
+        counts[rank] += count
+    return tuple(counts)
+
+
+def _kicker_sets(hand: Hand, excluded: Sequence[int], number: int, width: int) -> Iterator[Dict[int, int]]:
+    """Ways to pick ``number`` kickers of ``width`` cards each (singles or pairs)"""
+    ranks = [rank for rank in range(RANK_COUNT)
+             if rank not in excluded and hand[rank] >= width and
+             (width == 1 or rank < BLACK_JOKER)]
+    if width == 2:
+        # 对子带牌：各对点数不同
+        for chosen in combinations(ranks, number):
+            yield {rank: 2 for rank in chosen}
+        return
+
+    # 单张带牌：可以重复点数，但不能同时带大小王
+    def pick(start: int, left: int, chosen: Dict[int, int]) -> Iterator[Dict[int, int]]:
+        if left == 0:
+            if not (chosen.get(BLACK_JOKER) and chosen.get(RED_JOKER)):
+                yield dict(chosen)
+            return
+        for index in range(start, len(ranks)):
+            rank = ranks[index]
+            for take in range(min(hand[rank], left), 0, -1):
+                chosen[rank] = take
+                yield from pick(index + 1, left - take, chosen)
+                del chosen[rank]
+
+    yield from pick(0, number, {})
+
+
+def _chains(hand: Hand, width: int, min_length: int) -> Iterator[Tuple[int, int]]:
+    """(start, length) of every run of ranks holding at least ``width`` cards"""
+    for start in range(CHAIN_END):
+        length = 0
+        while start + length < CHAIN_END and hand[start + length] >= width:
+            length += 1
+            if length >= min_length:
+                yield start, length
+
+
+@lru_cache(maxsize=65536)
+def all_plays(hand: Hand) -> Dict[Tuple[str, int], List[Play]]:
+    """Every play ``hand`` can make, grouped by (kind, length) and sorted by rank"""
+    plays: List[Play] = []
+    add = plays.append
+    for rank in range(RANK_COUNT):
+        count = hand[rank]
+        if count >= 1:
+            add(Play(SINGLE, rank, 1, _counts({rank: 1})))
+        if count >= 2:
+            add(Play(PAIR, rank, 1, _counts({rank: 2})))
+        if count >= 3:
+            add(Play(TRIO, rank, 1, _counts({rank: 3})))
+            for kicker in _kicker_sets(hand, [rank], 1, 1):
+                add(Play(TRIO_SINGLE, rank, 1, _counts({rank: 3, **kicker})))
+            for kicker in _kicker_sets(hand, [rank], 1, 2):
+                add(Play(TRIO_PAIR, rank, 1, _counts({rank: 3, **kicker})))
+        if count == 4:
+            add(Play(BOMB, rank, 1, _counts({rank: 4})))
+            for kicker in _kicker_sets(hand, [rank], 2, 1):
+                add(Play(FOUR_TWO_SINGLES, rank, 1, _counts({rank: 4, **kicker})))
+            for kicker in _kicker_sets(hand, [rank], 2, 2):
+                add(Play(FOUR_TWO_PAIRS, rank, 1, _counts({rank: 4, **kicker})))
+    if hand[BLACK_JOKER] and hand[RED_JOKER]:
+        add(Play(ROCKET, BLACK_JOKER, 1, _counts({BLACK_JOKER: 1, RED_JOKER: 1})))
+
+    for start, length in _chains(hand, 1, MIN_CHAIN[STRAIGHT]):
+        add(Play(STRAIGHT, start, length, _counts({start + i: 1 for i in range(length)})))
+    for start, length in _chains(hand, 2, MIN_CHAIN[PAIR_CHAIN]):
+        add(Play(PAIR_CHAIN, start, length, _counts({start + i: 2 for i in range(length)})))
+    for start, length in _chains(hand, 3, MIN_CHAIN[AIRPLANE]):
+        body = {start + i: 3 for i in range(length)}
+        add(Play(AIRPLANE, start, length, _counts(body)))
+        for kicker in _kicker_sets(hand, list(body), length, 1):
+            add(Play(AIRPLANE_SINGLES, start, length, _counts({**body, **kicker})))
+        for kicker in _kicker_sets(hand, list(body), length, 2):
+            add(Play(AIRPLANE_PAIRS, start, length, _counts({**body, **kicker})))
+
+    groups: Dict[Tuple[str, int], List[Play]] = {}
+    for play in plays:
+        groups.setdefault((play.kind, play.length), []).append(play)
+    for group in groups.values():
+        group.sort(key=lambda play: play.rank)
+    return groups
+
+
+def _reading_order(play: Play) -> Tuple[int, bool, int]:
+    """Preferred reading of a card set: longest chain, then no kickers, then highest rank"""
+    return -play.length, play.kind in WITH_KICKERS, -play.rank
+
+
+def _unique(plays: List[Play]) -> List[Play]:
+    """One play per (kind, cards), keeping the highest-ranked reading.
+
+    The same cards can form one kind at two ranks, e.g. 444555666777 as the
+    trios 444-666 with 777 as kickers or 555-777 with 444.
+    """
+    unique: Dict[Tuple[str, Hand], Play] = {}
+    for play in plays:
+        key = (play.kind, play.counts)
+        if key not in unique or play.rank > unique[key].rank:
+            unique[key] = play
+    return list(unique.values())
+
+
+def legal_plays(hand: Hand, previous: Optional[Play] = None) -> List[Play]:
+    """Plays from ``hand`` that beat ``previous`` (None/pass means a free lead)"""
+    groups = all_plays(hand)
+    if previous is None or previous.kind == PASS:
+        return _unique([play for group in groups.values() for play in group])
+    result = []
+    if previous.kind not in (BOMB, ROCKET):
+        for play in groups.get((previous.kind, previous.length), ()):
+            if play.rank > previous.rank:
+                result.append(play)
+    for play in groups.get((BOMB, 1), ()):
+        if play.beats(previous):
+            result.append(play)
+    result.extend(groups.get((ROCKET, 1), ()))
+    result = _unique(result)
+    result.append(PASS_PLAY)
+    return result
+
+
+@lru_cache(maxsize=65536)
+def _plays_by_counts(hand: Hand) -> Dict[Hand, List[Play]]:
+    index: Dict[Hand, List[Play]] = {}
+    for group in all_plays(hand).values():
+        for play in group:
+            index.setdefault(play.counts, []).append(play)
+    for readings in index.values():
+        readings.sort(key=_reading_order)
+    return index
+
+
+def match_play(hand: Hand, counts: Hand, previous: Optional[Play] = None,
+               kind: Optional[str] = None) -> Optional[Play]:
+    """The play ``hand`` makes by putting down ``counts`` that beats ``previous``, if any.
+
+    A card set can be read several ways (e.g. 333444555666 as a four-trio
+    airplane or as three trios with kickers). ``kind`` picks the reading;
+    without it the longest chain wins, then the reading without kickers.
+    """
+    if not any(counts):
+        return PASS_PLAY if previous is not None and previous.kind != PASS else None
+    for play in _plays_by_counts(hand).get(counts, ()):
+        if (kind is None or play.kind == kind) and play.beats(previous):
+            return play
+    return None
@@ -1,18 +1,36 @@
 from .rule_base import GameEngineBase
 from shared.protocol import GameType, PlayerColor, GameState, PlayerAction
+from typing import Optional
+from .go_board import GoBoard, BLACK, WHITE
+from .go_scoring import AREA, GoScore, board_array, score_board
+
+# PlayerColor 与 GoBoard 内部颜色编码的对应关系
+STONE_COLORS = {PlayerColor.BLACK: BLACK, PlayerColor.WHITE: WHITE}
 
 class GoEngine(GameEngineBase):
     def __init__(self):
-        super().__init__(GameType.GO)
+        super().__init__()
+        self.game_type = GameType.GO
         self.board_size = 19
         self.board = [[None] * self.board_size for _ in range(self.board_size)]
+        self.go_board = GoBoard(self.board_size)
+        self.seen_positions = {self.go_board.key}  # 出现过的局面，用于全局同形禁着
+        self.current_turn = PlayerColor.BLACK
         self.komi = 6.5  # 贴目
         self.captured_stones = {PlayerColor.BLACK: 0, PlayerColor.WHITE: 0}
 
-    def initialize_game(self, players):
+    def initialize_game(self, players, seed: Optional[int] = None):
         self.board = [[None] * self.board_size for _ in range(self.board_size)]
+        self.go_board = GoBoard(self.board_size)
+        self.seen_positions = {self.go_board.key}
+        self.current_turn = PlayerColor.BLACK
         self.captured_stones = {PlayerColor.BLACK: 0, PlayerColor.WHITE: 0}
-        return super().initialize_game(players)
+        return super().initialize_game(players, seed)
+
+    def get_player_color(self, player_id: str) -> PlayerColor:
+        """先加入的玩家执黑"""
+        player_ids = [getattr(player, 'id', player) for player in self.players]
+        return PlayerColor.BLACK if player_ids.index(player_id) == 0 else PlayerColor.WHITE
 
     def validate_move(self, action: PlayerAction) -> bool:
         x, y = action.action_data['x'], action.action_data['y']
@@ -20,22 +38,63 @@ class GoEngine(GameEngineBase):
             return False
         if self.board[x][y] is not None:
             return False
-        return True
+        color = STONE_COLORS[self.get_player_color(action.player_id)]
+        point = self.go_board.point(x, y)
+        if self.go_board.is_suicide(point, color):
+            return False
+        # 打劫及全局同形：落子后的局面不能与之前出现过的任何局面相同
+        return self.go_board.key_after(point, color) not in self.seen_positions
 
     def apply_move(self, action: PlayerAction) -> GameState:
         x, y = action.action_data['x'], action.action_data['y']
         color = self.get_player_color(action.player_id)
         self.board[x][y] = color
         self.capture_stones(x, y, color)
+        self.seen_positions.add(self.go_board.key)
+        self.current_turn = PlayerColor.WHITE if color == PlayerColor.BLACK else PlayerColor.BLACK
         return self.get_game_state()
 
     def capture_stones(self, x, y, color):
-        # 实现提子逻辑
-        pass
+        """落子并提掉没有气的对方棋链，返回被提子的坐标"""
+        captured = self.go_board.play(self.go_board.point(x, y), STONE_COLORS[color])
+        coords = [self.go_board.coords(point) for point in captured]
+        for cx, cy in coords:
+            self.board[cx][cy] = None
+        self.captured_stones[color] += len(coords)
+        return coords
+
+    def calculate_score(self, rule: str = AREA, dead_stones=None) -> GoScore:
+        """终局计分（数子法或数目法，白方加贴目）
+
+        ``dead_stones`` 为死子的布尔掩码，可由 ``go_scoring.estimate_dead_stones`` 估算。
+        """
+        prisoners = (self.captured_stones[PlayerColor.BLACK], self.captured_stones[PlayerColor.WHITE])
+        return score_board(board_array(self.go_board), self.komi, rule, prisoners, dead_stones)
+
+    def validate_action(self, action: PlayerAction, state: dict = None) -> bool:
+        """验证动作是否合法"""
+        try:
+            return self.validate_move(action)
+        except (KeyError, TypeError, ValueError, AttributeError):
+            return False
 
-    def calculate_score(self):
-        # 实现终局计分逻辑
-        pass
+    def apply_action(self, action: PlayerAction) -> GameState:
+        """应用玩家动作并返回新的游戏状态"""
+        if not self.validate_action(action):
+            raise ValueError(f"Illegal move: {action.action_data}")
+        self.log_action(action)
+        return self.apply_move(action)
+
+    def initial_state(self) -> GameState:
+        """返回游戏的初始状态"""
+        return GameState(
+            game_id=self.game_id,
+            game_type=self.game_type,
+            players=self.players,
+            current_turn=PlayerColor.BLACK,
+            board_state=[[None] * self.board_size for _ in range(self.board_size)],
+            history=[]
+        )
 
     def get_game_state(self) -> GameState:
         return GameState(
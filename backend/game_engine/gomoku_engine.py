@@ -1,16 +1,41 @@
 from .rule_base import GameEngineBase
 from shared.protocol import GameType, PlayerColor, GameState, PlayerAction
+from typing import Optional
+from .gomoku_patterns import ThreatIndex
+from .renju import RenjuRules
 
 class GomokuEngine(GameEngineBase):
-    def __init__(self):
-        super().__init__(GameType.GOMOKU)
+    def __init__(self, renju: bool = False):
+        super().__init__()
+        self.game_type = GameType.GOMOKU
         self.board_size = 15
         self.board = [[None] * self.board_size for _ in range(self.board_size)]
         self.win_length = 5
+        self.renju = renju  # 连珠规则：黑方禁三三、四四、长连
+        self._reset_index()
+        self.moves = []  # 落子序列 (x, y)，黑方先行
+        self.current_turn = PlayerColor.BLACK
+        self.winner = None
 
-    def initialize_game(self, players):
+    def _reset_index(self):
+        # 连珠规则下黑方长连不算胜
+        exact_colors = (PlayerColor.BLACK,) if self.renju else ()
+        self.threat_index = ThreatIndex(self.board_size, (PlayerColor.BLACK, PlayerColor.WHITE),
+                                        self.win_length, exact_colors)
+        self.renju_rules = RenjuRules(self.threat_index, PlayerColor.BLACK) if self.renju else None
+
+    def initialize_game(self, players, seed: Optional[int] = None):
         self.board = [[None] * self.board_size for _ in range(self.board_size)]
-        return super().initialize_game(players)
+        self._reset_index()
+        self.moves = []  # 落子序列 (x, y)，黑方先行
+        self.current_turn = PlayerColor.BLACK
+        self.winner = None
+        return super().initialize_game(players, seed)
+
+    def get_player_color(self, player_id: str) -> PlayerColor:
+        """先加入的玩家执黑"""
+        player_ids = [getattr(player, 'id', player) for player in self.players]
+        return PlayerColor.BLACK if player_ids.index(player_id) == 0 else PlayerColor.WHITE
 
     def validate_move(self, action: PlayerAction) -> bool:
         x, y = action.action_data['x'], action.action_data['y']
@@ -18,50 +43,60 @@ class GomokuEngine(GameEngineBase):
             return False
         if self.board[x][y] is not None:
             return False
+        if self.renju_rules and self.get_player_color(action.player_id) == PlayerColor.BLACK:
+            return not self.renju_rules.is_forbidden(x, y)
         return True
 
     def apply_move(self, action: PlayerAction) -> GameState:
         x, y = action.action_data['x'], action.action_data['y']
         color = self.get_player_color(action.player_id)
         self.board[x][y] = color
-        
+        self.threat_index.place(x, y, color)
+        self.moves.append((x, y))
+        if self.renju_rules:
+            self.renju_rules.invalidate(x, y)
+
         if self.check_win(x, y, color):
             self.winner = color
-            
+        self.current_turn = PlayerColor.WHITE if color == PlayerColor.BLACK else PlayerColor.BLACK
         return self.get_game_state()
 
     def check_win(self, x, y, color) -> bool:
-        # 检查四个方向是否五子连珠
-        directions = [
-            (1, 0),  # 水平
-            (0, 1),  # 垂直
-            (1, 1),  # 对角线
-            (1, -1)  # 反对角线
-        ]
-        
-        for dx, dy in directions:
-            count = 1
-            # 正向检查
-            nx, ny = x + dx, y + dy
-            while 0 <= nx < self.board_size and 0 <= ny < self.board_size:
-                if self.board[nx][ny] == color:
-                    count += 1
-                    nx += dx
-                    ny += dy
-                else:
-                    break
-            # 反向检查
-            nx, ny = x - dx, y - dy
-            while 0 <= nx < self.board_size and 0 <= ny < self.board_size:
-                if self.board[nx][ny] == color:
-                    count += 1
-                    nx -= dx
-                    ny -= dy
-                else:
-                    break
-            if count >= self.win_length:
-                return True
-        return False
+        # 五连由棋型索引在落子时增量维护
+        return self.threat_index.has_five(color)
+
+    def must_block(self, color: PlayerColor):
+        """对方下一手即可成五的点，color 必须先占"""
+        return self.threat_index.must_block(color)
+
+    def list_threats(self, color: PlayerColor = None):
+        """当前的五连、活四、冲四、活三，供提示词使用"""
+        return self.threat_index.threats(color)
+
+    def validate_action(self, action: PlayerAction, state: dict = None) -> bool:
+        """验证动作是否合法"""
+        try:
+            return self.validate_move(action)
+        except (KeyError, TypeError, ValueError, AttributeError):
+            return False
+
+    def apply_action(self, action: PlayerAction) -> GameState:
+        """应用玩家动作并返回新的游戏状态"""
+        if not self.validate_action(action):
+            raise ValueError(f"Illegal move: {action.action_data}")
+        self.log_action(action)
+        return self.apply_move(action)
+
+    def initial_state(self) -> GameState:
+        """返回游戏的初始状态"""
+        return GameState(
+            game_id=self.game_id,
+            game_type=self.game_type,
+            players=self.players,
+            current_turn=PlayerColor.BLACK,
+            board_state=[[None] * self.board_size for _ in range(self.board_size)],
+            history=[]
+        )
 
     def get_game_state(self) -> GameState:
         return GameState(
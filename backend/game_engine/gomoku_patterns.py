@@ -0,0 +1,302 @@
+"""Incremental threat-pattern index for five-in-a-row games.
+
+The board is split into lines (rows, columns and both diagonals; diagonals
+shorter than ``win_length`` are skipped). For every line and colour the
+index keeps a ``LineState``: the runs of stones with their open ends, the
+empty cells that would complete five ("win cells"), the cells that would
+make a four, and the cells that would make an open four. Placing or
+removing a stone rescans only the four lines through that cell.
+
+Per-colour tallies of all line states are maintained alongside, so
+``has_five``, ``winning_moves``, ``must_block`` and ``threats`` are dict
+lookups rather than board scans. Line states are memoized by line
+contents, so taking a stone back during search is nearly free.
+"""
+from typing import Any, Dict, Hashable, Iterable, List, NamedTuple, Optional, Tuple
+
+Cell = Tuple[int, int]
+
+# 方向与 GomokuEngine.check_win 保持一致，x 为横坐标
+DIRECTIONS: Dict[Cell, str] = {
+    (1, 0): 'horizontal',
+    (0, 1): 'vertical',
+    (1, 1): 'diagonal',
+    (1, -1): 'anti-diagonal',
+}
+
+FIVE = 'five'
+OPEN_FOUR = 'open_four'
+FOUR = 'four'
+OPEN_THREE = 'open_three'
+
+
+class Run(NamedTuple):
+    start: int
+    length: int
+    open_ends: int  # 两端空位数：0 死、1 冲、2 活
+
+
+class Threat(NamedTuple):
+    kind: str
+    color: Any
+    direction: str
+    cells: Tuple[Cell, ...]  # 成五时为连子；其余为关键空位
+
+
+class LineState(NamedTuple):
+    runs: Tuple[Run, ...]
+    wins: Tuple[int, ...]
+    fours: Tuple[int, ...]
+    open_fours: Tuple[int, ...]
+    threats: Tuple[Threat, ...]
+
+
+EMPTY_LINE = LineState((), (), (), (), ())
+
+# 线状态缓存的容量上限，超出后整体清空
+LINE_CACHE_SIZE = 1 << 17
+
+
+def _win_cells(values: List[Any], color: Hashable, win_length: int,
+               exact: bool = False) -> List[int]:
+    """Empty indices where ``color`` would complete a run of ``win_length``"""
+    n = len(values)
+    left = [0] * n
+    right = [0] * n
+    for i in range(1, n):
+        if values[i - 1] == color:
+            left[i] = left[i - 1] + 1
+    for i in range(n - 2, -1, -1):
+        if values[i + 1] == color:
+            right[i] = right[i + 1] + 1
+    wins = []
+    for i in range(n):
+        if values[i] is None:
+            length = left[i] + right[i] + 1
+            if length == win_length or (length > win_length and not exact):
+                wins.append(i)
+    return wins
+
+
+def _completes(values: List[Any], index: int, color: Hashable, win_length: int,
+               exact: bool) -> bool:
+    """Whether ``color`` on empty ``index`` makes a run of ``win_length``"""
+    n = len(values)
+    length = 1
+    j = index - 1
+    while j >= 0 and values[j] == color:
+        length += 1
+        j -= 1
+    j = index + 1
+    while j < n and values[j] == color:
+        length += 1
+        j += 1
+    return length == win_length or (length > win_length and not exact)
+
+
+def scan_line(values: List[Any], color: Hashable, win_length: int = 5,
+              exact: bool = False) -> Tuple[Tuple[Run, ...], List[int], List[int], List[int]]:
+    """Runs, win cells, four-making cells and open-four-making cells of one line.
+
+    ``exact`` treats overlines as non-winning (renju rules for black).
+    """
+    n = len(values)
+    runs = []
+    i = 0
+    while i < n:
+        if values[i] != color:
+            i += 1
+            continue
+        j = i
+        while j < n and values[j] == color:
+            j += 1
+        open_ends = (i > 0 and values[i - 1] is None) + (j < n and values[j] is None)
+        runs.append(Run(i, j - i, open_ends))
+        i = j
+
+    wins = _win_cells(values, color, win_length, exact)
+    fours, open_fours = [], []
+    if not runs:
+        return tuple(runs), wins, fours, open_fours
+    stones = [run.start + k for run in runs for k in range(run.length)]
+    existing = set(wins)
+    reach = win_length - 1
+    for i in range(n):
+        if values[i] is not None or i in existing:
+            continue
+        # 只考虑附近有己方棋子的空位
+        if not any(abs(stone - i) <= reach for stone in stones):
+            continue
+        # 在 i 落子只会影响 i 附近 win_length - 1 格内的成五点
+        values[i] = color
+        new_wins = 0
+        for j in range(max(0, i - reach), min(n, i + reach + 1)):
+            if values[j] is None and j not in existing and \
+                    _completes(values, j, color, win_length, exact):
+                new_wins += 1
+        values[i] = None
+        if new_wins:
+            fours.append(i)
+            if new_wins >= 2:
+                open_fours.append(i)
+    return tuple(runs), wins, fours, open_fours
+
+
+class ThreatIndex:
+    """Per-line pattern index updated on the four lines through each move"""
+
+    def __init__(self, size: int, colors: Tuple[Hashable, Hashable], win_length: int = 5,
+                 exact_colors: Iterable[Hashable] = ()):
+        self.size = size
+        self.colors = colors
+        self.win_length = win_length
+        self.exact_colors = frozenset(exact_colors)
+        self.values: List[List[Any]] = []  # 每条线上的棋子
+        self.line_cells: List[List[Cell]] = []
+        self.line_direction: List[str] = []
+        self.cell_lines: Dict[Cell, List[Tuple[int, int]]] = {
+            (x, y): [] for x in range(size) for y in range(size)}
+        for (dx, dy), name in DIRECTIONS.items():
+            for start in self._line_starts(dx, dy):
+                cells = []
+                x, y = start
+                while 0 <= x < size and 0 <= y < size:
+                    cells.append((x, y))
+                    x, y = x + dx, y + dy
+                if len(cells) < win_length:
+                    continue
+                line_id = len(self.line_cells)
+                self.line_cells.append(cells)
+                self.line_direction.append(name)
+                self.values.append([None] * len(cells))
+                for position, cell in enumerate(cells):
+                    self.cell_lines[cell].append((line_id, position))
+
+        self.states: Dict[Tuple[int, Hashable], LineState] = {}
+        # 各颜色的汇总计数，随线状态增量维护
+        self.kind_counts: Dict[Hashable, Dict[str, int]] = {color: {} for color in colors}
+        self.win_cells: Dict[Hashable, Dict[Cell, int]] = {color: {} for color in colors}
+        self.four_cells: Dict[Hashable, Dict[Cell, int]] = {color: {} for color in colors}
+        self.open_four_cells: Dict[Hashable, Dict[Cell, int]] = {color: {} for color in colors}
+        self.line_threats: Dict[Hashable, Dict[int, Tuple[Threat, ...]]] = {color: {} for color in colors}
+        self.line_cache: Dict[tuple, LineState] = {}
+
+    def _line_starts(self, dx: int, dy: int) -> List[Cell]:
+        size = self.size
+        if (dx, dy) == (1, 0):
+            return [(0, y) for y in range(size)]
+        if (dx, dy) == (0, 1):
+            return [(x, 0) for x in range(size)]
+        if (dx, dy) == (1, 1):
+            return [(0, y) for y in range(size)] + [(x, 0) for x in range(1, size)]
+        return [(0, y) for y in range(size)] + [(x, size - 1) for x in range(1, size)]
+
+    def opponent(self, color: Hashable) -> Hashable:
+        return self.colors[1] if color == self.colors[0] else self.colors[0]
+
+    def place(self, x: int, y: int, color: Hashable) -> None:
+        self._set((x, y), color)
+
+    def remove(self, x: int, y: int) -> None:
+        self._set((x, y), None)
+
+    def _set(self, cell: Cell, value: Optional[Hashable]) -> None:
+        for line_id, position in self.cell_lines[cell]:
+            self.values[line_id][position] = value
+            for color in self.colors:
+                self._rescan(line_id, color)
+
+    def _rescan(self, line_id: int, color: Hashable) -> None:
+        values = self.values[line_id]
+        cells = self.line_cells[line_id]
+        cache_key = (line_id, color, tuple(values))
+        state = self.line_cache.get(cache_key)
+        if state is None:
+            runs, wins, fours, open_fours = scan_line(
+                values, color, self.win_length, color in self.exact_colors)
+            threats = self._threats(line_id, color, runs, wins, open_fours)
+            state = LineState(runs, tuple(wins), tuple(fours), tuple(open_fours), threats)
+            if len(self.line_cache) >= LINE_CACHE_SIZE:
+                self.line_cache.clear()
+            self.line_cache[cache_key] = state
+        old = self.states.get((line_id, color), EMPTY_LINE)
+        if old is state or old == state:
+            return
+        self.states[(line_id, color)] = state
+
+        self._tally(self.win_cells[color], [cells[i] for i in old.wins], -1)
+        self._tally(self.win_cells[color], [cells[i] for i in state.wins], 1)
+        self._tally(self.four_cells[color], [cells[i] for i in old.fours], -1)
+        self._tally(self.four_cells[color], [cells[i] for i in state.fours], 1)
+        self._tally(self.open_four_cells[color], [cells[i] for i in old.open_fours], -1)
+        self._tally(self.open_four_cells[color], [cells[i] for i in state.open_fours], 1)
+        self._tally(self.kind_counts[color], [threat.kind for threat in old.threats], -1)
+        self._tally(self.kind_counts[color], [threat.kind for threat in state.threats], 1)
+        if state.threats:
+            self.line_threats[color][line_id] = state.threats
+        else:
+            self.line_threats[color].pop(line_id, None)
+
+    @staticmethod
+    def _tally(counts: Dict[Any, int], keys: Iterable[Any], delta: int) -> None:
+        for key in keys:
+            value = counts.get(key, 0) + delta
+            if value:
+                counts[key] = value
+            else:
+                del counts[key]
+
+    def _threats(self, line_id: int, color: Hashable, runs: Tuple[Run, ...],
+                 wins: List[int], open_fours: List[int]) -> Tuple[Threat, ...]:
+        cells = self.line_cells[line_id]
+        direction = self.line_direction[line_id]
+        exact = color in self.exact_colors
+        threats = []
+        covered = set()
+        for run in runs:
+            if run.length == self.win_length or (run.length > self.win_length and not exact):
+                stones = tuple(cells[run.start:run.start + run.length])
+                threats.append(Threat(FIVE, color, direction, stones))
+            elif run.length == self.win_length - 1:
+                ends = (run.start - 1, run.start + run.length)
+                if all(end in wins for end in ends):
+                    covered.update(ends)
+                    threats.append(Threat(OPEN_FOUR, color, direction, tuple(cells[end] for end in ends)))
+        for win in wins:
+            if win not in covered:
+                threats.append(Threat(FOUR, color, direction, (cells[win],)))
+        # 相距不超过 win_length - 1 的活四点归为同一个活三
+        group: List[int] = []
+        for index in open_fours:
+            if group and index - group[-1] >= self.win_length:
+                threats.append(Threat(OPEN_THREE, color, direction, tuple(cells[i] for i in group)))
+                group = []
+            group.append(index)
+        if group:
+            threats.append(Threat(OPEN_THREE, color, direction, tuple(cells[i] for i in group)))
+        return tuple(threats)
+
+    def has_five(self, color: Hashable) -> bool:
+        return self.kind_counts[color].get(FIVE, 0) > 0
+
+    def count(self, color: Hashable, kind: str) -> int:
+        return self.kind_counts[color].get(kind, 0)
+
+    def winning_moves(self, color: Hashable) -> List[Cell]:
+        """Empty cells where ``color`` completes five immediately"""
+        return list(self.win_cells[color])
+
+    def must_block(self, color: Hashable) -> List[Cell]:
+        """Cells ``color`` has to occupy to stop the opponent's immediate win"""
+        return list(self.win_cells[self.opponent(color)])
+
+    def threats(self, color: Optional[Hashable] = None) -> List[Threat]:
+        colors = self.colors if color is None else (color,)
+        return [threat for c in colors for line in self.line_threats[c].values() for threat in line]
+
+    def line_state(self, x: int, y: int, direction: str, color: Hashable) -> LineState:
+        """The pattern state of the line through ``(x, y)`` in ``direction``"""
+        for line_id, _ in self.cell_lines[(x, y)]:
+            if self.line_direction[line_id] == direction:
+                return self.states.get((line_id, color), EMPTY_LINE)
+        return EMPTY_LINE
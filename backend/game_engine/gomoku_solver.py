@@ -0,0 +1,429 @@
+"""Threat-space search (VCF / VCT) for GomokuEngine positions.
+
+An AND/OR search where the attacker only plays threats: fours (VCF,
+victory by continuous fours) or fours and open threes (VCT). The defender
+answers a four with its single blocking cell, and an open three with every
+cell on the threatened lines plus its own counter-fours. Threat cells come
+straight from the ``ThreatIndex``, so each node costs a couple of line
+rescans; three-making cells are computed per line on demand and memoized
+by line contents. Proven results are kept in a Zobrist-keyed transposition table.
+Every call is bounded by a node budget and a wall-clock limit.
+
+The module-level functions are picklable worker entry points.
+``choose_move`` and ``annotate_game`` run them in the shared process pool
+for the LLM fallback player and for annotating finished games.
+"""
+import random
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from shared.protocol import PlayerColor
+
+from .gomoku_patterns import LINE_CACHE_SIZE, Cell, LineState, ThreatIndex, scan_line
+from .renju import RenjuRules
+from .workers import run_in_worker
+from .zobrist import ZOBRIST_SEED, random_keys
+
+BLACK, WHITE = 1, 2
+COLOR_CODES = {PlayerColor.BLACK: BLACK, PlayerColor.WHITE: WHITE}
+
+VCF = 'vcf'
+VCT = 'vct'
+
+# 每搜索这么多个节点检查一次时间
+TIME_CHECK_INTERVAL = 128
+# 工作进程返回结果的额外宽限时间（秒）
+WORKER_GRACE = 2.0
+
+MISSED_WIN = 'missed forced win'
+ALLOWED_LOSS = 'allowed forced loss'
+
+Stone = Tuple[int, int, int]  # (x, y, 颜色编码)
+
+
+class SolverTimeout(Exception):
+    """Raised inside the search when the node or time budget is spent"""
+
+
+@dataclass
+class SolveResult:
+    winning: bool
+    move: Optional[Cell]
+    kind: Optional[str]  # vcf / vct，未找到必胜时为 None
+    depth: int
+    nodes: int
+    seconds: float
+    complete: bool = True  # 预算耗尽时为 False
+
+    @property
+    def nodes_per_second(self) -> float:
+        return self.nodes / self.seconds if self.seconds > 0 else 0.0
+
+    def to_action(self) -> Optional[Dict]:
+        """The winning move as a GomokuEngine action dict"""
+        if self.move is None:
+            return None
+        return {'x': self.move[0], 'y': self.move[1]}
+
+
+def _opponent(color: int) -> int:
+    return BLACK + WHITE - color
+
+
+class ThreatSpaceSolver:
+    """VCF/VCT prover with a node budget and transposition table"""
+
+    def __init__(self, size: int = 15, renju: bool = False, max_nodes: int = 200_000,
+                 tt_size: int = 1 << 18):
+        self.size = size
+        self.renju = renju
+        self.max_nodes = max_nodes
+        self.tt_size = tt_size
+        rng = random.Random(ZOBRIST_SEED + size)
+        self.zobrist = [None, random_keys(size * size, rng), random_keys(size * size, rng)]
+        self.tt: Dict[tuple, tuple] = {}
+        self.three_cache: Dict[tuple, Tuple[int, ...]] = {}
+        self.index = ThreatIndex(size, (BLACK, WHITE), 5, (BLACK,) if renju else ())
+        self.rules = RenjuRules(self.index, BLACK) if renju else None
+        self.key = 0
+        self.nodes = 0
+        self.deadline = 0.0
+        self.attacker = BLACK
+        self.defender = WHITE
+
+    def set_position(self, stones: Sequence[Stone]) -> None:
+        self.index = ThreatIndex(self.size, (BLACK, WHITE), 5, (BLACK,) if self.renju else ())
+        self.rules = RenjuRules(self.index, BLACK) if self.renju else None
+        self.key = 0
+        for x, y, color in stones:
+            self.play((x, y), color)
+
+    def play(self, cell: Cell, color: int) -> None:
+        self.index.place(cell[0], cell[1], color)
+        self.key ^= self.zobrist[color][cell[0] * self.size + cell[1]]
+        if self.rules:
+            self.rules.invalidate(*cell)
+
+    def undo(self, cell: Cell, color: int) -> None:
+        self.index.remove(*cell)
+        self.key ^= self.zobrist[color][cell[0] * self.size + cell[1]]
+        if self.rules:
+            self.rules.invalidate(*cell)
+
+    def is_forbidden(self, cell: Cell, color: int) -> bool:
+        return self.rules is not None and color == BLACK and self.rules.is_forbidden(*cell)
+
+    def solve(self, attacker: int, to_move: Optional[int] = None, time_limit: float = 1.0,
+              max_depth: int = 12, threes: bool = True) -> SolveResult:
+        """Look for a forced win for ``attacker`` (VCF first, then VCT if ``threes``).
+
+        When ``to_move`` is the defender the root is a defending node: the
+        result tells whether the attacker's last move already forces a win.
+        """
+        start = time.perf_counter()
+        self.deadline = start + time_limit
+        self.nodes = 0
+        self.attacker = attacker
+        self.defender = _opponent(attacker)
+        to_move = attacker if to_move is None else to_move
+        if len(self.tt) > self.tt_size:
+            self.tt.clear()
+
+        result = SolveResult(False, None, None, 0, 0, 0.0)
+        try:
+            result = self._deepen(to_move, max_depth, threes) or result
+        except SolverTimeout:
+            result.complete = False
+        result.nodes = self.nodes
+        result.seconds = time.perf_counter() - start
+        return result
+
+    def _deepen(self, to_move: int, max_depth: int, threes: bool) -> Optional[SolveResult]:
+        for kind in ((VCF, VCT) if threes else (VCF,)):
+            use_threes = kind == VCT
+            for depth in range(1, max_depth + 1):
+                if to_move == self.attacker:
+                    if self._attack(depth, use_threes):
+                        move = self.tt[(self.key, self.attacker, use_threes)][2]
+                        return SolveResult(True, move, kind, depth, 0, 0.0)
+                elif self._defend(depth, use_threes):
+                    return SolveResult(True, None, kind, depth, 0, 0.0)
+        return None
+
+    def _tick(self) -> None:
+        self.nodes += 1
+        if self.nodes >= self.max_nodes:
+            raise SolverTimeout()
+        if self.nodes % TIME_CHECK_INTERVAL == 0 and time.perf_counter() > self.deadline:
+            raise SolverTimeout()
+
+    def _threat_moves(self, color: int, threes: bool) -> List[Cell]:
+        index = self.index
+        fours = index.four_cells[color]
+        # 同时形成多个威胁的点排在前面
+        moves = sorted(fours, key=fours.get, reverse=True)
+        if threes:
+            open_fours = index.open_four_cells[color]
+            moves += sorted((cell for cell in open_fours if cell not in fours),
+                            key=open_fours.get, reverse=True)
+            seen = set(moves)
+            moves += [cell for cell in self._three_moves(color) if cell not in seen]
+        return [cell for cell in moves if not self.is_forbidden(cell, color)]
+
+    def _three_moves(self, color: int) -> List[Cell]:
+        """Cells where ``color`` makes a new open three, most lines first"""
+        index = self.index
+        counts: Dict[Cell, int] = {}
+        for line_id, values in enumerate(index.values):
+            state = index.states.get((line_id, color))
+            if state is None or not state.runs:
+                continue
+            cache_key = (line_id, color, tuple(values))
+            threes = self.three_cache.get(cache_key)
+            if threes is None:
+                threes = self._line_threes(values, color, state)
+                if len(self.three_cache) >= LINE_CACHE_SIZE:
+                    self.three_cache.clear()
+                self.three_cache[cache_key] = threes
+            cells = index.line_cells[line_id]
+            for position in threes:
+                counts[cells[position]] = counts.get(cells[position], 0) + 1
+        return sorted(counts, key=counts.get, reverse=True)
+
+    def _line_threes(self, values: list, color: int, state: LineState) -> Tuple[int, ...]:
+        index = self.index
+        exact = color in index.exact_colors
+        reach = index.win_length - 1
+        stones = [run.start + k for run in state.runs for k in range(run.length)]
+        skip = set(state.fours)
+        old_open_fours = set(state.open_fours)
+        threes = []
+        for i in range(len(values)):
+            if values[i] is not None or i in skip:
+                continue
+            if not any(abs(stone - i) <= reach for stone in stones):
+                continue
+            values[i] = color
+            _, _, _, open_fours = scan_line(values, color, index.win_length, exact)
+            values[i] = None
+            if any(j not in old_open_fours for j in open_fours):
+                threes.append(i)
+        return tuple(threes)
+
+    def _attack(self, depth: int, threes: bool) -> bool:
+        self._tick()
+        index = self.index
+        attacker, defender = self.attacker, self.defender
+        tt_key = (self.key, attacker, threes)
+        if index.has_five(attacker):
+            # 已经连成五，不需要再走
+            self.tt[tt_key] = (0, True, None)
+            return True
+        wins = index.win_cells[attacker]
+        if wins:
+            self.tt[tt_key] = (0, True, next(iter(wins)))
+            return True
+        entry = self.tt.get(tt_key)
+        if entry is not None:
+            if entry[1] and entry[0] <= depth:
+                return True
+            if not entry[1] and entry[0] >= depth:
+                return False
+        if depth == 0:
+            return False
+
+        defender_wins = index.win_cells[defender]
+        if defender_wins:
+            # 必须先挡住对方的四，且这一手本身也要是威胁
+            if len(defender_wins) > 1:
+                return False
+            block = next(iter(defender_wins))
+            moves = [cell for cell in self._threat_moves(attacker, threes) if cell == block]
+        else:
+            moves = self._threat_moves(attacker, threes)
+
+        for move in moves:
+            self.play(move, attacker)
+            try:
+                won = self._defend(depth - 1, threes)
+            finally:
+                self.undo(move, attacker)
+            if won:
+                self.tt[tt_key] = (depth, True, move)
+                return True
+        self.tt[tt_key] = (depth, False, None)
+        return False
+
+    def _defend(self, depth: int, threes: bool) -> bool:
+        self._tick()
+        index = self.index
+        attacker, defender = self.attacker, self.defender
+        if index.has_five(attacker):
+            return True
+        if index.win_cells[defender]:
+            return False
+        attacker_wins = index.win_cells[attacker]
+        if len(attacker_wins) >= 2:
+            return True
+        if attacker_wins:
+            defenses = list(attacker_wins)
+        elif threes and index.open_four_cells[attacker]:
+            defenses = self._three_defenses()
+        else:
+            return False
+
+        defenses = [cell for cell in defenses if not self.is_forbidden(cell, defender)]
+        for cell in defenses:
+            self.play(cell, defender)
+            try:
+                won = self._attack(depth, threes)
+            finally:
+                self.undo(cell, defender)
+            if not won:
+                return False
+        return True
+
+    def _three_defenses(self) -> List[Cell]:
+        """Empty cells that might stop the attacker's open threes, plus counter-fours"""
+        index = self.index
+        attacker = self.attacker
+        reach = index.win_length - 1
+        defenses = list(index.open_four_cells[attacker])
+        seen = set(defenses)
+        for (line_id, color), state in index.states.items():
+            if color != attacker or not state.open_fours:
+                continue
+            values = index.values[line_id]
+            cells = index.line_cells[line_id]
+            low = max(0, state.open_fours[0] - reach)
+            high = min(len(values), state.open_fours[-1] + reach + 1)
+            for position in range(low, high):
+                cell = cells[position]
+                if values[position] is None and cell not in seen:
+                    seen.add(cell)
+                    defenses.append(cell)
+        for cell in index.four_cells[self.defender]:
+            if cell not in seen:
+                seen.add(cell)
+                defenses.append(cell)
+        return defenses
+
+
+def solve_position(stones: Sequence[Stone], attacker: int, to_move: Optional[int] = None,
+                   size: int = 15, renju: bool = False, time_limit: float = 1.0,
+                   max_nodes: int = 200_000, threes: bool = True) -> SolveResult:
+    """Worker-process entry point: search a position given as a stone list"""
+    solver = ThreatSpaceSolver(size, renju, max_nodes)
+    solver.set_position(stones)
+    return solver.solve(attacker, to_move, time_limit, threes=threes)
+
+
+def _heuristic_move(index: ThreatIndex, color: int, rules: Optional[RenjuRules]) -> Optional[Cell]:
+    """Best-looking quiet move: own threats, blocking the opponent's, central"""
+    enemy = _opponent(color)
+    size = index.size
+    center = (size - 1) / 2
+    best, best_score = None, None
+    for x in range(size):
+        for y in range(size):
+            cell = (x, y)
+            line_id, position = index.cell_lines[cell][0]
+            if index.values[line_id][position] is not None:
+                continue
+            if rules and color == BLACK and rules.is_forbidden(x, y):
+                continue
+            score = (8 * index.open_four_cells[color].get(cell, 0) +
+                     6 * index.open_four_cells[enemy].get(cell, 0) +
+                     3 * index.four_cells[color].get(cell, 0) +
+                     2 * index.four_cells[enemy].get(cell, 0) -
+                     0.01 * (abs(x - center) + abs(y - center)))
+            if best_score is None or score > best_score:
+                best, best_score = cell, score
+    return best
+
+
+def select_move(stones: Sequence[Stone], to_move: int, size: int = 15, renju: bool = False,
+                time_limit: float = 1.0, max_nodes: int = 200_000) -> SolveResult:
+    """Worker-process entry point for the fallback player"""
+    start = time.perf_counter()
+    solver = ThreatSpaceSolver(size, renju, max_nodes)
+    solver.set_position(stones)
+    index = solver.index
+    enemy = _opponent(to_move)
+
+    result = solver.solve(to_move, time_limit=time_limit)
+    if result.winning:
+        return result
+    # 先挡对方的四，再挡对方的活三
+    blocks = [cell for cell in list(index.win_cells[enemy]) or list(index.open_four_cells[enemy])
+              if not solver.is_forbidden(cell, to_move)]
+    move = blocks[0] if blocks else None
+    if move is None:
+        move = _heuristic_move(index, to_move, solver.rules)
+    return SolveResult(False, move, None, result.depth, result.nodes,
+                       time.perf_counter() - start, result.complete)
+
+
+def annotate_moves(moves: Sequence[Cell], size: int = 15, renju: bool = False,
+                   time_limit: float = 0.5, max_nodes: int = 50_000) -> List[Dict]:
+    """Worker-process entry point: flag missed forced wins and allowed forced losses.
+
+    ``moves`` alternate starting with black. Returns one dict per move.
+    """
+    solver = ThreatSpaceSolver(size, renju, max_nodes)
+    stones: List[Stone] = []
+    annotations = []
+    for ply, cell in enumerate(moves):
+        mover = BLACK if ply % 2 == 0 else WHITE
+        enemy = _opponent(mover)
+        notes = []
+        solver.set_position(stones)
+        before_win = solver.solve(mover, mover, time_limit)
+        already_lost = solver.solve(enemy, mover, time_limit)
+        stones.append((cell[0], cell[1], mover))
+        solver.set_position(stones)
+        # 这一手连成五就赢了，不存在错过或送掉必胜
+        if not solver.index.has_five(mover):
+            if before_win.winning and not solver.solve(mover, enemy, time_limit).winning:
+                notes.append(MISSED_WIN)
+            if not already_lost.winning and solver.solve(enemy, enemy, time_limit).winning:
+                notes.append(ALLOWED_LOSS)
+        annotations.append({'ply': ply, 'x': cell[0], 'y': cell[1],
+                            'color': 'black' if mover == BLACK else 'white',
+                            'annotations': notes,
+                            'winning_move': before_win.to_action() if before_win.winning else None})
+    return annotations
+
+
+def _engine_stones(engine) -> List[Stone]:
+    return [(x, y, COLOR_CODES[color])
+            for x, row in enumerate(engine.board) for y, color in enumerate(row) if color is not None]
+
+
+async def find_forced_win(engine, time_limit: float = 1.0) -> SolveResult:
+    """Search the side to move's VCF/VCT without blocking the event loop"""
+    to_move = COLOR_CODES[engine.current_turn]
+    return await run_in_worker(solve_position, _engine_stones(engine), to_move, to_move,
+                               engine.board_size, engine.renju, time_limit,
+                               timeout=time_limit + WORKER_GRACE)
+
+
+async def choose_move(engine, time_limit: float = 1.0) -> SolveResult:
+    """Pick a move for the side to move (fallback when the LLM times out)"""
+    result = await run_in_worker(select_move, _engine_stones(engine), COLOR_CODES[engine.current_turn],
+                                 engine.board_size, engine.renju, time_limit,
+                                 timeout=time_limit + WORKER_GRACE)
+    engine.logger.info(
+        f"Fallback move: {result.move} forced win {result.winning} ({result.kind}) "
+        f"{result.nodes} nodes {result.nodes_per_second:,.0f} nps")
+    return result
+
+
+async def annotate_game(engine, time_limit: float = 0.5) -> List[Dict]:
+    """Annotate every move of ``engine``'s game in a worker process"""
+    moves = list(engine.moves)
+    # 每手最多四次求解
+    timeout = 4 * time_limit * len(moves) + WORKER_GRACE
+    return await run_in_worker(annotate_moves, moves, engine.board_size, engine.renju,
+                               time_limit, timeout=timeout)
@@ -1,13 +1,30 @@
 from typing import Dict, List, Optional
 from datetime import datetime
 from .rule_base import GameEngineBase
+from .red_alert_grid import SpatialHash
+
+# 单位默认视野（格，切比雪夫距离）
+VISION_RANGE = 3
+
+def _position(position: Dict) -> tuple:
+    return position['row'], position['col']
+
+def _distance(a: Dict, b: Dict) -> int:
+    return max(abs(a['row'] - b['row']), abs(a['col'] - b['col']))
 
 class JSRedAlertEngine(GameEngineBase):
     def __init__(self):
         super().__init__()
         self.map_size = (10, 10)
         self.players = []
-        self.game_state = {
+        self.player_index: Dict[str, Dict] = {}  # 玩家 id -> 玩家
+        self.units: Dict[str, Dict] = {}  # 单位 id -> 单位，单位记录 owner
+        self.unit_grid = SpatialHash()  # 单位位置的空间哈希，用于格子占用与范围查询
+        self.game_state = self.initial_state()
+
+    def initial_state(self) -> Dict:
+        """返回游戏的初始状态：空地图，等待两名玩家加入"""
+        return {
             'map': {
                 'tiles': [[{'terrain': 'grass', 'unit': None} for _ in range(self.map_size[1])] 
                           for _ in range(self.map_size[0])]
@@ -27,18 +44,20 @@ class JSRedAlertEngine(GameEngineBase):
             return False
             
         # 检查是否已存在相同ID的玩家
-        if any(p['id'] == player_id for p in self.players):
+        if player_id in self.player_index:
             return False
             
-        self.players.append({
+        player = {
             'id': player_id,
             'resources': {
                 'credits': 1000,
                 'power': 100
             },
-            'units': [],
+            'units': {},  # 单位 id -> 单位
             'connection_time': datetime.now().timestamp()
-        })
+        }
+        self.players.append(player)
+        self.player_index[player_id] = player
         
         if len(self.players) == 2:
             self.game_state['status'] = 'playing'
@@ -50,6 +69,68 @@ class JSRedAlertEngine(GameEngineBase):
     def get_state(self) -> Dict:
         return self.game_state
 
+    def add_unit(self, player_id: str, unit: Dict) -> bool:
+        """Place a new unit (with ``id`` and ``position``) for a player on an empty tile"""
+        player = self.player_index.get(player_id)
+        if player is None or unit.get('id') in self.units:
+            return False
+        position = unit.get('position')
+        if not self._in_bounds(position):
+            return False
+        tile = self.game_state['map']['tiles'][position['row']][position['col']]
+        if tile.get('unit') or tile.get('building'):
+            return False
+        unit['owner'] = player_id
+        self.units[unit['id']] = unit
+        player['units'][unit['id']] = unit
+        self.unit_grid.insert(unit['id'], _position(position))
+        tile['unit'] = unit
+        return True
+
+    def unit_at(self, position: Dict) -> Optional[Dict]:
+        unit_id = self.unit_grid.at(_position(position))
+        return None if unit_id is None else self.units[unit_id]
+
+    def units_in_range(self, position: Dict, radius: int, owner_id: Optional[str] = None,
+                       exclude_owner: Optional[str] = None) -> List[Dict]:
+        """Units within ``radius`` tiles of ``position``, nearest first"""
+        found = []
+        for unit_id, distance in self.unit_grid.in_range(_position(position), radius):
+            unit = self.units[unit_id]
+            if owner_id and unit['owner'] != owner_id or exclude_owner and unit['owner'] == exclude_owner:
+                continue
+            found.append((distance, unit_id, unit))
+        return [unit for _, _, unit in sorted(found, key=lambda item: item[:2])]
+
+    def visible_units(self, player_id: str, radius: int = VISION_RANGE) -> List[Dict]:
+        """Enemy units inside the vision range of any of the player's units"""
+        visible = {}
+        for unit in self.player_index[player_id]['units'].values():
+            for enemy in self.units_in_range(unit['position'], unit.get('vision', radius),
+                                             exclude_owner=player_id):
+                visible[enemy['id']] = enemy
+        return list(visible.values())
+
+    def _in_bounds(self, position: Optional[Dict]) -> bool:
+        return (isinstance(position, dict) and 0 <= position.get('row', -1) < self.map_size[0] and
+                0 <= position.get('col', -1) < self.map_size[1])
+
+    def validate_action(self, action: Dict, state: dict = None) -> bool:
+        """轮到动作里的 ``player_id`` 且动作类型已知（具体能否执行由 apply_action 判断）"""
+        return (isinstance(action, dict) and self.game_state['status'] == 'playing'
+                and action.get('player_id') == self.game_state['current_player']
+                and action.get('type') in ('move', 'build', 'attack', 'end_turn'))
+
+    def apply_action(self, action: Dict, state: dict = None) -> Dict:
+        """按 ``action['player_id']`` 执行动作并返回新的游戏状态，失败时抛出 ValueError"""
+        if not self.validate_action(action):
+            raise ValueError(f"Illegal action: {action}")
+        result = self.handle_action(action['player_id'], action)
+        if not result['success']:
+            raise ValueError(f"Illegal action: {action}")
+        self.log_action(action)
+        return result['new_state']
+
     def handle_action(self, player_id: str, action: Dict) -> Dict:
         result = {
             'success': False,
@@ -90,8 +171,7 @@ class JSRedAlertEngine(GameEngineBase):
             to_pos = action.get('to')
             
             # Find unit and validate ownership
-            player = next(p for p in self.players if p['id'] == player_id)
-            unit = next((u for u in player['units'] if u['id'] == unit_id), None)
+            unit = self._find_unit(unit_id, player_id)
             if not unit:
                 return False
                 
@@ -107,6 +187,7 @@ class JSRedAlertEngine(GameEngineBase):
                 
             # Update unit position
             old_pos = unit['position']
+            self.unit_grid.move(unit_id, _position(to_pos))
             self.game_state['map']['tiles'][old_pos['row']][old_pos['col']]['unit'] = None
             self.game_state['map']['tiles'][to_pos['row']][to_pos['col']]['unit'] = unit
             unit['position'] = to_pos
@@ -120,7 +201,7 @@ class JSRedAlertEngine(GameEngineBase):
     def _handle_build_action(self, player_id: str, action: Dict) -> bool:
         building_type = action.get('building')
         position = action.get('position')
-        player = next(p for p in self.players if p['id'] == player_id)
+        player = self.player_index[player_id]
         
         # Validate position and resources
         if not self._can_build_at(position, building_type, player):
@@ -149,6 +230,10 @@ class JSRedAlertEngine(GameEngineBase):
         
         if not attacker or not target:
             return False
+
+        # 设定了射程的单位只能攻击射程内的目标
+        if 'range' in attacker and _distance(attacker['position'], target['position']) > attacker['range']:
+            return False
             
         # Calculate damage
         damage = self._calculate_damage(attacker, target)
@@ -185,20 +270,18 @@ class JSRedAlertEngine(GameEngineBase):
         return costs.get(building_type, 0)
 
     def _find_unit(self, unit_id: str, owner_id: Optional[str] = None) -> Optional[Dict]:
-        for player in self.players:
-            if owner_id and player['id'] != owner_id:
-                continue
-            for unit in player['units']:
-                if unit['id'] == unit_id:
-                    return unit
-        return None
+        unit = self.units.get(unit_id)
+        if unit is None or (owner_id and unit['owner'] != owner_id):
+            return None
+        return unit
 
     def _remove_unit(self, unit: Dict):
-        # Remove unit from map and player
+        # Remove unit from map, grid and player
         pos = unit['position']
         self.game_state['map']['tiles'][pos['row']][pos['col']]['unit'] = None
-        for player in self.players:
-            player['units'] = [u for u in player['units'] if u['id'] != unit['id']]
+        self.unit_grid.remove(unit['id'])
+        del self.units[unit['id']]
+        del self.player_index[unit['owner']]['units'][unit['id']]
 
     def _calculate_damage(self, attacker: Dict, target: Dict) -> int:
         # Simple damage calculation
@@ -208,10 +291,13 @@ class JSRedAlertEngine(GameEngineBase):
         if player_id != self.game_state['current_player']:
             return False
             
-        current_index = self.players.index(
-            next(p for p in self.players if p['id'] == player_id))
+        current_index = self.players.index(self.player_index[player_id])
         next_index = (current_index + 1) % len(self.players)
         
         self.game_state['current_player'] = self.players[next_index]['id']
         self.game_state['lastUpdated'] = datetime.now().timestamp()
         return True
+
+    def is_healthy(self) -> bool:
+        """检查引擎是否健康"""
+        return True
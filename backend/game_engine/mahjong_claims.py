@@ -0,0 +1,130 @@
+"""Concurrent claim window for Sichuan Mahjong discards.
+
+After a discard, who may peng, gang or win on the tile is decided from the
+count vectors alone, so players with no legal claim are never asked. The
+eligible players are asked at once under a single deadline. When nobody
+can claim, the window costs no LLM call at all. Otherwise it costs one
+parallel round. It closes early once no outstanding player could outrank
+the best answer so far.
+
+A win beats a gang, which beats a peng. Among several wins the seat nearest
+after the discarder takes the tile (截胡). Missing, late or invalid answers
+count as passes. Without a claim the window is closed with a ``pass``
+action so the next player can draw.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from .mahjong_state import CLAIM_PRIORITY, GANG, HU, PENG, MahjongState
+from .mahjong_tiles import is_winning_hand, suit_of
+
+# 认领窗口的时限（秒）
+CLAIM_DEADLINE = 10.0
+
+# ask(player_id, view, options) -> action；返回 None 表示不要
+AskFunction = Callable[[str, Dict[str, Any], List[Dict[str, Any]]], Awaitable[Optional[Dict[str, Any]]]]
+
+
+class ClaimAnswer(NamedTuple):
+    player_id: str
+    action: Optional[Dict[str, Any]]  # 玩家选择的认领，None 为不要
+    source: str  # 'player'、'timeout'、'invalid'、'error' 或 'skipped'（被更优的认领抢先）
+
+
+def claim_kinds(state: MahjongState, seat: int) -> List[str]:
+    """Claims ``seat`` may make on the pending discard, best first"""
+    tile = state.pending_discard
+    if tile is None or seat == state.discarder or seat in state.winners:
+        return []
+    hand = state.hands[seat]
+    melds = [meld_tile for _, meld_tile in state.melds[seat]]
+    missing_suit = state.missing_suits[seat]
+    kinds = []
+    grown = list(hand)
+    grown[tile] += 1
+    if is_winning_hand(grown, melds, missing_suit):
+        kinds.append(HU)
+    # 定缺的那门牌不能碰杠
+    if suit_of(tile) != missing_suit:
+        if hand[tile] == 3:
+            kinds.append(GANG)
+        if hand[tile] >= 2:
+            kinds.append(PENG)
+    return kinds
+
+
+def claim_options(state: MahjongState) -> Dict[str, List[Dict[str, Any]]]:
+    """Claim actions of every player who can take the pending discard"""
+    options = {}
+    for seat, player_id in enumerate(state.players):
+        kinds = claim_kinds(state, seat)
+        if kinds:
+            options[player_id] = [{'type': kind, 'player': player_id} for kind in kinds]
+    return options
+
+
+def claim_rank(state: MahjongState, action: Dict[str, Any]) -> Tuple[int, int]:
+    """Sort key of a claim: lower wins (kind first, then seats after the discarder)"""
+    distance = (state.seat(action['player']) - state.discarder) % len(state.players)
+    return CLAIM_PRIORITY[action['type']], distance
+
+
+async def _ask(ask: AskFunction, player_id: str, view: Dict[str, Any],
+               options: List[Dict[str, Any]], deadline: float, logger) -> ClaimAnswer:
+    remaining = deadline - asyncio.get_running_loop().time()
+    try:
+        if remaining <= 0:
+            raise asyncio.TimeoutError
+        data = await asyncio.wait_for(ask(player_id, view, options), remaining)
+    except asyncio.TimeoutError:
+        logger.warning(f"Claim of {player_id} timed out, passing")
+        return ClaimAnswer(player_id, None, 'timeout')
+    except Exception as e:
+        logger.warning(f"Claim of {player_id} failed: {e}")
+        return ClaimAnswer(player_id, None, 'error')
+    if data is None or data in options:
+        return ClaimAnswer(player_id, data, 'player')
+    logger.warning(f"Invalid claim from {player_id}: {data}")
+    return ClaimAnswer(player_id, None, 'invalid')
+
+
+async def collect_claims(engine, ask: AskFunction,
+                         timeout: float = CLAIM_DEADLINE) -> Tuple[Optional[Dict[str, Any]], List[ClaimAnswer]]:
+    """Run the claim window on ``engine``'s pending discard.
+
+    Applies the winning claim, or closes the window with a ``pass``, and
+    returns the claim (None without one) together with every eligible
+    player's answer in seat order.
+    """
+    state = engine.state
+    options = claim_options(state)
+    if not options:
+        engine.apply_action({'type': 'pass'})
+        return None, []
+    deadline = asyncio.get_running_loop().time() + timeout
+    tasks = {asyncio.ensure_future(_ask(ask, player_id, engine.get_player_view(player_id), player_options,
+                                        deadline, engine.logger)): player_id
+             for player_id, player_options in options.items()}
+    answers: Dict[str, ClaimAnswer] = {}
+    best: Optional[Dict[str, Any]] = None
+    pending = set(tasks)
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                answer = task.result()
+                answers[answer.player_id] = answer
+                if answer.action is not None and (best is None or claim_rank(state, answer.action)
+                                                  < claim_rank(state, best)):
+                    best = answer.action
+            # 还没回答的玩家都不可能压过当前最优认领时提前结束
+            if best is not None and all(claim_rank(state, options[tasks[task]][0]) > claim_rank(state, best)
+                                        for task in pending):
+                break
+    finally:
+        for task in pending:
+            task.cancel()
+            answers[tasks[task]] = ClaimAnswer(tasks[task], None, 'skipped')
+    engine.apply_action(best if best is not None else {'type': 'pass'})
+    order = {player_id: seat for seat, player_id in enumerate(state.players)}
+    return best, sorted(answers.values(), key=lambda answer: order[answer.player_id])
@@ -0,0 +1,331 @@
+"""Shanten (distance to a winning hand) and effective tiles for Sichuan Mahjong.
+
+Each suit is looked up in a precomputed table indexed by its 9-slot count
+pattern read as a base-5 number. A row holds, for m = 0..4 melds without
+and with a pair, the fewest tiles that must be added to the suit to hold
+that many melds (and the pair). A hand's shanten is the cheapest way to
+split the melds it still needs across the suits, minus one. The missing
+suit (缺一门) contributes nothing, so its tiles count as dead weight that
+must be replaced. Seven pairs is scored on the counts directly.
+
+The table (5**9 rows of 10 bytes) is generated once with NumPy in a few
+seconds by ``generate_table``, saved as ``.npy`` in ``MAHJONG_TABLE_DIR``
+and memory-mapped on load, like the poker tables. Adding or removing a tile changes only one
+suit's row, so effective tiles read all 27 grown rows in one gather and
+per-discard hints patch the full hand's shape instead of rebuilding it.
+Suit rows, suit merges and per-shape results are memoized, since the same
+hands come back across turns (hints, then the chosen discard's waits).
+"""
+import itertools
+import logging
+import os
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .mahjong_tiles import COPIES, SUIT_SIZE, SUITS, TILE_KINDS, Counts, Tile, suit_of
+
+logger = logging.getLogger(__name__)
+
+TABLE_VERSION = 1
+TABLE_DIR = Path(os.getenv('MAHJONG_TABLE_DIR', Path(__file__).parent.parent.parent / 'data' / 'mahjong'))
+TABLE_NAME = 'suit_distance'
+
+MAX_MELDS = 4
+PATTERNS = 5 ** SUIT_SIZE
+POWERS = [5 ** i for i in range(SUIT_SIZE)]
+_POWERS = np.array(POWERS)
+_TILE_SUITS = np.arange(TILE_KINDS) // SUIT_SIZE
+COLUMNS = 2 * (MAX_MELDS + 1)  # 列号 = 面子数 + 5 * 是否含雀头
+UNREACHABLE = 99
+# 不参与组牌的花色（定缺的那门）：零个面子、零距离
+EMPTY_ROW = (0,) + (UNREACHABLE,) * (COLUMNS - 1)
+_UNREACHABLE_ROW = (UNREACHABLE,) * COLUMNS
+SEVEN_PAIRS = 7
+
+
+def column(melds: int, pair: bool) -> int:
+    return melds + (MAX_MELDS + 1) * pair
+
+
+def _complete_patterns() -> Dict[int, List[Tuple[int, ...]]]:
+    """Every suit pattern that is exactly m melds (plus a pair), by column"""
+    shapes = [(i,) * 3 for i in range(SUIT_SIZE)] + [(i, i + 1, i + 2) for i in range(SUIT_SIZE - 2)]
+    patterns: Dict[int, List[Tuple[int, ...]]] = {}
+    for melds in range(MAX_MELDS + 1):
+        for combo in itertools.combinations_with_replacement(shapes, melds):
+            base = [0] * SUIT_SIZE
+            for shape in combo:
+                for i in shape:
+                    base[i] += 1
+            if max(base, default=0) > COPIES:
+                continue
+            patterns.setdefault(column(melds, False), []).append(tuple(base))
+            for pair in range(SUIT_SIZE):
+                if base[pair] + 2 <= COPIES:
+                    with_pair = list(base)
+                    with_pair[pair] += 2
+                    patterns.setdefault(column(melds, True), []).append(tuple(with_pair))
+    return patterns
+
+
+def build_table() -> np.ndarray:
+    """Distance table of every suit pattern (slow; normally done once and cached on disk)"""
+    index = np.arange(PATTERNS)
+    digits = (index[:, np.newaxis] // np.array(POWERS)) % 5
+    totals = digits.sum(axis=1)
+    levels = [np.flatnonzero(totals == total) for total in range(COPIES * SUIT_SIZE + 1)]
+
+    # contains[p, c]：p 中已包含某个 c 列的完整组合
+    contains = np.zeros((PATTERNS, COLUMNS), dtype=bool)
+    for col, patterns in _complete_patterns().items():
+        contains[[sum(c * p for c, p in zip(pattern, POWERS)) for pattern in patterns], col] = True
+    for level in levels[1:]:
+        for i, power in enumerate(POWERS):
+            sub = level[digits[level, i] > 0]
+            contains[sub] |= contains[sub - power]
+
+    # 距离 = 还需摸进的张数：已包含则为 0，否则取加一张后的最小距离再加 1
+    distance = np.full((PATTERNS, COLUMNS), UNREACHABLE, dtype=np.uint8)
+    for level in reversed(levels):
+        best = np.full((len(level), COLUMNS), UNREACHABLE, dtype=np.uint8)
+        for i, power in enumerate(POWERS):
+            can_add = digits[level, i] < COPIES
+            grown = distance[level[can_add] + power]
+            best[can_add] = np.minimum(best[can_add], np.minimum(grown, UNREACHABLE - 1) + 1)
+        distance[level] = np.where(contains[level], 0, best)
+    return distance
+
+
+_table: Optional[np.ndarray] = None
+
+
+def _table_path(directory: Path) -> Path:
+    return Path(directory) / f'v{TABLE_VERSION}' / f'{TABLE_NAME}.npy'
+
+
+def table_exists(directory: Path = TABLE_DIR) -> bool:
+    return _table_path(directory).exists()
+
+
+def generate_table(directory: Path = TABLE_DIR) -> None:
+    """Build and save the suit table unless it exists (worker-process entry point)"""
+    path = _table_path(directory)
+    if path.exists():
+        return
+    logger.info(f"Generating mahjong shanten table in {path.parent}")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # 先写临时文件再改名，多个工作进程同时生成时也不会读到半个文件
+    temp = path.parent / f'{TABLE_NAME}.{os.getpid()}.tmp.npy'
+    np.save(temp, build_table())
+    os.replace(temp, path)
+
+
+def load_table(directory: Path = TABLE_DIR) -> np.ndarray:
+    """Memory-map the suit table, generating and saving it on first use"""
+    global _table
+    if _table is not None:
+        return _table
+    generate_table(directory)
+    # 以普通 ndarray 视图持有映射：np.memmap 子类的逐次索引开销大
+    _table = np.asarray(np.load(_table_path(directory), mmap_mode='r'))
+    return _table
+
+
+@lru_cache(maxsize=65536)
+def _row(key: int) -> Tuple[int, ...]:
+    """Table row of a suit pattern as a tuple (memory-map reads are slow one by one)"""
+    return tuple(load_table()[key].tolist())
+
+
+@lru_cache(maxsize=65536)
+def _suit(pattern: Tuple[int, ...]) -> Tuple[int, Tuple[int, ...], int, int]:
+    """Table key, row, pair count and single count of a 9-slot suit pattern"""
+    key = sum(count * power for count, power in zip(pattern, POWERS))
+    return key, _row(key), sum(count // 2 for count in pattern), sum(count % 2 for count in pattern)
+
+
+# 两门合并时各列的来源：(合并列, 第一门列, 第二门列)
+_MERGE_COLUMNS = [
+    (column(a + b, pair_a or pair_b), column(a, pair_a), column(b, pair_b))
+    for a in range(MAX_MELDS + 1) for b in range(MAX_MELDS + 1 - a)
+    for pair_a, pair_b in ((False, False), (True, False), (False, True))
+]
+
+
+@lru_cache(maxsize=65536)
+def _merge(first: Tuple[int, ...], second: Tuple[int, ...]) -> Tuple[int, ...]:
+    """Row of two suits taken together: cheapest split of each column between them"""
+    merged = [UNREACHABLE] * COLUMNS
+    for target, col_a, col_b in _MERGE_COLUMNS:
+        cost = first[col_a] + second[col_b]
+        if cost < merged[target]:
+            merged[target] = cost
+    return tuple(merged)
+
+
+@lru_cache(maxsize=65536)
+def _rest_costs(first: Tuple[int, ...], second: Tuple[int, ...], need: int) -> Tuple[int, ...]:
+    """Cheapest cost of two suits for each column a third suit may take (UNREACHABLE if none)"""
+    merged = _merge(first, second)
+    rest = [UNREACHABLE] * COLUMNS
+    for melds in range(need + 1):
+        rest[melds] = merged[column(need - melds, True)]
+        rest[column(melds, True)] = merged[need - melds]
+    return tuple(rest)
+
+
+def _rest(rows: Sequence[Tuple[int, ...]], suit: int, excluded: int, need: int) -> Tuple[int, ...]:
+    """Cheapest cost of the other suits for each column the given suit may take"""
+    first, second = [EMPTY_ROW if other == excluded else rows[other]
+                     for other in range(len(SUITS)) if other != suit]
+    return _rest_costs(first, second, need)
+
+
+class HandShape(NamedTuple):
+    """Per-suit rows of a hand plus the options that constrain it"""
+    keys: Tuple[int, ...]
+    rows: Tuple[Tuple[int, ...], ...]
+    need: int  # 还需组成的面子数
+    excluded: Tuple[int, ...]  # 可以作为缺门的花色
+    pairs: Tuple[int, ...]  # 各缺门选择下可用的对子数（七对用）
+    singles: Tuple[int, ...]  # 各缺门选择下可用的单张数（七对用）
+    concealed: bool  # 无副露，可以七对
+
+
+def _shape(counts: Counts, melds: Sequence[Tile], missing_suit: Optional[int]) -> HandShape:
+    keys, rows, suit_pairs, suit_singles = zip(*(
+        _suit(tuple(counts[suit * SUIT_SIZE:(suit + 1) * SUIT_SIZE])) for suit in range(len(SUITS))))
+    meld_suits = {suit_of(tile) for tile in melds}
+    if missing_suit is not None:
+        excluded = (missing_suit,)
+    else:
+        excluded = tuple(suit for suit in range(len(SUITS)) if suit not in meld_suits)
+    pairs = tuple(sum(suit_pairs) - suit_pairs[suit] for suit in excluded)
+    singles = tuple(sum(suit_singles) - suit_singles[suit] for suit in excluded)
+    return HandShape(keys, rows, MAX_MELDS - len(melds), excluded, pairs, singles, not melds)
+
+
+def _seven_pairs_distance(pairs: int, singles: int) -> int:
+    """Tiles to add for seven pairs: one per single that can be paired, two per pair made from nothing"""
+    missing = SEVEN_PAIRS - min(pairs, SEVEN_PAIRS)
+    return missing + max(0, missing - singles)
+
+
+def _standard_distance(rows: Sequence[Tuple[int, ...]], need: int, excluded: int) -> int:
+    row = EMPTY_ROW if excluded == 0 else rows[0]
+    return min(map(int.__add__, row, _rest(rows, 0, excluded, need)))
+
+
+@lru_cache(maxsize=65536)
+def _distance(shape: HandShape) -> int:
+    best = UNREACHABLE
+    for suit, pairs, singles in zip(shape.excluded, shape.pairs, shape.singles):
+        best = min(best, _standard_distance(shape.rows, shape.need, suit))
+        if shape.concealed:
+            best = min(best, _seven_pairs_distance(pairs, singles))
+    return best
+
+
+def shanten(counts: Counts, melds: Sequence[Tile] = (), missing_suit: Optional[int] = None) -> int:
+    """Tiles away from ready (0 = ready / 听牌, -1 = complete) for concealed ``counts``.
+
+    ``melds`` holds one tile per exposed meld. Without a declared
+    ``missing_suit`` the best suit to drop is chosen.
+    """
+    return _distance(_shape(counts, melds, missing_suit)) - 1
+
+
+def effective_tiles(counts: Counts, melds: Sequence[Tile] = (), missing_suit: Optional[int] = None,
+                    visible: Optional[Counts] = None) -> List[Tuple[int, int]]:
+    """(tile, copies left) of every tile that lowers the shanten of a 3n+1 hand (ukeire).
+
+    ``visible`` counts tiles the player can see (own hand, discards, melds);
+    by default only the hand itself.
+    """
+    shape = _shape(counts, melds, missing_suit)
+    return _effective(counts, shape, counts if visible is None else visible)
+
+
+def _effective(counts: Counts, shape: HandShape, visible: Counts) -> List[Tuple[int, int]]:
+    return [(tile, COPIES - visible[tile]) for tile in _improving(shape, tuple(counts))]
+
+
+@lru_cache(maxsize=65536)
+def _improving(shape: HandShape, counts: Tuple[int, ...]) -> Tuple[int, ...]:
+    """Tiles whose draw lowers the distance of ``shape`` (memoized: hints repeat across turns)"""
+    current = _distance(shape)
+    # 一张牌最多让七对距离减一：够不着当前距离时不必逐张计算七对
+    seven_pairs_open = shape.concealed and min(
+        _seven_pairs_distance(pairs, singles) for pairs, singles in zip(shape.pairs, shape.singles)) <= current
+    # 每门一行：本门取各列时其余两门的最小代价；本门只能作缺门时整行不可达
+    rest = []
+    # 七对：每门摸到非成对牌（0/2 张）与成对牌（1/3 张）后的距离
+    seven_pairs = []
+    for suit in range(len(SUITS)):
+        # 摸进本门的牌时本门不能是缺门
+        options = [option for option in zip(shape.excluded, shape.pairs, shape.singles)
+                   if option[0] != suit]
+        if not options:
+            rest.append(_UNREACHABLE_ROW)
+            seven_pairs.append((UNREACHABLE, UNREACHABLE))
+            continue
+        rest.append(tuple(map(min, *(_rest(shape.rows, suit, excluded, shape.need)
+                                     for excluded, _, _ in options), _UNREACHABLE_ROW)))
+        if seven_pairs_open:
+            seven_pairs.append((
+                min(_seven_pairs_distance(pairs, singles + 1) for _, pairs, singles in options),
+                min(_seven_pairs_distance(pairs + 1, singles - 1) for _, pairs, singles in options)))
+    # 27 种牌加一张后的行一次取出；已有四张的牌用 0 号行占位，最后剔除
+    hand = np.array(counts)
+    drawable = hand < COPIES
+    keys = np.where(drawable, (np.array(shape.keys)[:, np.newaxis] + _POWERS).ravel(), 0)
+    distances = (load_table()[keys] + np.repeat(rest, SUIT_SIZE, axis=0)).min(axis=1)
+    if seven_pairs_open:
+        distances = np.minimum(distances, np.array(seven_pairs)[_TILE_SUITS, hand % 2])
+    return tuple(np.flatnonzero(drawable & (distances < current)).tolist())
+
+
+class DiscardOption(NamedTuple):
+    tile: int
+    shanten: int
+    effective: List[Tuple[int, int]]
+
+    @property
+    def count(self) -> int:
+        return sum(left for _, left in self.effective)
+
+
+def discard_options(counts: Counts, melds: Sequence[Tile] = (), missing_suit: Optional[int] = None,
+                    visible: Optional[Counts] = None) -> List[DiscardOption]:
+    """Shanten and effective tiles after each possible discard of a 3n+2 hand, best first.
+
+    Only the suit that loses the tile changes, so each discard's shape is
+    derived from the full hand's instead of being recomputed.
+    """
+    full = _shape(counts, melds, missing_suit)
+    hand = list(counts)
+    visible = counts if visible is None else visible
+    options = []
+    for tile in range(TILE_KINDS):
+        count = hand[tile]
+        if not count:
+            continue
+        suit, number = divmod(tile, SUIT_SIZE)
+        keys = list(full.keys)
+        keys[suit] -= POWERS[number]
+        rows = list(full.rows)
+        rows[suit] = _row(keys[suit])
+        # 打出偶数张中的一张少一对多一张单张，打出奇数张中的一张少一张单张
+        pair_change, single_change = (-1, 1) if count % 2 == 0 else (0, -1)
+        pairs = tuple(pairs + pair_change * (excluded != suit) for excluded, pairs in zip(full.excluded, full.pairs))
+        singles = tuple(singles + single_change * (excluded != suit)
+                        for excluded, singles in zip(full.excluded, full.singles))
+        shape = full._replace(keys=tuple(keys), rows=tuple(rows), pairs=pairs, singles=singles)
+        hand[tile] -= 1
+        options.append(DiscardOption(tile, _distance(shape) - 1, _effective(hand, shape, visible)))
+        hand[tile] += 1
+    options.sort(key=lambda option: (option.shanten, -option.count))
+    return options
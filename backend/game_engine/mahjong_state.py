@@ -0,0 +1,143 @@
+"""Immutable Sichuan Mahjong game state.
+
+``MahjongState`` is a tuple of tuples: applying an action returns a new
+state that shares everything the action did not touch. The shuffled wall is
+never copied, a draw only lowers ``wall_count``; a discard rebuilds the
+mover's 27-slot hand and leaves the other hands shared. States can therefore
+be kept, compared and explored side by side (search, discard hints, claim
+evaluation) without any defensive copying.
+"""
+from typing import Iterable, NamedTuple, Optional, Sequence, Tuple
+
+from .mahjong_tiles import TILE_KINDS, Tile, suit_index, tile_index
+
+HAND_SIZE = 13
+SEATS = 4
+
+# 打出的牌可以被碰、杠、胡（四川麻将不能吃），多家认领时胡 > 杠 > 碰
+HU = 'hu'
+GANG = 'gang'
+PENG = 'peng'
+CLAIM_PRIORITY = {HU: 0, GANG: 1, PENG: 2}
+
+Hand = Tuple[int, ...]  # 27 格计数
+Meld = Tuple[str, int]  # (kind, tile)
+
+
+def _replace_at(items: tuple, index: int, value) -> tuple:
+    return items[:index] + (value,) + items[index + 1:]
+
+
+class MahjongState(NamedTuple):
+    players: Tuple[str, ...] = ()
+    hands: Tuple[Hand, ...] = ()  # 按座位
+    melds: Tuple[Tuple[Meld, ...], ...] = ()
+    missing_suits: Tuple[Optional[int], ...] = ()
+    current_player: int = 0
+    discards: Tuple[int, ...] = ()
+    wall: Tuple[int, ...] = ()  # 洗好的整副牌，从尾部摸
+    wall_count: int = 0  # 牌墙剩余张数，即 wall[:wall_count]
+    wind: int = 1
+    round: int = 1
+    pending_discard: Optional[int] = None  # 刚打出、还可以被碰杠胡的牌
+    winners: Tuple[int, ...] = ()
+
+    @property
+    def discarder(self) -> int:
+        """Seat that made the last discard"""
+        return (self.current_player - 1) % len(self.players)
+
+    @property
+    def next_tile(self) -> Optional[int]:
+        return self.wall[self.wall_count - 1] if self.wall_count else None
+
+    def tile_count(self, seat: int) -> int:
+        """Tiles a seat holds, counting each exposed meld as three: 13 between turns, 14 to discard"""
+        return sum(self.hands[seat]) + 3 * len(self.melds[seat])
+
+    def next_seat(self, seat: int) -> int:
+        """Seat after ``seat`` that is still playing (winners sit out, 血战到底)"""
+        for step in range(1, len(self.players) + 1):
+            following = (seat + step) % len(self.players)
+            if following not in self.winners:
+                return following
+        return seat
+
+    def seat(self, player) -> int:
+        """Seat of a player given by name or seat number"""
+        return player if isinstance(player, int) else self.players.index(player)
+
+    def with_hand(self, seat: int, hand: Hand) -> 'MahjongState':
+        return self._replace(hands=_replace_at(self.hands, seat, hand))
+
+    def draw(self) -> 'MahjongState':
+        """The current player takes the next wall tile (unchanged if the wall is empty)"""
+        tile = self.next_tile
+        if tile is None:
+            return self
+        hand = self.hands[self.current_player]
+        state = self.with_hand(self.current_player, _replace_at(hand, tile, hand[tile] + 1))
+        return state._replace(wall_count=self.wall_count - 1, pending_discard=None)
+
+    def discard(self, tile: Tile) -> 'MahjongState':
+        """The current player discards ``tile`` and the turn passes on"""
+        tile = tile_index(tile)
+        hand = self.hands[self.current_player]
+        if not hand[tile]:
+            raise ValueError("Tile not in player's hand")
+        state = self.with_hand(self.current_player, _replace_at(hand, tile, hand[tile] - 1))
+        return state._replace(discards=self.discards + (tile,), pending_discard=tile,
+                              current_player=self.next_seat(self.current_player))
+
+    def pass_claims(self) -> 'MahjongState':
+        """Nobody claims the pending discard; the next player may draw"""
+        return self._replace(pending_discard=None)
+
+    def claim(self, player, kind: str) -> 'MahjongState':
+        """``player`` takes the pending discard for a peng, an exposed gang or a win.
+
+        After a peng the claimer discards next; after a gang they first draw
+        a replacement tile. A win adds the tile to the hand and records the
+        winner, with the turn passing to the seat after them.
+        """
+        tile = self.pending_discard
+        if tile is None:
+            raise ValueError("No discard to claim")
+        seat = self.seat(player)
+        hand = self.hands[seat]
+        state = self._replace(discards=self.discards[:-1], pending_discard=None)
+        if kind == HU:
+            state = state.with_hand(seat, _replace_at(hand, tile, hand[tile] + 1))
+            state = state._replace(winners=self.winners + (seat,))
+            return state._replace(current_player=state.next_seat(seat))
+        used = {PENG: 2, GANG: 3}[kind]
+        if hand[tile] < used:
+            raise ValueError(f"Not enough tiles to {kind}")
+        state = state.with_hand(seat, _replace_at(hand, tile, hand[tile] - used))
+        state = state._replace(melds=_replace_at(self.melds, seat, self.melds[seat] + ((kind, tile),)),
+                               current_player=seat)
+        return state.draw() if kind == GANG else state
+
+    def declare_missing(self, player, suit) -> 'MahjongState':
+        """Record the suit a player declared missing (定缺)"""
+        return self._replace(missing_suits=_replace_at(
+            self.missing_suits, self.seat(player), suit_index(suit)))
+
+
+def deal(players: Sequence[str], wall: Iterable[int]) -> MahjongState:
+    """Opening state: 13 tiles to each seat in turn, taken from the end of ``wall``"""
+    wall = tuple(wall)
+    hands = [[0] * TILE_KINDS for _ in players]
+    count = len(wall)
+    for _ in range(HAND_SIZE):
+        for hand in hands:
+            count -= 1
+            hand[wall[count]] += 1
+    return MahjongState(
+        players=tuple(players),
+        hands=tuple(tuple(hand) for hand in hands),
+        melds=tuple(() for _ in players),
+        missing_suits=tuple(None for _ in players),
+        wall=wall,
+        wall_count=count,
+    )
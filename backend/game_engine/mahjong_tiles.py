@@ -0,0 +1,189 @@
+"""Sichuan Mahjong tiles as count vectors and the winning-hand decomposer.
+
+Sichuan Mahjong is played with the three suits only (108 tiles). A hand is
+a 27-slot vector of tile counts, index ``suit * 9 + (number - 1)`` with the
+suits in ``SUITS`` order. Tiles can be passed around as indices or as names
+like ``'bamboo_3'``.
+
+A standard win (four melds and a pair) splits by suit: every suit must
+decompose into melds alone, except one suit that holds melds plus the pair.
+Whether a 9-slot suit pattern can do either is memoized per pattern, so a
+win or ready-hand check is three cache lookups. Seven pairs (four of a kind
+counting as two pairs) and the missing-suit rule (缺一门: a winning hand uses
+at most two suits, and never the suit the player declared missing) are
+checked on the counts directly.
+"""
+from functools import lru_cache
+from typing import Iterable, List, Optional, Sequence, Tuple, Union
+
+SUITS = ('bamboo', 'character', 'dot')
+SUIT_SIZE = 9
+TILE_KINDS = len(SUITS) * SUIT_SIZE
+COPIES = 4
+TILE_NAMES = [f'{suit}_{number}' for suit in SUITS for number in range(1, SUIT_SIZE + 1)]
+TILE_INDEX = {name: index for index, name in enumerate(TILE_NAMES)}
+
+Tile = Union[int, str]
+Counts = Sequence[int]
+
+# 单门花色的拆分结果
+MELDS_ONLY = 1  # 能全部拆成刻子/顺子
+MELDS_AND_PAIR = 2  # 能拆成刻子/顺子加一个对子
+
+
+def tile_index(tile: Tile) -> int:
+    if isinstance(tile, int):
+        if not 0 <= tile < TILE_KINDS:
+            raise ValueError(f"Unknown tile: {tile}")
+        return tile
+    if tile not in TILE_INDEX:
+        raise ValueError(f"Unknown tile: {tile}")
+    return TILE_INDEX[tile]
+
+
+def tile_name(index: int) -> str:
+    return TILE_NAMES[index]
+
+
+def suit_of(tile: Tile) -> int:
+    return tile_index(tile) // SUIT_SIZE
+
+
+def suit_index(suit: Union[int, str]) -> int:
+    return suit if isinstance(suit, int) else SUITS.index(suit)
+
+
+def to_counts(tiles: Iterable[Tile]) -> List[int]:
+    counts = [0] * TILE_KINDS
+    for tile in tiles:
+        counts[tile_index(tile)] += 1
+    return counts
+
+
+def to_tiles(counts: Counts) -> List[str]:
+    return [TILE_NAMES[index] for index, count in enumerate(counts) for _ in range(count)]
+
+
+def suit_counts(counts: Counts, suit: int) -> Tuple[int, ...]:
+    start = suit * SUIT_SIZE
+    return tuple(counts[start:start + SUIT_SIZE])
+
+
+def suits_in(counts: Counts) -> List[int]:
+    return [suit for suit in range(len(SUITS)) if any(suit_counts(counts, suit))]
+
+
+@lru_cache(maxsize=None)
+def _melds_only(pattern: Tuple[int, ...]) -> bool:
+    """Whether a suit pattern splits entirely into triplets and runs"""
+    for i, count in enumerate(pattern):
+        if count:
+            break
+    else:
+        return True
+    # 最小的牌要么组成刻子，要么作为顺子的第一张
+    if count >= 3:
+        rest = list(pattern)
+        rest[i] -= 3
+        if _melds_only(tuple(rest)):
+            return True
+    if i + 2 < SUIT_SIZE and pattern[i + 1] and pattern[i + 2]:
+        rest = list(pattern)
+        rest[i] -= 1
+        rest[i + 1] -= 1
+        rest[i + 2] -= 1
+        return _melds_only(tuple(rest))
+    return False
+
+
+@lru_cache(maxsize=None)
+def suit_shape(pattern: Tuple[int, ...]) -> int:
+    """MELDS_ONLY / MELDS_AND_PAIR bits of a 9-slot suit pattern"""
+    total = sum(pattern)
+    if total % 3 == 0:
+        return MELDS_ONLY if _melds_only(pattern) else 0
+    if total % 3 == 2:
+        for i, count in enumerate(pattern):
+            if count >= 2:
+                rest = list(pattern)
+                rest[i] -= 2
+                if _melds_only(tuple(rest)):
+                    return MELDS_AND_PAIR
+    return 0
+
+
+def is_standard_win(counts: Counts) -> bool:
+    """Concealed tiles form melds plus exactly one pair"""
+    pairs = 0
+    for suit in range(len(SUITS)):
+        pattern = suit_counts(counts, suit)
+        shape = suit_shape(pattern)
+        if not shape:
+            return False
+        pairs += shape == MELDS_AND_PAIR
+    return pairs == 1
+
+
+def is_seven_pairs(counts: Counts) -> bool:
+    """七对（四张相同算两对，即龙七对）"""
+    return sum(counts) == 14 and all(count % 2 == 0 for count in counts)
+
+
+def is_winning_hand(counts: Counts, melds: Sequence[Tile] = (),
+                    missing_suit: Optional[int] = None) -> bool:
+    """Whether concealed ``counts`` plus exposed ``melds`` (one tile per meld) win.
+
+    ``missing_suit`` is the suit the player declared missing (定缺); without
+    one, the hand still may not use all three suits.
+    """
+    if sum(counts) + 3 * len(melds) != 14:
+        return False
+    suits = set(suits_in(counts)) | {suit_of(tile) for tile in melds}
+    if len(suits) > 2 or (missing_suit is not None and missing_suit in suits):
+        return False
+    return is_standard_win(counts) or (not melds and is_seven_pairs(counts))
+
+
+def winning_tiles(counts: Counts, melds: Sequence[Tile] = (),
+                  missing_suit: Optional[int] = None) -> List[int]:
+    """Tiles that complete a 13-tile (minus melds) hand: its waits when ready (听牌).
+
+    Only the suit receiving the tile changes, so each candidate costs one
+    memoized suit lookup on top of the other two suits' cached shapes.
+    """
+    if sum(counts) + 3 * len(melds) != 13:
+        return []
+    patterns = [suit_counts(counts, suit) for suit in range(len(SUITS))]
+    shapes = [suit_shape(pattern) for pattern in patterns]
+    used = {suit for suit, pattern in enumerate(patterns) if any(pattern)}
+    used |= {suit_of(tile) for tile in melds}
+    if missing_suit is not None and missing_suit in used:
+        return []
+    # 七对听牌：恰有一张单牌
+    odd = [tile for tile, count in enumerate(counts) if count % 2]
+    seven_pairs_wait = odd[0] if not melds and len(odd) == 1 else None
+    waits = []
+    for suit, pattern in enumerate(patterns):
+        if len(used | {suit}) > 2 or suit == missing_suit:
+            continue
+        others = [shapes[other] for other in range(len(SUITS)) if other != suit]
+        others_ok = all(others)
+        other_pairs = sum(shape == MELDS_AND_PAIR for shape in others)
+        for number in range(SUIT_SIZE):
+            tile = suit * SUIT_SIZE + number
+            if pattern[number] >= COPIES:
+                continue
+            if tile == seven_pairs_wait:
+                waits.append(tile)
+                continue
+            if others_ok and other_pairs <= 1:
+                grown = list(pattern)
+                grown[number] += 1
+                shape = suit_shape(tuple(grown))
+                if shape and (shape == MELDS_AND_PAIR) + other_pairs == 1:
+                    waits.append(tile)
+    return waits
+
+
+def is_ready(counts: Counts, melds: Sequence[Tile] = (), missing_suit: Optional[int] = None) -> bool:
+    return bool(winning_tiles(counts, melds, missing_suit))
@@ -0,0 +1,178 @@
+"""Perft (move path enumeration) harness for the chess-family engines.
+
+Counts the leaf nodes of the legal move tree to a fixed depth and compares
+them with published reference values, so move generation changes can be
+checked for both correctness and speed::
+
+    python -m backend.game_engine.perft --variant chess --depth 4
+    python -m backend.game_engine.perft --fen "<fen>" --depth 3 --divide
+
+``run_suite`` and ``perft`` are plain functions so benchmark runners can
+call them directly.
+"""
+import argparse
+import sys
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+from .chess_engine import ChessEngine
+from .chess_bitboard import move_to_uci
+from .cn_chess_engine import CNChessEngine
+from .xiangqi_movegen import move_to_iccs
+
+
+@dataclass
+class PerftCase:
+    name: str
+    fen: str
+    node_counts: List[int]  # node_counts[d - 1] 为深度 d 的参考值
+
+
+@dataclass
+class PerftResult:
+    variant: str
+    name: str
+    depth: int
+    nodes: int
+    expected: Optional[int]
+    seconds: float
+
+    @property
+    def ok(self) -> bool:
+        return self.expected is None or self.nodes == self.expected
+
+    @property
+    def nodes_per_second(self) -> float:
+        return self.nodes / self.seconds if self.seconds > 0 else 0.0
+
+
+# 参考局面与节点数取自 chessprogramming.org/Perft_Results
+CHESS_CASES = [
+    PerftCase('startpos', 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1',
+              [20, 400, 8902, 197281, 4865609]),
+    PerftCase('kiwipete', 'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1',
+              [48, 2039, 97862, 4085603]),
+    PerftCase('position3', '8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1',
+              [14, 191, 2812, 43238, 674624]),
+    PerftCase('position4', 'r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1',
+              [6, 264, 9467, 422333]),
+    PerftCase('position5', 'rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8',
+              [44, 1486, 62379, 2103487]),
+    PerftCase('position6', 'r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10',
+              [46, 2079, 89890, 3894594]),
+]
+
+# 参考局面与节点数取自 chessprogramming.org/Chinese_Chess_Perft_Results
+XIANGQI_CASES = [
+    PerftCase('startpos', 'rnbakabnr/9/1c5c1/p1p1p1p1p/9/9/P1P1P1P1P/1C5C1/9/RNBAKABNR w - - 0 1',
+              [44, 1920, 79666, 3290240]),
+    PerftCase('position2', 'r1ba1a3/4kn3/2n1b4/pNp1p1p1p/4c4/6P2/P1P2R2P/1CcC5/9/2BAKAB2 w - - 0 1',
+              [38, 1128, 43929, 1339047]),
+    PerftCase('position3', '1cbak4/9/n2a5/2p1p3p/5cp2/2n2N3/6PCP/3AB4/2C6/3A1K1N1 w - - 0 1',
+              [7, 281, 8620, 326201]),
+    PerftCase('position4', '5a3/3k5/3aR4/9/5r3/5n3/9/3A1A3/5K3/2BC2B2 w - - 0 1',
+              [25, 424, 9850, 202884]),
+    PerftCase('position5', 'CRN1k1b2/3ca4/4ba3/9/2nr5/9/9/4B4/4A4/4KA3 w - - 0 1',
+              [28, 516, 14808, 395483]),
+    PerftCase('position6', 'R1N1k1b2/9/3aba3/9/2nr5/2B6/9/4B4/4A4/4KA3 w - - 0 1',
+              [21, 364, 7626, 162837]),
+]
+
+# 变体名 -> (引擎工厂, 参考局面, 走法格式化函数)
+VARIANTS: Dict[str, tuple] = {
+    'chess': (ChessEngine, CHESS_CASES, move_to_uci),
+    'xiangqi': (CNChessEngine, XIANGQI_CASES, move_to_iccs),
+}
+
+
+def perft(position, depth: int) -> int:
+    """Count leaf nodes of the legal move tree below ``position``"""
+    if depth == 0:
+        return 1
+    moves = position.legal_moves()
+    if depth == 1:
+        return len(moves)
+    nodes = 0
+    for move in moves:
+        undo = position.make_move(move)
+        nodes += perft(position, depth - 1)
+        position.unmake_move(move, undo)
+    return nodes
+
+
+def divide(position, depth: int, format_move: Callable[[int], str] = str) -> Dict[str, int]:
+    """Per-root-move node counts, for locating move generation bugs"""
+    counts = {}
+    for move in position.legal_moves():
+        undo = position.make_move(move)
+        counts[format_move(move)] = perft(position, depth - 1)
+        position.unmake_move(move, undo)
+    return counts
+
+
+def _load(variant: str, fen: str):
+    engine_factory = VARIANTS[variant][0]
+    engine = engine_factory()
+    engine.load_fen(fen)
+    return engine.position
+
+
+def run_case(variant: str, case: PerftCase, depth: int) -> PerftResult:
+    position = _load(variant, case.fen)
+    start = time.perf_counter()
+    nodes = perft(position, depth)
+    elapsed = time.perf_counter() - start
+    expected = case.node_counts[depth - 1] if depth <= len(case.node_counts) else None
+    return PerftResult(variant, case.name, depth, nodes, expected, elapsed)
+
+
+def run_suite(variant: str = 'chess', max_depth: int = 3,
+              cases: Optional[List[PerftCase]] = None) -> List[PerftResult]:
+    """Run every reference position of ``variant`` for depths 1..max_depth"""
+    cases = VARIANTS[variant][1] if cases is None else cases
+    results = []
+    for case in cases:
+        for depth in range(1, min(max_depth, len(case.node_counts)) + 1):
+            results.append(run_case(variant, case, depth))
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Perft correctness and speed check')
+    parser.add_argument('--variant', choices=sorted(VARIANTS), default='chess')
+    parser.add_argument('--depth', type=int, default=3, help='Maximum search depth')
+    parser.add_argument('--fen', help='Run a single position instead of the reference suite')
+    parser.add_argument('--divide', action='store_true', help='Print node counts per root move')
+    args = parser.parse_args(argv)
+
+    if args.fen:
+        if args.divide:
+            format_move = VARIANTS[args.variant][2]
+            counts = divide(_load(args.variant, args.fen), args.depth, format_move)
+            for move, nodes in sorted(counts.items()):
+                print(f'{move}: {nodes}')
+            print(f'total: {sum(counts.values())}')
+            return 0
+        results = [run_case(args.variant, PerftCase('fen', args.fen, []), args.depth)]
+    else:
+        results = run_suite(args.variant, args.depth)
+
+    failed = 0
+    total_nodes = total_seconds = 0
+    for result in results:
+        status = 'ok' if result.ok else f'FAIL (expected {result.expected})'
+        print(f'{result.variant:<8} {result.name:<12} depth {result.depth}: '
+              f'{result.nodes:>10} nodes {result.seconds:8.3f}s '
+              f'{result.nodes_per_second:>12,.0f} nps  {status}')
+        failed += not result.ok
+        total_nodes += result.nodes
+        total_seconds += result.seconds
+    if total_seconds:
+        print(f'total: {total_nodes} nodes in {total_seconds:.3f}s '
+              f'({total_nodes / total_seconds:,.0f} nps)')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
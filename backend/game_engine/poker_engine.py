@@ -1,41 +1,44 @@
 from .rule_base import GameEngineBase
 from shared.protocol import GameType, PlayerColor, GameState, PlayerAction
-from typing import List, Dict
-import random
+from typing import List, Dict, Optional
+from .poker_eval import HAND_SIZES, describe, evaluate, parse_cards
 
 class PokerEngine(GameEngineBase):
-    def __init__(self):
+    def __init__(self, seed: Optional[int] = None):
         """
         初始化扑克游戏类的构造方法。
         
         本构造方法主要完成以下工作：
-        1. 调用父类的构造方法，设定游戏类型为扑克（POKER）。
+        1. 调用父类的构造方法（seed 为本局随机数种子），设定游戏类型为扑克（POKER）。
         2. 创建一副扑克牌。
         3. 初始化玩家的手牌字典，键为玩家标识，值为字符串列表表示的牌。
         4. 初始化当前的下注额为0。
         5. 初始化底池金额为0。
         6. 初始化公共牌列表，用于存放游戏中后期的公共牌。
         """
-        super().__init__(GameType.POKER)  # 调用父类构造方法，设定游戏类型
+        super().__init__(seed)  # 调用父类构造方法，创建本局的随机数流
+        self.game_type = GameType.POKER  # 设定游戏类型
         self.deck = self.create_deck()  # 创建一副扑克牌
         self.hands: Dict[str, List[str]] = {}  # 初始化玩家手牌字典
         self.current_bid = 0  # 初始化当前下注额
         self.pot = 0  # 初始化底池金额
         self.community_cards: List[str] = []  # 初始化公共牌列表
+        self.current_turn = None  # 当前行动的玩家
 
     def create_deck(self) -> List[str]:
         suits = ['S', 'H', 'D', 'C']  # 黑桃、红心、方块、梅花
         ranks = ['2', '3', '4', '5', '6', '7', '8', '9', 'T', 'J', 'Q', 'K', 'A']
         return [rank + suit for suit in suits for rank in ranks]
 
-    def initialize_game(self, players):
+    def initialize_game(self, players, seed: Optional[int] = None):
+        super().initialize_game(players, seed)  # 先换新的随机数流再洗牌
         self.deck = self.create_deck()
-        random.shuffle(self.deck)
+        self.rng.shuffle(self.deck)
         self.hands = {player.id: [] for player in players}
         self.community_cards = []
         self.pot = 0
         self.current_bid = 0
-        return super().initialize_game(players)
+        return self.get_game_state()
 
     def deal_cards(self):
         # 发牌逻辑
@@ -54,6 +57,7 @@ class PokerEngine(GameEngineBase):
         return False
 
     def apply_action(self, action: PlayerAction) -> GameState:
+        self.log_action(action)
         action_type = action.action_type
         if action_type == 'fold':
             self.handle_fold(action.player_id)
@@ -76,6 +80,36 @@ class PokerEngine(GameEngineBase):
         # 处理加注逻辑
         pass
 
+    def hand_strength(self, player_id: str) -> Optional[int]:
+        """玩家两张底牌加公共牌中最好的五张牌的牌力（越大越强），不足五张牌时为 None"""
+        cards = parse_cards(self.hands[player_id]) + parse_cards(self.community_cards)
+        if len(cards) < HAND_SIZES[0]:
+            return None  # 翻牌前还凑不出一手牌
+        return evaluate(cards)
+
+    def showdown(self) -> Optional[Dict]:
+        """摊牌比大小，平局时有多个赢家；还没人凑够五张牌时返回 None"""
+        strengths = {player_id: self.hand_strength(player_id)
+                     for player_id, cards in self.hands.items() if cards}
+        if not strengths or None in strengths.values():
+            return None
+        best = max(strengths.values())
+        return {
+            'winners': [player_id for player_id, value in strengths.items() if value == best],
+            'hands': {player_id: describe(value) for player_id, value in strengths.items()},
+        }
+
+    def initial_state(self) -> GameState:
+        """返回游戏的初始状态"""
+        return GameState(
+            game_id=self.game_id,
+            game_type=self.game_type,
+            players=self.players,
+            current_turn=None,
+            board_state={'community_cards': [], 'pot': 0, 'current_bid': 0},
+            history=[]
+        )
+
     def get_game_state(self) -> GameState:
         return GameState(
             game_id=self.game_id,
@@ -0,0 +1,140 @@
+"""Monte Carlo hold'em equity on top of the table-driven evaluator.
+
+A request is split into batches. Each batch deals all of its run-outs at
+once as a NumPy array (random keys + ``argpartition`` give sampling without
+replacement per row), builds every player's seven-card hands and ranks them
+with ``evaluate_batch``. Batches run in the shared worker pool and their
+counts are merged. When every hole card is known and the remaining run-outs
+are few (flop or later) they are enumerated exactly instead of sampled.
+
+Unknown hole cards (``None``) are dealt randomly in each run-out, which is
+what per-player decision metrics need; spectator overlays pass every hand.
+"""
+import asyncio
+import itertools
+from dataclasses import dataclass, field
+from math import comb
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .poker_eval import evaluate_batch, parse_cards
+from .workers import run_in_worker
+
+BOARD_SIZE = 5
+# 单个工作进程一次处理的发牌次数
+BATCH_SIZE = 20_000
+
+
+@dataclass
+class EquityResult:
+    iterations: int
+    wins: List[int]
+    ties: List[int]
+    shares: List[float] = field(default_factory=list)  # 平分底池按人数折算后的胜场
+    exact: bool = False
+
+    @property
+    def win(self) -> List[float]:
+        return [w / self.iterations for w in self.wins]
+
+    @property
+    def tie(self) -> List[float]:
+        return [t / self.iterations for t in self.ties]
+
+    @property
+    def equity(self) -> List[float]:
+        return [s / self.iterations for s in self.shares]
+
+    def merge(self, other: 'EquityResult') -> 'EquityResult':
+        return EquityResult(
+            self.iterations + other.iterations,
+            [a + b for a, b in zip(self.wins, other.wins)],
+            [a + b for a, b in zip(self.ties, other.ties)],
+            [a + b for a, b in zip(self.shares, other.shares)],
+            self.exact and other.exact)
+
+
+def _score(values: np.ndarray) -> EquityResult:
+    """Win/tie counts from a ``(players, run_outs)`` array of hand values"""
+    best = values.max(axis=0)
+    winners = values == best
+    winner_counts = winners.sum(axis=0)
+    wins = (winners & (winner_counts == 1)).sum(axis=1)
+    ties = (winners & (winner_counts > 1)).sum(axis=1)
+    shares = (winners / winner_counts).sum(axis=1)
+    return EquityResult(values.shape[1], wins.tolist(), ties.tolist(), shares.tolist())
+
+
+def simulate_equity(hands: Sequence[Optional[Sequence]], board: Sequence = (),
+                    iterations: int = BATCH_SIZE, seed: Optional[int] = None) -> EquityResult:
+    """Worker-process entry point: equity of each hand over random run-outs"""
+    holes = [parse_cards(hand) if hand else None for hand in hands]
+    board = parse_cards(board)
+    known = set(board) | {c for hole in holes if hole for c in hole}
+    deck = np.array([c for c in range(52) if c not in known], dtype=np.intp)
+    need = BOARD_SIZE - len(board)
+    unknown = sum(hole is None for hole in holes)
+    draw = need + 2 * unknown
+
+    exact = unknown == 0 and comb(len(deck), need) <= iterations
+    if exact and need == 0:
+        # 河牌圈公共牌已发完，只有一种结果
+        drawn = np.empty((1, 0), dtype=np.intp)
+    elif exact:
+        drawn = np.array(list(itertools.combinations(deck, need)), dtype=np.intp).reshape(-1, need)
+    else:
+        rng = np.random.default_rng(seed)
+        picks = np.argpartition(rng.random((iterations, len(deck))), draw, axis=1)[:, :draw]
+        drawn = deck[picks]
+    run_outs = drawn.shape[0]
+
+    full_board = np.hstack([np.broadcast_to(np.array(board, dtype=np.intp), (run_outs, len(board))),
+                            drawn[:, :need]])
+    values = np.empty((len(holes), run_outs), dtype=np.int32)
+    next_card = need
+    for player, hole in enumerate(holes):
+        if hole is None:
+            hole_cards = drawn[:, next_card:next_card + 2]
+            next_card += 2
+        else:
+            hole_cards = np.broadcast_to(np.array(hole, dtype=np.intp), (run_outs, 2))
+        values[player] = evaluate_batch(np.hstack([hole_cards, full_board]))
+    result = _score(values)
+    result.exact = exact
+    return result
+
+
+async def calculate_equity(hands: Sequence[Optional[Sequence]], board: Sequence = (),
+                           iterations: int = 100_000, seed: Optional[int] = None,
+                           batch_size: int = BATCH_SIZE) -> EquityResult:
+    """Split ``iterations`` run-outs across the worker pool and merge the counts"""
+    if iterations <= 0:
+        raise ValueError("iterations must be positive")
+    if batch_size <= 0:
+        raise ValueError("batch_size must be positive")
+    hands = [list(hand) if hand else None for hand in hands]
+    board = list(board)
+    need = BOARD_SIZE - len(board)
+    known = len(board) + sum(len(hand) for hand in hands if hand)
+    if all(hands) and comb(52 - known, need) <= iterations:
+        # 剩余组合不多时直接穷举
+        return await run_in_worker(simulate_equity, hands, board, iterations, seed)
+    seeds = np.random.SeedSequence(seed).spawn((iterations + batch_size - 1) // batch_size)
+    sizes = [batch_size] * (len(seeds) - 1) + [iterations - batch_size * (len(seeds) - 1)]
+    results = await asyncio.gather(*(
+        run_in_worker(simulate_equity, hands, board, size, child.generate_state(1)[0])
+        for size, child in zip(sizes, seeds)))
+    merged = results[0]
+    for result in results[1:]:
+        merged = merged.merge(result)
+    return merged
+
+
+async def engine_equity(engine, iterations: int = 100_000) -> Dict[str, Dict[str, float]]:
+    """Live win/tie/equity per player of a PokerEngine hand"""
+    player_ids = [player_id for player_id, cards in engine.hands.items() if cards]
+    result = await calculate_equity([engine.hands[player_id] for player_id in player_ids],
+                                    engine.community_cards, iterations)
+    return {player_id: {'win': result.win[i], 'tie': result.tie[i], 'equity': result.equity[i]}
+            for i, player_id in enumerate(player_ids)}
@@ -0,0 +1,229 @@
+"""Table-driven 5/6/7-card poker hand evaluator.
+
+Cards are integers ``rank * 4 + suit`` (rank 0 = '2' .. 12 = 'A', suit in
+'SHDC' order). A hand's strength is an integer in 1..7462, higher is
+better, one value per equivalence class of five-card hands.
+
+Non-flush hands are looked up by the sum of per-rank keys: the keys below
+give a distinct sum for every multiset of up to seven ranks, so the sum is
+a perfect hash into a table holding the best five-card value of that rank
+multiset (one table per hand size). Flushes are detected from the sum of
+base-8 suit keys; the flush suit's rank bitmask then indexes a 8192-entry
+flush table.
+
+The tables are generated once (a few seconds) by ``generate_tables``, which
+the app runs in the worker pool at startup, saved as ``.npy`` files in
+``POKER_TABLE_DIR`` and memory-mapped on load, so worker processes share
+the pages. ``evaluate_batch`` ranks a whole NumPy array of hands with a few
+vectorized lookups.
+"""
+import itertools
+import logging
+import numbers
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+RANKS = '23456789TJQKA'
+SUITS = 'SHDC'
+
+# 任意不超过 7 张牌的点数组合，其键值之和互不相同（同张数比较）
+RANK_KEYS = [0, 1, 5, 22, 98, 453, 2031, 8698, 22854, 83661, 262349, 636345, 1479181]
+SUIT_KEYS = [1, 8, 64, 512]
+
+HIGH_CARD, PAIR, TWO_PAIR, TRIPS, STRAIGHT, FLUSH, FULL_HOUSE, QUADS, STRAIGHT_FLUSH = range(9)
+CATEGORY_NAMES = ['high card', 'pair', 'two pair', 'three of a kind', 'straight',
+                  'flush', 'full house', 'four of a kind', 'straight flush']
+
+TABLE_VERSION = 1
+TABLE_DIR = Path(os.getenv('POKER_TABLE_DIR', Path(__file__).parent.parent.parent / 'data' / 'poker'))
+HAND_SIZES = (5, 6, 7)
+
+CARD_RANK_KEYS = np.array([RANK_KEYS[c >> 2] for c in range(52)], dtype=np.int64)
+CARD_SUIT_KEYS = np.array([SUIT_KEYS[c & 3] for c in range(52)], dtype=np.int64)
+CARD_BITS = np.array([1 << (c >> 2) for c in range(52)], dtype=np.int64)
+
+
+def card(text: str) -> int:
+    """'AS' -> 51"""
+    return RANKS.index(text[0].upper()) * 4 + SUITS.index(text[1].upper())
+
+
+def card_str(value: int) -> str:
+    return RANKS[value >> 2] + SUITS[value & 3]
+
+
+def parse_cards(cards: Iterable) -> List[int]:
+    # NumPy 整数（如胜率模拟发出的牌）也按牌编号处理
+    return [int(c) if isinstance(c, numbers.Integral) else card(c) for c in cards]
+
+
+def _straight_high(ranks: Sequence[int]) -> Optional[int]:
+    """Top rank of a five-distinct-rank straight (5-high wheel gives 3)"""
+    ranks = sorted(ranks)
+    if ranks == [0, 1, 2, 3, 12]:
+        return 3
+    if ranks[4] - ranks[0] == 4 and len(set(ranks)) == 5:
+        return ranks[4]
+    return None
+
+
+def _class_key(ranks: Sequence[int], flush: bool) -> Tuple:
+    """Sortable (category, tie-breakers) key of a five-card hand"""
+    counts: Dict[int, int] = {}
+    for rank in ranks:
+        counts[rank] = counts.get(rank, 0) + 1
+    # 按张数、再按点数从大到小排列
+    groups = sorted(counts.items(), key=lambda item: (item[1], item[0]), reverse=True)
+    shape = tuple(count for _, count in groups)
+    kickers = tuple(rank for rank, _ in groups)
+    straight = _straight_high(ranks) if len(counts) == 5 else None
+    if straight is not None:
+        return (STRAIGHT_FLUSH if flush else STRAIGHT, straight)
+    if flush:
+        return (FLUSH,) + kickers
+    category = {
+        (4, 1): QUADS, (3, 2): FULL_HOUSE, (3, 1, 1): TRIPS,
+        (2, 2, 1): TWO_PAIR, (2, 1, 1, 1): PAIR, (1, 1, 1, 1, 1): HIGH_CARD,
+    }[shape]
+    return (category,) + kickers
+
+
+def _rank_multisets(size: int) -> List[Tuple[int, ...]]:
+    """Sorted rank tuples of every multiset of ``size`` ranks with at most four of each"""
+    return [combo for combo in itertools.combinations_with_replacement(range(13), size)
+            if all(combo.count(rank) <= 4 for rank in set(combo))]
+
+
+def _five_card_values() -> Tuple[Dict[Tuple[int, ...], int], Dict[Tuple[int, ...], int]]:
+    """Values 1..7462 of every non-flush rank multiset and every flush rank set"""
+    plain = {ranks: _class_key(ranks, False) for ranks in _rank_multisets(5)}
+    flush = {ranks: _class_key(ranks, True) for ranks in itertools.combinations(range(13), 5)}
+    ordered = sorted(set(plain.values()) | set(flush.values()))
+    assert len(ordered) == 7462
+    value_of = {key: index + 1 for index, key in enumerate(ordered)}
+    return ({ranks: value_of[key] for ranks, key in plain.items()},
+            {ranks: value_of[key] for ranks, key in flush.items()})
+
+
+def build_tables() -> Dict[str, np.ndarray]:
+    """Generate all lookup tables (slow; normally done once and cached on disk)"""
+    plain5, flush5 = _five_card_values()
+    tables = {}
+    for size in HAND_SIZES:
+        multisets = _rank_multisets(size)
+        table = np.zeros(max(sum(RANK_KEYS[r] for r in ranks) for ranks in multisets) + 1,
+                         dtype=np.uint16)
+        for ranks in multisets:
+            index = sum(RANK_KEYS[r] for r in ranks)
+            if table[index]:
+                raise ValueError(f"Rank key collision for {ranks}")
+            # combinations 保持输入顺序，子组合已排好序
+            table[index] = max(plain5[sub] for sub in itertools.combinations(ranks, 5))
+        tables[f'rank{size}'] = table
+
+    flush_table = np.zeros(1 << 13, dtype=np.uint16)
+    for size in HAND_SIZES:
+        for ranks in itertools.combinations(range(13), size):
+            mask = sum(1 << r for r in ranks)
+            flush_table[mask] = max(flush5[sub] for sub in itertools.combinations(ranks, 5))
+    tables['flush'] = flush_table
+
+    # 花色键值之和 -> 满 5 张的花色，否则 -1
+    flush_suit = np.full(7 * SUIT_KEYS[-1] + 1, -1, dtype=np.int8)
+    for counts in itertools.product(range(8), repeat=4):
+        if sum(counts) <= 7:
+            suit = next((s for s, count in enumerate(counts) if count >= 5), -1)
+            flush_suit[sum(c * k for c, k in zip(counts, SUIT_KEYS))] = suit
+    tables['flush_suit'] = flush_suit
+    return tables
+
+
+class HandTables(NamedTuple):
+    rank: Dict[int, np.ndarray]  # 手牌张数 -> 点数表
+    flush: np.ndarray
+    flush_suit: np.ndarray
+
+
+_tables: Optional[HandTables] = None
+
+
+TABLE_NAMES = [f'rank{size}' for size in HAND_SIZES] + ['flush', 'flush_suit']
+
+
+def tables_exist(directory: Path = TABLE_DIR) -> bool:
+    directory = Path(directory) / f'v{TABLE_VERSION}'
+    return all((directory / f'{name}.npy').exists() for name in TABLE_NAMES)
+
+
+def generate_tables(directory: Path = TABLE_DIR) -> None:
+    """Build and save the lookup tables unless they exist (worker-process entry point)"""
+    if tables_exist(directory):
+        return
+    directory = Path(directory) / f'v{TABLE_VERSION}'
+    logger.info(f"Generating poker hand tables in {directory}")
+    directory.mkdir(parents=True, exist_ok=True)
+    for name, table in build_tables().items():
+        # 先写临时文件再改名，多个工作进程同时生成时也不会读到半个文件
+        temp = directory / f'{name}.{os.getpid()}.tmp.npy'
+        np.save(temp, table)
+        os.replace(temp, directory / f'{name}.npy')
+
+
+def load_tables(directory: Path = TABLE_DIR) -> HandTables:
+    """Memory-map the lookup tables, generating and saving them on first use"""
+    global _tables
+    if _tables is not None:
+        return _tables
+    generate_tables(directory)
+    directory = Path(directory) / f'v{TABLE_VERSION}'
+    mapped = {name: np.load(directory / f'{name}.npy', mmap_mode='r') for name in TABLE_NAMES}
+    _tables = HandTables({size: mapped[f'rank{size}'] for size in HAND_SIZES},
+                         mapped['flush'], mapped['flush_suit'])
+    return _tables
+
+
+def evaluate(cards: Sequence) -> int:
+    """Strength (1..7462, higher wins) of the best five-card hand in 5-7 cards"""
+    tables = load_tables()
+    cards = parse_cards(cards)
+    suit_sum = sum(SUIT_KEYS[c & 3] for c in cards)
+    suit = int(tables.flush_suit[suit_sum])
+    if suit >= 0:
+        mask = 0
+        for c in cards:
+            if c & 3 == suit:
+                mask |= 1 << (c >> 2)
+        return int(tables.flush[mask])
+    return int(tables.rank[len(cards)][sum(RANK_KEYS[c >> 2] for c in cards)])
+
+
+def evaluate_batch(hands) -> np.ndarray:
+    """Evaluate an ``(n_hands, hand_size)`` integer array of cards at once"""
+    tables = load_tables()
+    hands = np.asarray(hands, dtype=np.intp)
+    values = np.asarray(tables.rank[hands.shape[1]][CARD_RANK_KEYS[hands].sum(axis=1)])
+    flush_suit = tables.flush_suit[CARD_SUIT_KEYS[hands].sum(axis=1)]
+    flushes = flush_suit >= 0
+    if flushes.any():
+        flush_hands = hands[flushes]
+        in_suit = (flush_hands & 3) == flush_suit[flushes][:, np.newaxis]
+        masks = np.where(in_suit, CARD_BITS[flush_hands], 0).sum(axis=1)
+        values[flushes] = tables.flush[masks]
+    return values
+
+
+# 各牌型中最大的牌力值，用于由牌力反推牌型
+_CATEGORY_TOPS = np.cumsum([1277, 2860, 858, 858, 10, 1277, 156, 156, 10])
+
+
+def category(value: int) -> int:
+    return int(np.searchsorted(_CATEGORY_TOPS, value))
+
+
+def describe(value: int) -> str:
+    return CATEGORY_NAMES[category(value)]
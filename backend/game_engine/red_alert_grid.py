@@ -0,0 +1,66 @@
+"""Spatial hash of unit positions for the Red Alert engine.
+
+The map is cut into square cells of ``cell_size`` tiles, each holding the
+ids of the units inside it. Moving a unit touches at most two cells and a
+range query only visits the cells its square overlaps, so its cost depends
+on how crowded the neighbourhood is, not on the number of units on the map.
+Exact tile occupancy is kept alongside in a position -> id dict.
+"""
+from typing import Dict, Iterator, Optional, Set, Tuple
+
+Position = Tuple[int, int]  # (row, col)
+
+DEFAULT_CELL_SIZE = 4
+
+
+class SpatialHash:
+    def __init__(self, cell_size: int = DEFAULT_CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells: Dict[Position, Set[str]] = {}
+        self.occupants: Dict[Position, str] = {}  # 每格最多一个单位
+        self.positions: Dict[str, Position] = {}
+
+    def _cell(self, position: Position) -> Position:
+        return position[0] // self.cell_size, position[1] // self.cell_size
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def __contains__(self, unit_id: str) -> bool:
+        return unit_id in self.positions
+
+    def at(self, position: Position) -> Optional[str]:
+        """Id of the unit standing on ``position``"""
+        return self.occupants.get(position)
+
+    def insert(self, unit_id: str, position: Position) -> None:
+        if position in self.occupants:
+            raise ValueError(f"Tile {position} is occupied by {self.occupants[position]}")
+        self.positions[unit_id] = position
+        self.occupants[position] = unit_id
+        self.cells.setdefault(self._cell(position), set()).add(unit_id)
+
+    def remove(self, unit_id: str) -> None:
+        position = self.positions.pop(unit_id)
+        del self.occupants[position]
+        cell = self._cell(position)
+        self.cells[cell].discard(unit_id)
+        if not self.cells[cell]:
+            del self.cells[cell]
+
+    def move(self, unit_id: str, position: Position) -> None:
+        self.remove(unit_id)
+        self.insert(unit_id, position)
+
+    def in_range(self, position: Position, radius: int) -> Iterator[Tuple[str, int]]:
+        """(unit id, distance) of units within ``radius`` tiles (Chebyshev distance)"""
+        row, col = position
+        top, left = self._cell((row - radius, col - radius))
+        bottom, right = self._cell((row + radius, col + radius))
+        for cell_row in range(top, bottom + 1):
+            for cell_col in range(left, right + 1):
+                for unit_id in self.cells.get((cell_row, cell_col), ()):
+                    unit_row, unit_col = self.positions[unit_id]
+                    distance = max(abs(unit_row - row), abs(unit_col - col))
+                    if distance <= radius:
+                        yield unit_id, distance
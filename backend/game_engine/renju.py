@@ -0,0 +1,96 @@
+"""Renju forbidden-point detection for black.
+
+Under renju rules black may not play a point that makes an overline (six
+or more), two fours, or two open threes at once, unless the same move makes
+exactly five. The verdict for an empty cell depends only on the four lines
+through it, so results are cached per cell and a move invalidates just the
+cells on the four lines it touches.
+
+Simplification: a three counts as open whenever one more stone could turn
+it into a straight four; the recursive check that this completing point is
+not itself forbidden is not applied.
+"""
+from typing import Dict, Hashable, List, Optional
+
+from .gomoku_patterns import Cell, ThreatIndex, scan_line
+
+OVERLINE = 'overline'
+DOUBLE_FOUR = 'double_four'
+DOUBLE_THREE = 'double_three'
+
+
+class RenjuRules:
+    def __init__(self, index: ThreatIndex, black: Hashable):
+        self.index = index
+        self.black = black
+        self.cache: Dict[Cell, Optional[str]] = {}
+
+    def invalidate(self, x: int, y: int) -> None:
+        """Drop cached verdicts for every cell on the lines through ``(x, y)``"""
+        index = self.index
+        for line_id, _ in index.cell_lines[(x, y)]:
+            for cell in index.line_cells[line_id]:
+                self.cache.pop(cell, None)
+
+    def clear(self) -> None:
+        self.cache.clear()
+
+    def is_forbidden(self, x: int, y: int) -> bool:
+        return self.forbidden_reason(x, y) is not None
+
+    def forbidden_reason(self, x: int, y: int) -> Optional[str]:
+        """Why black may not play on empty ``(x, y)``, or None if allowed"""
+        cell = (x, y)
+        if cell not in self.cache:
+            self.cache[cell] = self._evaluate(cell)
+        return self.cache[cell]
+
+    def forbidden_cells(self) -> List[Cell]:
+        index = self.index
+        return [(x, y) for x in range(index.size) for y in range(index.size)
+                if self._is_empty((x, y)) and self.forbidden_reason(x, y)]
+
+    def _is_empty(self, cell: Cell) -> bool:
+        line_id, position = self.index.cell_lines[cell][0]
+        return self.index.values[line_id][position] is None
+
+    def _evaluate(self, cell: Cell) -> Optional[str]:
+        index = self.index
+        black = self.black
+        win_length = index.win_length
+        fours = threes = 0
+        overline = False
+        for line_id, position in index.cell_lines[cell]:
+            values = index.values[line_id]
+            before = index.states.get((line_id, black))
+            values[position] = black
+            try:
+                runs, wins, _, open_fours = scan_line(values, black, win_length, exact=True)
+            finally:
+                values[position] = None
+
+            run = next(r for r in runs if r.start <= position < r.start + r.length)
+            if run.length == win_length:
+                return None  # 成五优先，不算禁手
+            if run.length > win_length:
+                overline = True
+                continue
+
+            old_wins = set(before.wins) if before else set()
+            new_wins = [w for w in wins if w not in old_wins]
+            if new_wins:
+                straight = (run.length == win_length - 1 and len(new_wins) == 2 and
+                            set(new_wins) == {run.start - 1, run.start + run.length})
+                fours += 1 if straight else len(new_wins)
+                continue
+            old_open_fours = set(before.open_fours) if before else set()
+            if any(w not in old_open_fours for w in open_fours):
+                threes += 1
+
+        if overline:
+            return OVERLINE
+        if fours >= 2:
+            return DOUBLE_FOUR
+        if threes >= 2:
+            return DOUBLE_THREE
+        return None
@@ -1,16 +1,78 @@
 from abc import ABC, abstractmethod
-from typing import Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Optional
 import logging
+import random
+
+class MoveRecord:
+    """Reversible record of one applied action.
+
+    ``undo`` holds only what the engine needs to reverse the action (captured
+    piece, previous rights, previous clocks), never a copy of the board.
+    """
+    __slots__ = ('action', 'undo')
+
+    def __init__(self, action: Any, undo: Any):
+        self.action = action
+        self.undo = undo
 
 class GameEngineBase(ABC):
     """Base class for all game engines implementations"""
+
+    # 实现了 unmake_record/remake_record 的引擎设为 True
+    supports_undo = False
     
-    def __init__(self):
+    def __init__(self, seed: Optional[int] = None):
         self.logger = logging.getLogger(self.__class__.__name__)
+        self.game_id = None
         self.players = []
         self.current_player = 0
         self.game_state = {}
         self.history = []
+        self.journal: List[MoveRecord] = []
+        self.redo_stack: List[MoveRecord] = []
+        # 每局独立的随机数流：种子加动作记录即可复现整局
+        self.action_log: List[Any] = []
+        self.rng_started = False
+        self.reseed(seed)
+
+    def reseed(self, seed: Optional[int] = None) -> int:
+        """Start a fresh RNG stream for this game and return its seed"""
+        if seed is None:
+            seed = random.SystemRandom().getrandbits(63)
+        self.seed = seed
+        self.rng = random.Random(seed)
+        return seed
+
+    def start_rng(self, seed: Optional[int] = None) -> int:
+        """Reseed for a new game.
+
+        The constructor seed covers the first game; later games get a fresh
+        seed unless one is given.
+        """
+        if seed is not None or self.rng_started:
+            self.reseed(seed)
+        self.rng_started = True
+        return self.seed
+
+    def initialize_game(self, players, seed: Optional[int] = None) -> Any:
+        """Seat ``players`` and return the opening state; engines deal after this"""
+        self.start_rng(seed)
+        self.players = list(players)
+        self.action_log.clear()
+        return self.get_game_state()
+
+    @classmethod
+    def replay(cls, seed: int, players, actions: Iterable[Any], **options) -> 'GameEngineBase':
+        """Rebuild a game from its seed and the logged actions"""
+        engine = cls(**options)
+        engine.initialize_game(players, seed=seed)
+        for action in actions:
+            engine.apply_action(action)
+        return engine
+
+    def log_action(self, action: Any) -> None:
+        """Record an applied action for ``replay``"""
+        self.action_log.append(action)
         
     @abstractmethod
     def initial_state(self) -> dict:
@@ -56,8 +118,56 @@ class GameEngineBase(ABC):
         """Get complete game history"""
         return self.history.copy()
         
+    def record_move(self, action: Any, undo: Any) -> None:
+        """Append a reversible record of an applied action to the undo journal"""
+        self.journal.append(MoveRecord(action, undo))
+        self.redo_stack.clear()
+
+    def undo(self) -> bool:
+        """Take back the last journaled action (False if there is none or the engine does not journal)"""
+        if not self.supports_undo or not self.journal:
+            return False
+        record = self.journal.pop()
+        self.unmake_record(record)
+        self.redo_stack.append(record)
+        return True
+
+    def redo(self) -> bool:
+        """Replay the last action taken back by ``undo``"""
+        if not self.supports_undo or not self.redo_stack:
+            return False
+        record = self.redo_stack.pop()
+        record.undo = self.remake_record(record)
+        self.journal.append(record)
+        return True
+
+    def seek(self, ply: int) -> bool:
+        """Move to the position after ``ply`` journaled actions"""
+        if not self.supports_undo or ply < 0 or ply > len(self.journal) + len(self.redo_stack):
+            return False
+        while len(self.journal) > ply:
+            self.undo()
+        while len(self.journal) < ply:
+            self.redo()
+        return True
+
+    def unmake_record(self, record: MoveRecord) -> None:
+        """Reverse ``record``; only called when ``supports_undo`` is set"""
+        pass
+
+    def remake_record(self, record: MoveRecord) -> Any:
+        """Re-apply ``record.action`` and return its new undo data"""
+        pass
+
     def save_state(self) -> None:
-        """Save current game state to history"""
+        """Save current game state to history.
+
+        Journaled engines only note the ply and get back to it with ``seek``;
+        the others keep a full snapshot.
+        """
+        if self.supports_undo:
+            self.history.append({'ply': len(self.journal)})
+            return
         self.history.append({
             'state': self.game_state.copy(),
             'players': self.players.copy(),
@@ -69,6 +179,8 @@ class GameEngineBase(ABC):
         if state_index < 0 or state_index >= len(self.history):
             return False
         saved_state = self.history[state_index]
+        if 'ply' in saved_state:
+            return self.seek(saved_state['ply'])
         self.game_state = saved_state['state'].copy()
         self.players = saved_state['players'].copy()
         self.current_player = saved_state['current_player']
@@ -1,151 +1,262 @@
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from backend.game_engine.rule_base import GameEngineBase
-import random
+from backend.game_engine.mahjong_tiles import (
+    COPIES, SUITS, TILE_KINDS, is_winning_hand, suit_index, tile_index, tile_name, to_tiles, winning_tiles,
+)
+from backend.game_engine.mahjong_shanten import discard_options, effective_tiles, shanten
+from backend.game_engine.mahjong_state import CLAIM_PRIORITY, HAND_SIZE, SEATS, MahjongState, deal
+from backend.game_engine.mahjong_claims import (
+    CLAIM_DEADLINE, AskFunction, ClaimAnswer, claim_kinds, collect_claims,
+)
 
 class SichuanMahjongEngine(GameEngineBase):
-    """Sichuan Mahjong game engine implementation"""
+    """Sichuan Mahjong game engine implementation.
+
+    The game lives in an immutable ``MahjongState``; every action replaces
+    ``self.state`` with a new one, so states handed out earlier stay valid.
+    """
     
-    def __init__(self):
+    def __init__(self, seed: Optional[int] = None):
         """
         Initializes the game environment, including tile layout, player information, and game status.
+        ``seed`` fixes the game's RNG stream so the wall can be rebuilt for replays.
         """
-        super().__init__()  # Initialize the parent class constructor, if any
+        self.state = self.initial_state()  # Immutable game state; must exist before the base sets current_player
+        super().__init__(seed)  # Initialize the parent class constructor and the game's RNG
         self.tiles = self._initialize_tiles()  # Initialize and get the layout of all tiles
         self.players = []  # Initialize the list of players
-        self.current_player = 0  # Set the starting player index to 0
-        self.discards = []  # Initialize the discard pile list
-        self.wall = []  # Initialize the wall (remaining tiles that have not been drawn)
-        self.wind = 1  # East wind starts, indicating the starting wind direction
-        self.round = 1  # The first round starts
-        
-    def _initialize_tiles(self) -> List[str]:
-        """Initialize the standard Sichuan Mahjong tile set"""
-        # Define the three suits of Mahjong tiles
-        suits = ['bamboo', 'character', 'dot']
-        # Define the honor tiles of Mahjong
-        honors = ['east', 'south', 'west', 'north', 'red', 'green', 'white']
-        
-        # Create numbered tiles (1-9) for each suit
-        tiles = []
-        for suit in suits:
-            # Each suit has 9 numbered tiles, with 4 of each tile
-            tiles.extend([f'{suit}_{i}' for i in range(1, 10)] * 4)
-            
-        # Create honor tiles
-        # There are 7 honor tiles, with 4 of each tile
-        tiles.extend([f'honor_{honor}' for honor in honors] * 4)
-        
-        # Add flower tiles (8 total)
-        # There are 8 flower tiles, representing different flowers
-        tiles.extend([f'flower_{i}' for i in range(1, 9)])
-        
-        # Return the complete set of tiles
-        return tiles
+
+    def _initialize_tiles(self) -> List[int]:
+        """Initialize the Sichuan Mahjong tile set: three suits, no honors or flowers"""
+        # Each of the 27 tile kinds (bamboo, character, dot 1-9) has 4 copies
+        return [tile for tile in range(TILE_KINDS) for _ in range(COPIES)]
     
-    def start_game(self, players: List[str]) -> Dict:
+    def start_game(self, players: List[str], seed: Optional[int] = None) -> Dict:
         """Initialize a new game with the given players"""
-        if len(players) != 4:
+        if len(players) != SEATS:
             raise ValueError("Sichuan Mahjong requires exactly 4 players")
             
-        self.players = players
-        self.wall = self._shuffle_tiles()
-        self._deal_initial_tiles()
+        self.start_rng(seed)  # Each game shuffles from its own seeded stream
+        self.action_log.clear()
+        self.players = list(players)
+        self.state = deal(self.players, self._shuffle_tiles())
         
         return {
             'status': 'started',
+            'seed': self.seed,
             'players': self.players,
             'current_player': self.players[self.current_player],
-            'wall_count': len(self.wall)
+            'wall_count': self.state.wall_count
         }
+
+    def initialize_game(self, players, seed: Optional[int] = None) -> Dict:
+        self.start_game([getattr(player, 'id', player) for player in players], seed)
+        return self.get_game_state()
         
-    def _shuffle_tiles(self) -> List[str]:
+    def _shuffle_tiles(self) -> List[int]:
         """Shuffle the tiles to create the wall"""
-        return random.sample(self.tiles, len(self.tiles))
-        
-    def _deal_initial_tiles(self):
-        """Deal initial 13 tiles to each player"""
-        for _ in range(13):
-            for player in range(4):
-                self.players[player].append(self.wall.pop())
+        return self.rng.sample(self.tiles, len(self.tiles))
+
+    # 以下属性都是当前状态的只读视图
+    @property
+    def current_player(self) -> int:
+        return self.state.current_player
+
+    @current_player.setter
+    def current_player(self, seat: int) -> None:
+        self.state = self.state._replace(current_player=seat)
+
+    @property
+    def hands(self) -> Dict[str, Tuple[int, ...]]:
+        """Concealed tiles of each player as 27-slot counts"""
+        return dict(zip(self.state.players, self.state.hands))
+
+    @property
+    def melds(self) -> Dict[str, Tuple[Tuple[str, int], ...]]:
+        """Exposed (kind, tile) melds of each player"""
+        return dict(zip(self.state.players, self.state.melds))
+
+    @property
+    def missing_suits(self) -> Dict[str, Optional[int]]:
+        """Suit each player declared missing (定缺)"""
+        return dict(zip(self.state.players, self.state.missing_suits))
+
+    @property
+    def discards(self) -> Tuple[int, ...]:
+        return self.state.discards
+
+    @property
+    def wall(self) -> Tuple[int, ...]:
+        """Tiles that have not been drawn yet"""
+        return self.state.wall[:self.state.wall_count]
+
+    @property
+    def wind(self) -> int:
+        return self.state.wind
+
+    @property
+    def round(self) -> int:
+        return self.state.round
+
+    def declare_missing_suit(self, player: str, suit) -> None:
+        """Declare the suit the player will not win with (定缺)"""
+        self.apply_action({'type': 'declare', 'player': player, 'suit': suit})
                 
     def draw_tile(self, player: str) -> Optional[str]:
-        """Player draws a tile from the wall"""
-        if player != self.players[self.current_player]:
-            raise ValueError("Not your turn")
-            
-        if not self.wall:
+        """Player draws a tile from the wall (None once the wall is empty)"""
+        tile = self.state.next_tile
+        if tile is None:
             return None
-            
-        tile = self.wall.pop()
-        self.players[self.current_player].append(tile)
-        return tile
+        self.apply_action({'type': 'draw', 'player': player})
+        return tile_name(tile)
         
-    def discard_tile(self, player: str, tile: str):
+    def discard_tile(self, player: str, tile):
         """Player discards a tile"""
-        if player != self.players[self.current_player]:
-            raise ValueError("Not your turn")
-            
-        if tile not in self.players[self.current_player]:
-            raise ValueError("Tile not in player's hand")
-            
-        self.players[self.current_player].remove(tile)
-        self.discards.append(tile)
-        self.current_player = (self.current_player + 1) % 4
+        self.apply_action({'type': 'discard', 'player': player, 'tile': tile})
+
+    def pass_claims(self) -> None:
+        """Close the claim window on the last discard without a claim"""
+        self.apply_action({'type': 'pass'})
+
+    def claim_options(self, player: str) -> List[str]:
+        """Claims (hu, gang, peng) the player may make on the last discard"""
+        return claim_kinds(self.state, self.state.seat(player))
+
+    async def collect_claims(self, ask: AskFunction,
+                             timeout: float = CLAIM_DEADLINE) -> Tuple[Optional[Dict], List[ClaimAnswer]]:
+        """Ask every player who can claim the last discard at once and apply the winning claim"""
+        return await collect_claims(self, ask, timeout)
         
-    def check_win(self, player: str) -> bool:
-        """Check if player has a winning hand"""
-        # Basic winning condition check
-        hand = self.players[self.players.index(player)]
-        return len(hand) == 14 and self._is_winning_hand(hand)
+    def check_win(self, player: str, tile=None) -> bool:
+        """Check if player has a winning hand, optionally with a claimed ``tile`` added"""
+        hand = self.hands[player]
+        if tile is not None:
+            hand = list(hand)
+            hand[tile_index(tile)] += 1
+        return self._is_winning_hand(player, hand)
         
-    def _is_winning_hand(self, hand: List[str]) -> bool:
+    def _is_winning_hand(self, player: str, hand: List[int]) -> bool:
         """Check if hand meets Sichuan Mahjong winning conditions"""
-        # TODO: Implement complex Sichuan Mahjong winning logic
-        return True
+        melds = [tile for _, tile in self.melds[player]]
+        return is_winning_hand(hand, melds, self.missing_suits[player])
+
+    def waiting_tiles(self, player: str) -> List[str]:
+        """Tiles that would complete the player's hand (empty unless ready / 听牌)"""
+        melds = [tile for _, tile in self.melds[player]]
+        return [tile_name(tile) for tile in
+                winning_tiles(self.hands[player], melds, self.missing_suits[player])]
+
+    def _visible_tiles(self, player: str) -> List[int]:
+        """Counts of the tiles a player can see: own hand, discards and exposed melds"""
+        visible = list(self.hands[player])
+        for tile in self.discards:
+            visible[tile] += 1
+        for melds in self.melds.values():
+            for kind, tile in melds:
+                visible[tile] += 4 if kind == 'gang' else 3
+        return [min(count, COPIES) for count in visible]
+
+    def shanten(self, player: str) -> int:
+        """Tiles the player is away from ready (0 = 听牌, -1 = winning hand)"""
+        melds = [tile for _, tile in self.melds[player]]
+        return shanten(self.hands[player], melds, self.missing_suits[player])
+
+    def effective_tiles(self, player: str) -> List[Tuple[str, int]]:
+        """(tile, copies still unseen) of each draw that improves a 13-tile hand"""
+        melds = [tile for _, tile in self.melds[player]]
+        return [(tile_name(tile), left) for tile, left in
+                effective_tiles(self.hands[player], melds, self.missing_suits[player],
+                                self._visible_tiles(player))]
+
+    def discard_hints(self, player: str) -> List[Dict]:
+        """Shanten and effective tiles after each possible discard, best first"""
+        melds = [tile for _, tile in self.melds[player]]
+        options = discard_options(self.hands[player], melds, self.missing_suits[player],
+                                  self._visible_tiles(player))
+        return [{'tile': tile_name(option.tile), 'shanten': option.shanten,
+                 'effective': [(tile_name(tile), left) for tile, left in option.effective],
+                 'effective_count': option.count}
+                for option in options]
+
+    def get_hand(self, player: str) -> List[str]:
+        return to_tiles(self.hands[player])
+
+    def get_player_view(self, player: str) -> Dict:
+        """Public game state plus the player's own hand and missing suit"""
+        view = self.get_game_state()
+        missing_suit = self.missing_suits[player]
+        view.update(player_id=player, hand=self.get_hand(player),
+                    missing_suit=None if missing_suit is None else SUITS[missing_suit])
+        return view
         
     def get_game_state(self) -> Dict:
         """Return current game state"""
         return {
             'players': self.players,
             'current_player': self.players[self.current_player],
-            'discards': self.discards,
-            'wall_count': len(self.wall),
+            'hand_sizes': {player: sum(hand) for player, hand in self.hands.items()},
+            'melds': {player: [(kind, tile_name(tile)) for kind, tile in melds]
+                      for player, melds in self.melds.items()},
+            'discards': [tile_name(tile) for tile in self.discards],
+            'wall_count': self.state.wall_count,
+            'pending_discard': None if self.state.pending_discard is None else tile_name(self.state.pending_discard),
+            'winners': [self.players[seat] for seat in self.state.winners],
             'wind': self.wind,
             'round': self.round
         }
 
-    def initial_state(self) -> dict:
+    def initial_state(self) -> MahjongState:
         """Generate initial game state"""
-        return {
-            'players': [],
-            'current_player': 0,
-            'discards': [],
-            'wall': [],
-            'wind': 1,
-            'round': 1
-        }
+        return MahjongState()
 
-    def validate_action(self, action: str, state: dict) -> bool:
-        """Validate if action is legal"""
-        action_type = action.get('type')
-        if action_type == 'draw':
-            return state['current_player'] == action['player']
-        elif action_type == 'discard':
-            return (state['current_player'] == action['player'] and
-                    action['tile'] in state['players'][state['current_player']])
+    def validate_action(self, action: dict, state: Optional[MahjongState] = None) -> bool:
+        """Validate if action is legal in ``state`` (the current one by default)"""
+        state = self.state if state is None else state
+        try:
+            if action['type'] == 'declare':
+                seat = state.seat(action['player'])
+                return state.missing_suits[seat] is None and suit_index(action['suit']) in range(len(SUITS))
+            if action['type'] in CLAIM_PRIORITY:
+                # 碰杠胡不按轮次，认领的是刚打出的那张牌
+                return action['type'] in claim_kinds(state, state.seat(action['player']))
+            if action['type'] == 'pass':
+                return state.pending_discard is not None
+            seat = state.seat(action['player'])
+            if seat != state.current_player or seat in state.winners:
+                return False
+            if action['type'] == 'draw':
+                # 认领窗口关闭后才能摸牌，且手里必须是 13 张（副露按三张计）
+                return (state.pending_discard is None and state.wall_count > 0
+                        and state.tile_count(seat) == HAND_SIZE)
+            if action['type'] == 'discard':
+                return (state.tile_count(seat) == HAND_SIZE + 1
+                        and state.hands[seat][tile_index(action['tile'])] > 0)
+        except (KeyError, IndexError, TypeError, ValueError):
+            return False
         return False
 
-    def apply_action(self, action: str, state: dict) -> dict:
-        """Apply action and return new game state"""
-        new_state = state.copy()
+    def apply_action(self, action: dict, state: Optional[MahjongState] = None) -> MahjongState:
+        """Apply action and return the new game state.
+
+        With an explicit ``state`` this is a pure function: the given state
+        is left untouched and the engine does not change. Without one the
+        action is played on the engine's own game and logged for replay.
+        """
+        if not self.validate_action(action, state):
+            raise ValueError(f"Illegal action: {action}")
+        if state is not None:
+            return self._next_state(action, state)
+        self.log_action(action)
+        self.state = self._next_state(action, self.state)
+        return self.state
+
+    def _next_state(self, action: dict, state: MahjongState) -> MahjongState:
+        if action['type'] == 'declare':
+            return state.declare_missing(action['player'], action['suit'])
+        if action['type'] in CLAIM_PRIORITY:
+            return state.claim(action['player'], action['type'])
+        if action['type'] == 'pass':
+            return state.pass_claims()
         if action['type'] == 'draw':
-            if new_state['wall']:
-                tile = new_state['wall'].pop()
-                new_state['players'][new_state['current_player']].append(tile)
-        elif action['type'] == 'discard':
-            tile = action['tile']
-            player_hand = new_state['players'][new_state['current_player']]
-            player_hand.remove(tile)
-            new_state['discards'].append(tile)
-            new_state['current_player'] = (new_state['current_player'] + 1) % 4
-        return new_state
+            return state.draw()
+        return state.discard(action['tile'])
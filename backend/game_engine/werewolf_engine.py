@@ -1,120 +1,367 @@
 from .rule_base import GameEngineBase
 from shared.protocol import GameType, GameState, PlayerAction
-from typing import List, Dict
-import random
+from typing import Any, Dict, Iterable, List, Optional
+from collections import Counter
+from .werewolf_events import (
+    DAWN, DISCUSSION, ENDED, EXILE, HOST, HUNTER, NEXT_PHASE, NIGHT, PUBLIC, SEER, VILLAGER,
+    VILLAGE_TEAM, VOTE, WEREWOLF, WITCH, WOLF_TEAM, WOLVES, Event, team_of,
+    ROLE_ASSIGNED, PHASE_STARTED, KILL_CHOSEN, SEER_CHECKED, WITCH_SAVED, WITCH_POISONED,
+    PLAYER_DIED, SHOT_ALLOWED, HUNTER_SHOT, SPOKE, VOTED, EXILED, GAME_OVER,
+)
+from .werewolf_views import PlayerView, ViewCache
+from .werewolf_night import NIGHT_DEADLINE, AskFunction, NightAction, collect_night_actions
 
 class WerewolfEngine(GameEngineBase):
-    def __init__(self):
+    def __init__(self, seed: Optional[int] = None):
         """
         初始化狼人杀游戏对象。
-        
-        该构造函数设置了游戏的基本属性，包括游戏类型、角色列表、存活玩家列表、游戏阶段，
-        以及投票和死亡玩家的情况。
+
+        游戏状态由事件日志驱动：每个动作先生成事件追加到 events，再由对应的处理函数
+        增量更新派生状态（角色表、存活玩家、票数统计等），重放事件即可完整还原对局。
+        seed 为本局随机数种子，用于复现角色分配。
         """
-        # 初始化游戏类型为狼人杀
-        super().__init__(GameType.WEREWOLF)
-        
-        # 初始化角色列表为空，用于存储游戏中所有角色
-        self.roles = []
-        
-        # 初始化存活玩家列表为空，用于存储当前还存活的玩家
-        self.alive_players = []
-        
-        # 初始化游戏阶段为夜晚，表示游戏开始时总是处于夜晚阶段
-        self.night_phase = True
-        
-        # 初始化投票情况为空字典，键为玩家编号，值为该玩家投票给其他玩家的列表
-        self.votes: Dict[str, List[str]] = {}
-        
-        # 初始化死亡玩家列表为空，用于存储游戏中已经死亡的玩家
-        self.dead_players = []
-
-    def initialize_game(self, players):
-        self.roles = self.assign_roles(len(players))
-        self.alive_players = [player.id for player in players]
-        self.votes = {}
-        self.dead_players = []
-        self.night_phase = True
-        return super().initialize_game(players)
+        # 初始化本局的随机数流，游戏类型为狼人杀
+        super().__init__(seed)
+        self.game_type = GameType.WEREWOLF
+        self.events: List[Event] = []
+        self.views = ViewCache(self)  # 每个玩家可见的信息，按事件失效、惰性重建
+        self._reset_derived()
+
+    def _reset_derived(self):
+        """清空由事件派生的全部状态"""
+        # 玩家 id -> 角色，分配后不再变化
+        self.roles: Dict[str, str] = {}
+
+        # 存活玩家按座位顺序排列，另用集合做成员判断
+        self.alive_players: List[str] = []
+        self._alive = set()
+        self.team_counts: Counter = Counter()  # 各阵营存活人数
+
+        self.phase = NIGHT
+        self.day = 1
+
+        # 投票：每人当前投给谁，以及按目标的实时票数
+        self.votes: Dict[str, str] = {}
+        self.vote_tally: Counter = Counter()
+
+        # 夜间：狼人的刀口选择与票数、预言家查验、女巫用药
+        self.kill_choices: Dict[str, str] = {}
+        self.kill_tally: Counter = Counter()
+        self.seer_checked_tonight = False
+        self.saved: Optional[str] = None
+        self.poisoned: Optional[str] = None
+        self.potions = {'save': True, 'poison': True}
+        self.checks: Dict[str, str] = {}  # 查验目标 -> 阵营
+
+        # 死亡玩家列表，按死亡顺序
+        self.dead_players: List[str] = []
+        self.pending_shot: Optional[str] = None  # 可以开枪的猎人
+        self.winner: Optional[str] = None
+
+        # 当前行动的玩家
+        self.current_turn = None
+        self.views.reset()
+
+    @property
+    def night_phase(self) -> bool:
+        return self.phase == NIGHT
+
+    def initialize_game(self, players, seed: Optional[int] = None):
+        super().initialize_game(players, seed)  # 先换新的随机数流再分配角色
+        self.events = []
+        self._reset_derived()
+        player_ids = [getattr(player, 'id', player) for player in players]
+        for player_id, role in zip(player_ids, self.assign_roles(len(player_ids))):
+            # 狼人互相知道身份，其余角色只有本人知道
+            self._emit(ROLE_ASSIGNED, actor=player_id, data={'role': role},
+                       audience=WOLVES if role == WEREWOLF else player_id)
+        self._emit(PHASE_STARTED, data={'phase': NIGHT})
+        return self.get_game_state()
 
     def assign_roles(self, player_count) -> List[str]:
         """
         根据玩家数量分配狼人杀游戏中的角色。
-    
+
         参数:
         player_count -- 参与游戏的玩家数量
-    
+
         返回:
         一个打乱顺序的角色列表，列表长度等于玩家数量。
         """
         # 基本角色分配：2狼人，1预言家，1女巫，1猎人，其余村民
-        roles = ['werewolf'] * 2 + ['seer', 'witch', 'hunter']
+        roles = [WEREWOLF] * 2 + [SEER, WITCH, HUNTER]
         # 根据玩家数量补充村民角色，确保角色总数与玩家数量一致
-        roles += ['villager'] * (player_count - len(roles))
+        roles += [VILLAGER] * (player_count - len(roles))
         # 打乱角色顺序以随机分配
-        random.shuffle(roles)
+        self.rng.shuffle(roles)
         # 返回打乱顺序后的角色列表
         return roles
 
-    def validate_action(self, action: PlayerAction) -> bool:
+    # ---- 事件 ----
+
+    def _emit(self, kind: str, actor: Optional[str] = None, target: Optional[str] = None,
+              data: Optional[Dict[str, Any]] = None, audience: str = PUBLIC) -> Event:
+        event = Event(len(self.events), self.day, self.phase, kind, actor, target, data, audience)
+        self.events.append(event)
+        self._apply_event(event)
+        return event
+
+    def _apply_event(self, event: Event) -> None:
+        handler = self._event_handlers.get(event.kind)
+        if handler:
+            handler(self, event)
+        self.views.on_event(event)
+
+    def load_events(self, events: Iterable) -> None:
+        """Rebuild the game by folding a stored event log"""
+        self._reset_derived()
+        self.events = []
+        for event in events:
+            if isinstance(event, dict):
+                event = Event(**event)
+            self.events.append(event)
+            self._apply_event(event)
+
+    def _on_role_assigned(self, event: Event):
+        role = event.data['role']
+        self.roles[event.actor] = role
+        self.alive_players.append(event.actor)
+        self._alive.add(event.actor)
+        self.team_counts[team_of(role)] += 1
+
+    def _on_phase_started(self, event: Event):
+        phase = event.data['phase']
+        if phase == NIGHT and self.phase == EXILE:
+            self.day += 1
+        self.phase = phase
+        self.pending_shot = None
+        if phase == NIGHT:
+            self.kill_choices.clear()
+            self.kill_tally.clear()
+            self.seer_checked_tonight = False
+            self.saved = self.poisoned = None
+        elif phase == VOTE:
+            self.votes.clear()
+            self.vote_tally.clear()
+
+    def _on_kill_chosen(self, event: Event):
+        previous = self.kill_choices.get(event.actor)
+        if previous is not None:
+            self.kill_tally[previous] -= 1
+        self.kill_choices[event.actor] = event.target
+        self.kill_tally[event.target] += 1
+
+    def _on_seer_checked(self, event: Event):
+        self.seer_checked_tonight = True
+        self.checks[event.target] = event.data['team']
+
+    def _on_witch_saved(self, event: Event):
+        self.potions['save'] = False
+        self.saved = event.target
+
+    def _on_witch_poisoned(self, event: Event):
+        self.potions['poison'] = False
+        self.poisoned = event.target
+
+    def _on_player_died(self, event: Event):
+        player_id = event.target
+        self.alive_players.remove(player_id)
+        self._alive.discard(player_id)
+        self.dead_players.append(player_id)
+        self.team_counts[team_of(self.roles[player_id])] -= 1
+
+    def _on_shot_allowed(self, event: Event):
+        self.pending_shot = event.target
+
+    def _on_hunter_shot(self, event: Event):
+        self.pending_shot = None
+
+    def _on_voted(self, event: Event):
+        previous = self.votes.get(event.actor)
+        if previous is not None:
+            self.vote_tally[previous] -= 1
+        self.votes[event.actor] = event.target
+        self.vote_tally[event.target] += 1
+
+    def _on_game_over(self, event: Event):
+        self.winner = event.data['winner']
+        self.phase = ENDED
+
+    _event_handlers = {
+        ROLE_ASSIGNED: _on_role_assigned,
+        PHASE_STARTED: _on_phase_started,
+        KILL_CHOSEN: _on_kill_chosen,
+        SEER_CHECKED: _on_seer_checked,
+        WITCH_SAVED: _on_witch_saved,
+        WITCH_POISONED: _on_witch_poisoned,
+        PLAYER_DIED: _on_player_died,
+        SHOT_ALLOWED: _on_shot_allowed,
+        HUNTER_SHOT: _on_hunter_shot,
+        VOTED: _on_voted,
+        GAME_OVER: _on_game_over,
+    }
+
+    # ---- 动作 ----
+
+    def is_alive(self, player_id: str) -> bool:
+        return player_id in self._alive
+
+    def validate_action(self, action: PlayerAction, state: dict = None) -> bool:
+        if self.phase == ENDED:
+            return False
         action_type = action.action_type
+        if action_type == 'advance':
+            return action.player_id == HOST
+        if action.player_id not in self.roles:
+            return False
+        target = action.action_data.get('target')
+        if action_type == 'use_ability' and action.action_data.get('ability') == 'shoot':
+            # 猎人死后仍可开枪
+            return self.pending_shot == action.player_id and self.is_alive(target)
+        if not self.is_alive(action.player_id):
+            return False
         if action_type == 'vote':
-            target = action.action_data.get('target')
-            return target in self.alive_players
+            return self.phase == VOTE and self.is_alive(target)
+        elif action_type == 'speak':
+            return self.phase == DISCUSSION
         elif action_type == 'use_ability':
             role = self.get_player_role(action.player_id)
             ability = action.action_data.get('ability')
-            return self.validate_ability(role, ability)
+            return self.validate_ability(role, ability) and self._ability_allowed(
+                action.player_id, ability, target)
         return False
 
     def validate_ability(self, role: str, ability: str) -> bool:
         # 验证角色能力使用是否合法
-        if role == 'werewolf':
+        if role == WEREWOLF:
             return ability == 'kill'
-        elif role == 'seer':
+        elif role == SEER:
             return ability == 'check'
-        elif role == 'witch':
+        elif role == WITCH:
             return ability in ['save', 'poison']
-        elif role == 'hunter':
+        elif role == HUNTER:
             return ability == 'shoot'
         return False
 
+    def _ability_allowed(self, player_id: str, ability: str, target: Optional[str]) -> bool:
+        """夜间技能的时机、次数与目标限制"""
+        if self.phase != NIGHT or not self.is_alive(target):
+            return False
+        if ability == 'check':
+            return not self.seer_checked_tonight and target != player_id
+        if ability in ('save', 'poison'):
+            # 每瓶药只能用一次，同一夜只能用一瓶
+            return self.potions[ability] and self.saved is None and self.poisoned is None
+        return True
+
     def apply_action(self, action: PlayerAction) -> GameState:
+        if not self.validate_action(action):
+            raise ValueError(f"Invalid action: {action.action_type} {action.action_data}")
+        self.log_action(action)
         action_type = action.action_type
-        if action_type == 'vote':
+        if action_type == 'advance':
+            self._advance_phase()
+        elif action_type == 'vote':
             self.handle_vote(action.player_id, action.action_data['target'])
+        elif action_type == 'speak':
+            self._emit(SPOKE, actor=action.player_id, data={'content': action.action_data.get('content', '')})
         elif action_type == 'use_ability':
             self.handle_ability(action.player_id, action.action_data)
         return self.get_game_state()
 
     def handle_vote(self, voter_id: str, target_id: str):
-        if voter_id not in self.votes:
-            self.votes[voter_id] = []
-        self.votes[voter_id].append(target_id)
+        # 改票时只调整两个目标的票数
+        self._emit(VOTED, actor=voter_id, target=target_id)
 
     def handle_ability(self, player_id: str, action_data: Dict):
         role = self.get_player_role(player_id)
         ability = action_data['ability']
-        
-        if role == 'werewolf' and ability == 'kill':
-            target = action_data['target']
-            self.dead_players.append(target)
-        elif role == 'seer' and ability == 'check':
-            target = action_data['target']
-            # 返回目标角色信息
-        elif role == 'witch' and ability == 'save':
-            target = action_data['target']
-            # 救人逻辑
-        elif role == 'witch' and ability == 'poison':
-            target = action_data['target']
-            self.dead_players.append(target)
-        elif role == 'hunter' and ability == 'shoot':
-            target = action_data['target']
-            self.dead_players.append(target)
+        target = action_data['target']
+
+        if role == WEREWOLF and ability == 'kill':
+            self._emit(KILL_CHOSEN, actor=player_id, target=target, audience=WOLVES)
+        elif role == SEER and ability == 'check':
+            # 查验结果只有预言家本人可见
+            self._emit(SEER_CHECKED, actor=player_id, target=target,
+                       data={'team': team_of(self.roles[target])}, audience=player_id)
+        elif role == WITCH and ability == 'save':
+            self._emit(WITCH_SAVED, actor=player_id, target=target, audience=player_id)
+        elif role == WITCH and ability == 'poison':
+            self._emit(WITCH_POISONED, actor=player_id, target=target, audience=player_id)
+        elif role == HUNTER and ability == 'shoot':
+            self._emit(HUNTER_SHOT, actor=player_id, target=target)
+            self._kill(target, 'shot')
+
+    async def collect_night_actions(self, ask: AskFunction,
+                                    timeout: float = NIGHT_DEADLINE) -> List[NightAction]:
+        """并发向夜间行动的玩家询问动作，超时或无效的回答使用默认动作"""
+        return await collect_night_actions(self, ask, timeout)
+
+    def night_target(self) -> Optional[str]:
+        """狼人当前的刀口：票数最多者，平票取最先被选的"""
+        if not self.kill_tally:
+            return None
+        target, count = self.kill_tally.most_common(1)[0]
+        return target if count > 0 else None
+
+    def advance_phase(self) -> str:
+        """结算当前阶段并进入下一阶段（作为主持人动作记入动作日志）"""
+        if self.phase == ENDED:
+            return self.phase
+        self.apply_action(PlayerAction(HOST, 'advance', {}))
+        return self.phase
+
+    def _advance_phase(self) -> str:
+        if self.phase == ENDED:
+            return self.phase
+        if self.phase == NIGHT:
+            self._emit(PHASE_STARTED, data={'phase': DAWN})
+            target, poisoned = self.night_target(), self.poisoned
+            if target is not None and target != self.saved:
+                self._kill(target, 'night')
+            if poisoned is not None and self.is_alive(poisoned):
+                # 被毒死的猎人不能开枪
+                self._kill(poisoned, 'night', can_shoot=False)
+        elif self.phase == VOTE:
+            self._emit(PHASE_STARTED, data={'phase': EXILE})
+            top = self.vote_tally.most_common(2)
+            # 平票无人出局
+            if top and top[0][1] > 0 and (len(top) == 1 or top[0][1] > top[1][1]):
+                self._emit(EXILED, target=top[0][0], data={'votes': top[0][1]})
+                self._kill(top[0][0], 'exile')
+        else:
+            self._emit(PHASE_STARTED, data={'phase': NEXT_PHASE[self.phase]})
+        return self.phase
+
+    def _kill(self, player_id: str, cause: str, can_shoot: bool = True):
+        if not self.is_alive(player_id):
+            return
+        self._emit(PLAYER_DIED, target=player_id, data={'cause': cause})
+        if can_shoot and self.roles[player_id] == HUNTER:
+            self._emit(SHOT_ALLOWED, target=player_id, audience=player_id)
+        self._check_winner()
+
+    def _check_winner(self):
+        if self.winner is not None:
+            return
+        wolves, villagers = self.team_counts[WOLF_TEAM], self.team_counts[VILLAGE_TEAM]
+        if wolves == 0:
+            self._emit(GAME_OVER, data={'winner': VILLAGE_TEAM})
+        elif wolves >= villagers:
+            self._emit(GAME_OVER, data={'winner': WOLF_TEAM})
 
     def get_player_role(self, player_id: str) -> str:
-        player_index = self.alive_players.index(player_id)
-        return self.roles[player_index]
+        return self.roles[player_id]
+
+    def get_player_view(self, player_id: str) -> PlayerView:
+        """该玩家能看到的信息：本人角色、阵营队友、查验结果与公开事件"""
+        return self.views.view(player_id)
+
+    def is_game_over(self) -> bool:
+        return self.phase == ENDED
+
+    def get_winner(self) -> Optional[str]:
+        return self.winner
 
     def get_game_state(self) -> GameState:
         return GameState(
@@ -123,9 +370,23 @@ class WerewolfEngine(GameEngineBase):
             players=self.players,
             current_turn=self.current_turn,
             board_state={
-                'phase': 'night' if self.night_phase else 'day',
-                'alive_players': self.alive_players,
-                'dead_players': self.dead_players
+                'phase': self.phase,
+                'day': self.day,
+                'alive_players': list(self.alive_players),
+                'dead_players': list(self.dead_players),
+                'votes': dict(self.vote_tally) if self.phase in (VOTE, EXILE) else {}
             },
-            history=self.history
+            history=self.history,
+            winner=self.winner
+        )
+
+    def initial_state(self) -> GameState:
+        """返回游戏的初始状态"""
+        return GameState(
+            game_id=self.game_id,
+            game_type=self.game_type,
+            players=self.players,
+            current_turn=None,
+            board_state={'phase': NIGHT, 'day': 1, 'alive_players': [], 'dead_players': [], 'votes': {}},
+            history=[]
         )
@@ -0,0 +1,66 @@
+"""Events, phases and roles of the Werewolf engine.
+
+The engine is event-sourced: every state change is an ``Event`` appended to
+the game's log and folded into the derived state by one handler per event
+kind. Replaying the log rebuilds the game exactly. Each event carries an
+``audience`` (everyone, the wolf team, or one player) so per-player views
+can be derived from the same log.
+"""
+from typing import Any, Dict, NamedTuple, Optional
+
+# 阶段：夜间行动 -> 天亮公布 -> 讨论 -> 投票 -> 放逐 -> 下一夜
+NIGHT = 'night'
+DAWN = 'dawn'
+DISCUSSION = 'discussion'
+VOTE = 'vote'
+EXILE = 'exile'
+ENDED = 'ended'
+NEXT_PHASE = {NIGHT: DAWN, DAWN: DISCUSSION, DISCUSSION: VOTE, VOTE: EXILE, EXILE: NIGHT}
+
+WEREWOLF = 'werewolf'
+SEER = 'seer'
+WITCH = 'witch'
+HUNTER = 'hunter'
+VILLAGER = 'villager'
+
+WOLF_TEAM = 'werewolves'
+VILLAGE_TEAM = 'villagers'
+
+# 事件类型
+ROLE_ASSIGNED = 'role_assigned'
+PHASE_STARTED = 'phase_started'
+KILL_CHOSEN = 'kill_chosen'
+SEER_CHECKED = 'seer_checked'
+WITCH_SAVED = 'witch_saved'
+WITCH_POISONED = 'witch_poisoned'
+PLAYER_DIED = 'player_died'
+SHOT_ALLOWED = 'shot_allowed'
+HUNTER_SHOT = 'hunter_shot'
+SPOKE = 'spoke'
+VOTED = 'voted'
+EXILED = 'exiled'
+GAME_OVER = 'game_over'
+
+# 事件可见范围：所有人、狼人阵营，或某个玩家的 id
+PUBLIC = '*'
+WOLVES = '@werewolves'
+
+HOST = 'host'  # 推进阶段的主持人
+
+
+def team_of(role: str) -> str:
+    return WOLF_TEAM if role == WEREWOLF else VILLAGE_TEAM
+
+
+class Event(NamedTuple):
+    seq: int
+    day: int
+    phase: str
+    kind: str
+    actor: Optional[str] = None
+    target: Optional[str] = None
+    data: Optional[Dict[str, Any]] = None
+    audience: str = PUBLIC
+
+    def to_dict(self) -> Dict[str, Any]:
+        return self._asdict()
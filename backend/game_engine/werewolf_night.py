@@ -0,0 +1,143 @@
+"""Concurrent collection of Werewolf night actions.
+
+All night roles are asked at once with ``asyncio.gather`` under a single
+phase deadline. The wolves and the seer are independent. The witch must be
+told the wolves' victim, so her request starts as soon as the last wolf has
+answered rather than after the whole night. The wolves only get the first
+two thirds of the night, so a stalled wolf cannot use up the witch's time.
+Answers that arrive late, raise, or fail ``validate_action`` are replaced
+by a default action, so a night always costs about one LLM round trip (two
+with a witch) and never blocks on a stalled player.
+
+Collected actions are applied in a fixed order (wolves that answered, by
+seat, then wolves on defaults, the witch and the seer), so the engine's
+action log, and therefore a replay, does not depend on which model
+answered first.
+"""
+import asyncio
+import random
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional
+
+from shared.protocol import PlayerAction
+from .werewolf_events import NIGHT, SEER, WEREWOLF, WITCH, WOLF_TEAM, team_of
+from .werewolf_views import PlayerView
+
+# 整个夜晚阶段的时限（秒）
+NIGHT_DEADLINE = 30.0
+# 狼人只能用掉夜晚时限的这一部分，其余留给要等刀口的女巫
+WOLF_SHARE = 2 / 3
+
+# ask(player_id, view, options) -> action_data；返回 None 表示放弃行动
+AskFunction = Callable[[str, PlayerView, List[Dict[str, Any]]], Awaitable[Optional[Dict[str, Any]]]]
+
+
+class NightAction(NamedTuple):
+    player_id: str
+    action: Optional[Dict[str, Any]]  # 实际执行的 action_data，None 为未行动
+    source: str  # 'player'、'timeout'、'invalid' 或 'error'
+
+
+def action_options(engine, player_id: str) -> List[Dict[str, Any]]:
+    """Legal night ``action_data`` for a player (the witch may also skip)"""
+    role = engine.get_player_role(player_id)
+    candidates = {WEREWOLF: ['kill'], SEER: ['check'], WITCH: ['save', 'poison']}.get(role, [])
+    options = []
+    for ability in candidates:
+        for target in engine.alive_players:
+            data = {'ability': ability, 'target': target}
+            if engine.validate_action(PlayerAction(player_id, 'use_ability', data)):
+                options.append(data)
+    return options
+
+
+def default_action(engine, player_id: str, options: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Fallback for a missing or invalid answer.
+
+    Wolves follow their team's current choice or pick a random non-wolf,
+    the seer checks a random unchecked player, the witch keeps her potions.
+    The random pick is seeded from the game seed so replays agree.
+    """
+    role = engine.get_player_role(player_id)
+    if role == WITCH or not options:
+        return None
+    rng = random.Random(f'{engine.seed}:{engine.day}:{player_id}')
+    if role == WEREWOLF:
+        target = engine.night_target()
+        if target is not None and {'ability': 'kill', 'target': target} in options:
+            return {'ability': 'kill', 'target': target}
+        options = [data for data in options
+                   if team_of(engine.get_player_role(data['target'])) != WOLF_TEAM] or options
+    elif role == SEER:
+        options = [data for data in options if data['target'] not in engine.checks] or options
+    return rng.choice(options)
+
+
+async def _ask(engine, ask: AskFunction, player_id: str, deadline: float) -> NightAction:
+    options = action_options(engine, player_id)
+    view = engine.get_player_view(player_id)
+    remaining = deadline - asyncio.get_running_loop().time()
+    try:
+        if remaining <= 0:
+            raise asyncio.TimeoutError
+        data = await asyncio.wait_for(ask(player_id, view, options), remaining)
+    except asyncio.TimeoutError:
+        engine.logger.warning(f"Night action of {player_id} timed out, using default")
+        return NightAction(player_id, None, 'timeout')
+    except Exception as e:
+        engine.logger.warning(f"Night action of {player_id} failed: {e}")
+        return NightAction(player_id, None, 'error')
+    if data is None and engine.get_player_role(player_id) == WITCH:
+        return NightAction(player_id, None, 'player')
+    if isinstance(data, dict) and data in options:
+        return NightAction(player_id, data, 'player')
+    engine.logger.warning(f"Invalid night action from {player_id}: {data}")
+    return NightAction(player_id, None, 'invalid')
+
+
+def _apply(engine, result: NightAction) -> NightAction:
+    """Apply an answer, substituting the default for missing or stale ones.
+
+    Defaults are chosen here rather than when the answer arrives, so a wolf
+    that timed out follows the kill its teammates have already chosen.
+    """
+    player_id, data, source = result
+    if data is not None and not engine.validate_action(PlayerAction(player_id, 'use_ability', data)):
+        # 同一夜先生效的动作可能让回答失效
+        data, source = None, 'invalid'
+    if source != 'player':
+        data = default_action(engine, player_id, action_options(engine, player_id))
+    if data is not None:
+        engine.apply_action(PlayerAction(player_id, 'use_ability', data))
+    return NightAction(player_id, data, source)
+
+
+async def collect_night_actions(engine, ask: AskFunction,
+                                timeout: float = NIGHT_DEADLINE) -> List[NightAction]:
+    """Ask every night role in parallel and apply their actions to ``engine``"""
+    if engine.phase != NIGHT:
+        raise ValueError(f"Night actions requested during {engine.phase}")
+    start = asyncio.get_running_loop().time()
+    deadline = start + timeout
+    wolf_deadline = start + timeout * WOLF_SHARE
+    actors = [player_id for player_id in engine.alive_players
+              if engine.get_player_role(player_id) in (WEREWOLF, SEER, WITCH)]
+    wolves = [player_id for player_id in actors if engine.get_player_role(player_id) == WEREWOLF]
+    seers = [player_id for player_id in actors if engine.get_player_role(player_id) == SEER]
+    witches = [player_id for player_id in actors if engine.get_player_role(player_id) == WITCH]
+
+    async def wolves_then_witch() -> List[NightAction]:
+        answers = await asyncio.gather(*(_ask(engine, ask, wolf, wolf_deadline) for wolf in wolves))
+        # 先执行有效回答，超时或无效的狼人再跟随队友的刀口
+        answers = sorted(answers, key=lambda answer: answer.source != 'player')
+        # 刀口确定后女巫才能得知被杀者
+        results = [_apply(engine, answer) for answer in answers]
+        for witch in witches:
+            results.append(_apply(engine, await _ask(engine, ask, witch, deadline)))
+        return results
+
+    wolf_results, seer_results = await asyncio.gather(
+        wolves_then_witch(),
+        asyncio.gather(*(_ask(engine, ask, seer, deadline) for seer in seers)))
+    results = wolf_results + [_apply(engine, answer) for answer in seer_results]
+    order = {player_id: index for index, player_id in enumerate(actors)}
+    return sorted(results, key=lambda result: order[result.player_id])
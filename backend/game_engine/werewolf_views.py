@@ -0,0 +1,131 @@
+"""Per-player information-set views of a Werewolf game.
+
+A player's view is assembled from up to three segments: the public one
+(phase, alive/dead players, public events), the wolf team's one (teammates,
+tonight's kill choices) and a private one (own role, seer results, potions,
+tonight's victim for the witch). Segments are built lazily and cached; an
+event only drops the segments its audience (and, for a few event kinds, the
+roles that depend on it) can see. Players who know exactly the same things
+share a segment: every villager reads the same private segment, every wolf
+the same team segment, and everybody the same public one.
+"""
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from .werewolf_events import (
+    HUNTER, KILL_CHOSEN, HUNTER_SHOT, NIGHT, PHASE_STARTED, PUBLIC, SEER, SEER_CHECKED, VILLAGER,
+    VOTE, EXILE, WEREWOLF, WITCH, WOLVES, Event, team_of,
+)
+
+# 除了可见范围内的事件，这些事件还会影响某些角色的私有信息
+ROLE_DEPENDENCIES: Dict[str, Tuple[str, ...]] = {
+    KILL_CHOSEN: (WITCH,),  # 女巫夜里能看到刀口
+    PHASE_STARTED: (WOLVES, WITCH, HUNTER),  # 换阶段清空刀口、开枪机会
+    HUNTER_SHOT: (HUNTER,),
+}
+
+
+class PlayerView(NamedTuple):
+    player_id: str
+    public: Dict[str, Any]
+    team: Optional[Dict[str, Any]]  # 仅狼人有
+    private: Dict[str, Any]
+
+    @property
+    def role(self) -> str:
+        return self.private['role']
+
+    def events(self) -> List[Event]:
+        """Events this player has seen, in order"""
+        events = list(self.public['events']) + list(self.private['events'])
+        if self.team:
+            events += self.team['events']
+        return sorted(events, key=lambda event: event.seq)
+
+    def to_dict(self) -> Dict[str, Any]:
+        view = {'player_id': self.player_id}
+        view.update((key, value) for key, value in self.public.items() if key != 'events')
+        if self.team:
+            view.update((key, value) for key, value in self.team.items() if key != 'events')
+        view.update((key, value) for key, value in self.private.items() if key != 'events')
+        view['events'] = [event.to_dict() for event in self.events()]
+        return view
+
+
+class ViewCache:
+    """Lazily built, event-invalidated segments shared between players' views"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.reset()
+
+    def reset(self) -> None:
+        self.audience_events: Dict[str, List[Event]] = {}
+        self.segments: Dict[str, Dict[str, Any]] = {}
+
+    def segment_key(self, player_id: str) -> str:
+        """同一信息集的玩家共用私有段：村民之间、狼人之间的私有信息没有差别"""
+        role = self.engine.roles.get(player_id)
+        return role if role in (VILLAGER, WEREWOLF) else player_id
+
+    def on_event(self, event: Event) -> None:
+        audience = event.audience
+        self.audience_events.setdefault(audience, []).append(event)
+        self.segments.pop(audience, None)
+        for role in ROLE_DEPENDENCIES.get(event.kind, ()):
+            if role == WOLVES:
+                self.segments.pop(WOLVES, None)
+                continue
+            for player_id, player_role in self.engine.roles.items():
+                if player_role == role:
+                    self.segments.pop(player_id, None)
+
+    def view(self, player_id: str) -> PlayerView:
+        role = self.engine.get_player_role(player_id)
+        team = self._segment(WOLVES, self._build_team) if role == WEREWOLF else None
+        key = self.segment_key(player_id)
+        private = self._segment(key, lambda: self._build_private(player_id, role))
+        return PlayerView(player_id, self._segment(PUBLIC, self._build_public), team, private)
+
+    def _segment(self, key: str, build) -> Dict[str, Any]:
+        segment = self.segments.get(key)
+        if segment is None:
+            segment = self.segments[key] = build()
+        return segment
+
+    def _events(self, audience: str) -> Tuple[Event, ...]:
+        return tuple(self.audience_events.get(audience, ()))
+
+    def _build_public(self) -> Dict[str, Any]:
+        engine = self.engine
+        return {
+            'day': engine.day,
+            'phase': engine.phase,
+            'alive_players': list(engine.alive_players),
+            'dead_players': list(engine.dead_players),
+            'votes': dict(engine.vote_tally) if engine.phase in (VOTE, EXILE) else {},
+            'winner': engine.winner,
+            'events': self._events(PUBLIC),
+        }
+
+    def _build_team(self) -> Dict[str, Any]:
+        engine = self.engine
+        return {
+            'teammates': [player_id for player_id, role in engine.roles.items() if role == WEREWOLF],
+            'kill_choices': dict(engine.kill_choices),
+            'events': self._events(WOLVES),
+        }
+
+    def _build_private(self, player_id: str, role: str) -> Dict[str, Any]:
+        engine = self.engine
+        if role in (VILLAGER, WEREWOLF):
+            return {'role': role, 'team': team_of(role), 'events': ()}
+        private = {'role': role, 'team': team_of(role), 'events': self._events(player_id)}
+        if role == SEER:
+            private['checks'] = {event.target: event.data['team'] for event in private['events']
+                                 if event.kind == SEER_CHECKED}
+        elif role == WITCH:
+            private['potions'] = dict(engine.potions)
+            private['night_victim'] = engine.night_target() if engine.phase == NIGHT else None
+        elif role == HUNTER:
+            private['can_shoot'] = engine.pending_shot == player_id
+        return private
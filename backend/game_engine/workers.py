@@ -0,0 +1,50 @@
+"""Process pool for CPU-bound engine work (search, solvers, simulations).
+
+Pure-Python search holds the GIL, so running it in a thread would still
+stall the FastAPI event loop. Jobs submitted here run in worker processes
+and must be picklable module-level functions that enforce their own time
+limits; ``timeout`` is only a safety net for the awaiting coroutine.
+"""
+import asyncio
+import functools
+import logging
+import os
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+_executor: Optional[ProcessPoolExecutor] = None
+# 已提交但还没结束的任务，关闭时取消排队中的那些
+_pending: Set[Future] = set()
+
+
+def get_executor() -> ProcessPoolExecutor:
+    """Return the shared process pool, creating it on first use"""
+    global _executor
+    if _executor is None:
+        max_workers = int(os.getenv('ENGINE_WORKERS', '0')) or None
+        _executor = ProcessPoolExecutor(max_workers=max_workers)
+        logger.info(f"Started engine worker pool ({_executor._max_workers} workers)")
+    return _executor
+
+
+async def run_in_worker(func: Callable[..., Any], *args: Any,
+                        timeout: Optional[float] = None, **kwargs: Any) -> Any:
+    """Run ``func(*args, **kwargs)`` in the worker pool without blocking the event loop"""
+    future = get_executor().submit(functools.partial(func, *args, **kwargs))
+    _pending.add(future)
+    future.add_done_callback(_pending.discard)
+    return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+
+
+def shutdown_workers() -> None:
+    """Stop the worker pool; queued jobs are cancelled, running ones finish on their own limits"""
+    global _executor
+    if _executor is not None:
+        # ProcessPoolExecutor.shutdown 在 3.9 之前没有 cancel_futures
+        for future in list(_pending):
+            future.cancel()
+        _executor.shutdown(wait=False)
+        _executor = None
+        logger.info("Stopped engine worker pool")
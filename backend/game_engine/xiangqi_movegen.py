@@ -0,0 +1,423 @@
+"""Xiangqi move generation for CNChessEngine.
+
+The board is a flat 90-cell list indexed ``row * 9 + col`` with the same
+(row, col) layout as ``CNChessEngine.board``: red (``PlayerColor.WHITE``)
+starts on rows 0-4 and black on rows 5-9. Every per-square move, leg and
+eye square is precomputed once at import, so generating moves is a walk
+over short tables instead of coordinate arithmetic and bounds checks.
+
+Moves are packed into ints: ``from | to << 7``.
+"""
+import random
+from typing import Dict, List, Tuple
+
+from .zobrist import ZOBRIST_SEED, random_keys
+
+RED, BLACK = 0, 1
+ROWS, COLS = 10, 9
+SQUARES = ROWS * COLS
+
+# 棋子种类编号，棋子索引 = color * 7 + kind
+GENERAL, ADVISOR, ELEPHANT, HORSE, CHARIOT, CANNON, SOLDIER = range(7)
+PIECE_CHARS = '帥仕相傌俥炮兵將士象馬車砲卒'
+CHAR_INDEX = {c: i for i, c in enumerate(PIECE_CHARS)}
+# FEN 字母：大写为红方，小写为黑方（兼容 G/E/H 写法）
+FEN_CHARS = 'KABNRCPkabnrcp'
+FEN_INDEX = {c: i for i, c in enumerate(FEN_CHARS)}
+FEN_INDEX.update({'G': GENERAL, 'E': ELEPHANT, 'H': HORSE,
+                  'g': 7 + GENERAL, 'e': 7 + ELEPHANT, 'h': 7 + HORSE})
+
+START_FEN = 'rnbakabnr/9/1c5c1/p1p1p1p1p/9/9/P1P1P1P1P/1C5C1/9/RNBAKABNR w - - 0 1'
+
+
+def square(row: int, col: int) -> int:
+    return row * COLS + col
+
+
+def square_to_coords(sq: int) -> Tuple[int, int]:
+    return divmod(sq, COLS)
+
+
+def square_name(sq: int) -> str:
+    """ICCS 记法：列 a-i，红方底线为 0"""
+    row, col = square_to_coords(sq)
+    return 'abcdefghi'[col] + str(row)
+
+
+def encode_move(from_sq: int, to_sq: int) -> int:
+    return from_sq | (to_sq << 7)
+
+
+def move_to_iccs(move: int) -> str:
+    return square_name(move & 127) + square_name(move >> 7)
+
+
+def _on_board(row: int, col: int) -> bool:
+    return 0 <= row < ROWS and 0 <= col < COLS
+
+
+def _in_palace(row: int, col: int) -> bool:
+    return _on_board(row, col) and 3 <= col <= 5 and (row <= 2 or row >= 7)
+
+
+def _home_side(row: int) -> int:
+    return RED if row <= 4 else BLACK
+
+
+def _build_tables():
+    general, advisor, elephant, horse = [], [], [], []
+    rays = []
+    soldier = [[], []]
+    for sq in range(SQUARES):
+        row, col = square_to_coords(sq)
+
+        # 将帅：九宫内直走一步
+        general.append([square(row + dr, col + dc)
+                        for dr, dc in ((-1, 0), (1, 0), (0, -1), (0, 1))
+                        if _in_palace(row, col) and _in_palace(row + dr, col + dc)
+                        and _home_side(row + dr) == _home_side(row)])
+        # 士：九宫内斜走一步
+        advisor.append([square(row + dr, col + dc)
+                        for dr, dc in ((-1, -1), (-1, 1), (1, -1), (1, 1))
+                        if _in_palace(row, col) and _in_palace(row + dr, col + dc)
+                        and _home_side(row + dr) == _home_side(row)])
+        # 相/象：走田字，不能过河，(目标, 象眼)
+        elephant.append([(square(row + dr, col + dc), square(row + dr // 2, col + dc // 2))
+                         for dr, dc in ((-2, -2), (-2, 2), (2, -2), (2, 2))
+                         if _on_board(row + dr, col + dc)
+                         and _home_side(row + dr) == _home_side(row)])
+        # 马：走日字，(目标, 马腿)
+        horse.append([(square(row + dr, col + dc), square(row + lr, col + lc))
+                      for dr, dc, lr, lc in ((-2, -1, -1, 0), (-2, 1, -1, 0), (2, -1, 1, 0),
+                                             (2, 1, 1, 0), (-1, -2, 0, -1), (1, -2, 0, -1),
+                                             (-1, 2, 0, 1), (1, 2, 0, 1))
+                      if _on_board(row + dr, col + dc)])
+        # 车/炮/飞将：四个方向由近到远的格子；前两个方向为纵向
+        square_rays = []
+        for dr, dc in ((-1, 0), (1, 0), (0, -1), (0, 1)):
+            ray = []
+            r, c = row + dr, col + dc
+            while _on_board(r, c):
+                ray.append(square(r, c))
+                r, c = r + dr, c + dc
+            square_rays.append(ray)
+        rays.append(square_rays)
+        # 兵/卒：向前一步，过河后可横走
+        for color, forward, crossed in ((RED, 1, row >= 5), (BLACK, -1, row <= 4)):
+            targets = []
+            if _on_board(row + forward, col):
+                targets.append(square(row + forward, col))
+            if crossed:
+                targets += [square(row, col + dc) for dc in (-1, 1) if _on_board(row, col + dc)]
+            soldier[color].append(targets)
+
+    # 反查表：哪些格子上的马/兵能攻击 sq，用于判断将军
+    horse_checks = [[] for _ in range(SQUARES)]
+    for from_sq in range(SQUARES):
+        for to_sq, leg in horse[from_sq]:
+            horse_checks[to_sq].append((from_sq, leg))
+    soldier_checks = [[[] for _ in range(SQUARES)] for _ in range(2)]
+    for color in (RED, BLACK):
+        for from_sq in range(SQUARES):
+            for to_sq in soldier[color][from_sq]:
+                soldier_checks[color][to_sq].append(from_sq)
+    return general, advisor, elephant, horse, rays, soldier, horse_checks, soldier_checks
+
+
+(GENERAL_MOVES, ADVISOR_MOVES, ELEPHANT_MOVES, HORSE_MOVES, RAYS,
+ SOLDIER_MOVES, HORSE_CHECKS, SOLDIER_CHECKS) = _build_tables()
+
+_zobrist_rng = random.Random(ZOBRIST_SEED + 1)
+ZOBRIST_PIECES = [random_keys(SQUARES, _zobrist_rng) for _ in range(14)]
+ZOBRIST_SIDE = _zobrist_rng.getrandbits(64)
+
+
+class XiangqiPosition:
+    """Flat-array xiangqi position with legal move generation and make/unmake"""
+
+    def __init__(self):
+        self.board: List[int] = [-1] * SQUARES
+        self.side = RED
+        self.generals = [-1, -1]
+        self.key = 0
+
+    @classmethod
+    def from_board(cls, board: List[List[str]], side: int) -> 'XiangqiPosition':
+        """Build a position from CNChessEngine's ``List[List[str]]`` board"""
+        position = cls()
+        for row in range(ROWS):
+            for col in range(COLS):
+                ch = board[row][col]
+                if ch:
+                    position._put(CHAR_INDEX[ch], square(row, col))
+        position.side = side
+        position.key = position.compute_key()
+        return position
+
+    @classmethod
+    def from_fen(cls, fen: str = START_FEN) -> 'XiangqiPosition':
+        """Parse a standard xiangqi FEN (black on the first rank listed, red to move as 'w'/'r')"""
+        fields = fen.split()
+        position = cls()
+        for fen_row, rank in enumerate(fields[0].split('/')):
+            row = ROWS - 1 - fen_row
+            col = 0
+            for ch in rank:
+                if ch.isdigit():
+                    col += int(ch)
+                else:
+                    position._put(FEN_INDEX[ch], square(row, col))
+                    col += 1
+        position.side = BLACK if len(fields) > 1 and fields[1] == 'b' else RED
+        position.key = position.compute_key()
+        return position
+
+    def fen(self) -> str:
+        ranks = []
+        for row in range(ROWS - 1, -1, -1):
+            rank, empty = '', 0
+            for col in range(COLS):
+                piece = self.board[square(row, col)]
+                if piece < 0:
+                    empty += 1
+                    continue
+                if empty:
+                    rank += str(empty)
+                    empty = 0
+                rank += FEN_CHARS[piece]
+            ranks.append(rank + (str(empty) if empty else ''))
+        return f"{'/'.join(ranks)} {'wb'[self.side]} - - 0 1"
+
+    def to_board(self) -> List[List[str]]:
+        return [[PIECE_CHARS[p] if p >= 0 else '' for p in self.board[row * COLS:(row + 1) * COLS]]
+                for row in range(ROWS)]
+
+    def compute_key(self) -> int:
+        key = 0
+        for sq, piece in enumerate(self.board):
+            if piece >= 0:
+                key ^= ZOBRIST_PIECES[piece][sq]
+        return key ^ ZOBRIST_SIDE if self.side == BLACK else key
+
+    def _put(self, piece: int, sq: int) -> None:
+        self.board[sq] = piece
+        if piece % 7 == GENERAL:
+            self.generals[piece // 7] = sq
+
+    def is_general_attacked(self, color: int) -> bool:
+        """Whether ``color``'s general is attacked, including by the facing enemy general"""
+        board = self.board
+        sq = self.generals[color]
+        if sq < 0:
+            return True
+        enemy = (color ^ 1) * 7
+        chariot, cannon = enemy + CHARIOT, enemy + CANNON
+        horse, soldier = enemy + HORSE, enemy + SOLDIER
+        for direction, ray in enumerate(RAYS[sq]):
+            screened = False
+            for to_sq in ray:
+                piece = board[to_sq]
+                if piece < 0:
+                    continue
+                if screened:
+                    if piece == cannon:
+                        return True
+                    break
+                if piece == chariot or (piece == enemy + GENERAL and direction < 2):
+                    return True
+                screened = True
+        for from_sq, leg in HORSE_CHECKS[sq]:
+            if board[from_sq] == horse and board[leg] < 0:
+                return True
+        for from_sq in SOLDIER_CHECKS[color ^ 1][sq]:
+            if board[from_sq] == soldier:
+                return True
+        return False
+
+    def in_check(self, color: int = None) -> bool:
+        return self.is_general_attacked(self.side if color is None else color)
+
+    def is_square_defended(self, sq: int, color: int) -> bool:
+        """Whether a ``color`` piece could recapture on ``sq`` (pins are ignored)"""
+        board = self.board
+        base = color * 7
+        for ray in RAYS[sq]:
+            screened = False
+            for from_sq in ray:
+                piece = board[from_sq]
+                if piece < 0:
+                    continue
+                if screened:
+                    if piece == base + CANNON:
+                        return True
+                    break
+                if piece == base + CHARIOT:
+                    return True
+                screened = True
+        for from_sq, leg in HORSE_CHECKS[sq]:
+            if board[from_sq] == base + HORSE and board[leg] < 0:
+                return True
+        for from_sq in SOLDIER_CHECKS[color][sq]:
+            if board[from_sq] == base + SOLDIER:
+                return True
+        # 将、士、相的走法表是对称的，可以直接反查
+        for from_sq in GENERAL_MOVES[sq]:
+            if board[from_sq] == base + GENERAL:
+                return True
+        for from_sq in ADVISOR_MOVES[sq]:
+            if board[from_sq] == base + ADVISOR:
+                return True
+        for from_sq, eye in ELEPHANT_MOVES[sq]:
+            if board[from_sq] == base + ELEPHANT and board[eye] < 0:
+                return True
+        return False
+
+    def chased_squares(self, sq: int) -> frozenset:
+        """Enemy pieces the piece on ``sq`` threatens to win.
+
+        A threatened piece counts when it is undefended, or when it is a
+        chariot attacked by a lesser piece. Generals and soldiers that have
+        not crossed the river are never chased.
+        """
+        board = self.board
+        piece = board[sq]
+        if piece < 0:
+            return frozenset()
+        enemy = (piece // 7) ^ 1
+        chased = []
+        for move in self.piece_moves(sq):
+            to_sq = move >> 7
+            target = board[to_sq]
+            if target < 0:
+                continue
+            kind = target % 7
+            if kind == GENERAL:
+                continue
+            if kind == SOLDIER and (to_sq // COLS <= 4) == (enemy == RED):
+                continue
+            if kind == CHARIOT and piece % 7 != CHARIOT:
+                chased.append(to_sq)
+                continue
+            if not self.is_square_defended(to_sq, enemy):
+                chased.append(to_sq)
+        return frozenset(chased)
+
+    def pseudo_legal_moves(self) -> List[int]:
+        board = self.board
+        low, high = self.side * 7, self.side * 7 + 6
+        moves = []
+        append = moves.append
+        generate = self._generate_piece_moves
+        for sq, piece in enumerate(board):
+            if low <= piece <= high:
+                generate(sq, piece, append)
+        return moves
+
+    def piece_moves(self, sq: int) -> List[int]:
+        """Pseudo-legal moves of whichever piece stands on ``sq``"""
+        moves = []
+        if self.board[sq] >= 0:
+            self._generate_piece_moves(sq, self.board[sq], moves.append)
+        return moves
+
+    def _generate_piece_moves(self, sq: int, piece: int, append) -> None:
+        board = self.board
+        color = piece // 7
+        low, high = color * 7, color * 7 + 6
+        kind = piece - low
+        if kind == CHARIOT:
+            for ray in RAYS[sq]:
+                for to_sq in ray:
+                    target = board[to_sq]
+                    if target < 0:
+                        append(sq | (to_sq << 7))
+                        continue
+                    if target < low or target > high:
+                        append(sq | (to_sq << 7))
+                    break
+        elif kind == CANNON:
+            for ray in RAYS[sq]:
+                screened = False
+                for to_sq in ray:
+                    target = board[to_sq]
+                    if not screened:
+                        if target < 0:
+                            append(sq | (to_sq << 7))
+                        else:
+                            screened = True
+                    elif target >= 0:
+                        # 炮隔一子吃子
+                        if target < low or target > high:
+                            append(sq | (to_sq << 7))
+                        break
+        elif kind == HORSE:
+            for to_sq, leg in HORSE_MOVES[sq]:
+                target = board[to_sq]
+                if board[leg] < 0 and (target < low or target > high):
+                    append(sq | (to_sq << 7))
+        elif kind == ELEPHANT:
+            for to_sq, eye in ELEPHANT_MOVES[sq]:
+                target = board[to_sq]
+                if board[eye] < 0 and (target < low or target > high):
+                    append(sq | (to_sq << 7))
+        else:
+            if kind == SOLDIER:
+                targets = SOLDIER_MOVES[color][sq]
+            elif kind == ADVISOR:
+                targets = ADVISOR_MOVES[sq]
+            else:
+                targets = GENERAL_MOVES[sq]
+            for to_sq in targets:
+                target = board[to_sq]
+                if target < low or target > high:
+                    append(sq | (to_sq << 7))
+
+    def legal_moves(self) -> List[int]:
+        us = self.side
+        legal = []
+        for move in self.pseudo_legal_moves():
+            undo = self.make_move(move)
+            if not self.is_general_attacked(us):
+                legal.append(move)
+            self.unmake_move(move, undo)
+        return legal
+
+    def make_move(self, move: int) -> tuple:
+        """Play ``move`` and return the record needed by ``unmake_move``"""
+        from_sq = move & 127
+        to_sq = move >> 7
+        board = self.board
+        piece = board[from_sq]
+        captured = board[to_sq]
+        undo = (captured, self.key)
+        key = self.key ^ ZOBRIST_SIDE ^ ZOBRIST_PIECES[piece][from_sq] ^ ZOBRIST_PIECES[piece][to_sq]
+        if captured >= 0:
+            key ^= ZOBRIST_PIECES[captured][to_sq]
+            if captured % 7 == GENERAL:
+                self.generals[captured // 7] = -1
+        board[from_sq] = -1
+        board[to_sq] = piece
+        if piece % 7 == GENERAL:
+            self.generals[piece // 7] = to_sq
+        self.key = key
+        self.side ^= 1
+        return undo
+
+    def unmake_move(self, move: int, undo: tuple) -> None:
+        from_sq = move & 127
+        to_sq = move >> 7
+        board = self.board
+        captured, self.key = undo
+        piece = board[to_sq]
+        board[from_sq] = piece
+        board[to_sq] = captured
+        if piece % 7 == GENERAL:
+            self.generals[piece // 7] = from_sq
+        if captured >= 0 and captured % 7 == GENERAL:
+            self.generals[captured // 7] = to_sq
+        self.side ^= 1
+
+
+def legal_move_map(position: XiangqiPosition) -> Dict[Tuple[int, int], int]:
+    """Map (from, to) keys to packed legal moves"""
+    return {(move & 127, move >> 7): move for move in position.legal_moves()}
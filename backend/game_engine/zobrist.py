@@ -0,0 +1,79 @@
+"""Zobrist hashing helpers shared by the board game engines."""
+import random
+from collections import Counter, OrderedDict
+from typing import Any, List, Optional
+
+ZOBRIST_SEED = 0x5EED
+
+
+def random_keys(count: int, rng: random.Random) -> List[int]:
+    """Generate ``count`` random 64-bit keys"""
+    return [rng.getrandbits(64) for _ in range(count)]
+
+
+class PositionCache:
+    """Bounded LRU mapping from a Zobrist key to a cached result.
+
+    Used for legal-move lists and evaluation results so that revisited
+    positions (transpositions, repetitions, takebacks) cost a dict lookup.
+    """
+
+    def __init__(self, maxsize: int = 4096):
+        self.maxsize = maxsize
+        self._data: 'OrderedDict[int, Any]' = OrderedDict()
+
+    def get(self, key: int) -> Optional[Any]:
+        value = self._data.get(key)
+        if value is not None:
+            self._data.move_to_end(key)
+        return value
+
+    def put(self, key: int, value: Any) -> None:
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __contains__(self, key: int) -> bool:
+        return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class RepetitionTracker:
+    """Occurrence counts of position keys since the last irreversible move"""
+
+    def __init__(self):
+        self.counts: Counter = Counter()
+
+    def push(self, key: int) -> int:
+        """Record an occurrence of ``key`` and return how often it has occurred"""
+        self.counts[key] += 1
+        return self.counts[key]
+
+    def pop(self, key: int) -> None:
+        """Forget one occurrence of ``key`` (used when a move is taken back)"""
+        self.counts[key] -= 1
+        if self.counts[key] <= 0:
+            del self.counts[key]
+
+    def count(self, key: int) -> int:
+        return self.counts.get(key, 0)
+
+    def reset(self, key: Optional[int] = None) -> Counter:
+        """Drop all earlier positions, optionally seeding with the current one.
+
+        Returns the dropped counts so that an undo can ``restore`` them.
+        """
+        previous = self.counts
+        self.counts = Counter()
+        if key is not None:
+            self.counts[key] = 1
+        return previous
+
+    def restore(self, counts: Counter) -> None:
+        self.counts = counts
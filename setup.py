@@ -10,6 +10,7 @@ setup(
         "sqlalchemy",
         "pydantic",
         "psutil",
+        "numpy",
     ],
     python_requires=">=3.8",
 )
@@ -6,9 +6,10 @@ class GameType(Enum):
     CHESS = "chess"  # 国际象棋
     GO = "go"  # 围棋
     CHINESE_CHESS = "chinese_chess"  # 中国象棋
-    POKER = "poker"  # 斗地主
+    POKER = "poker"  # 德州扑克
     GOMOKU = "gomoku"  # 五子棋
     WEREWOLF = "werewolf"  # 狼人杀
+    DOUDIZHU = "doudizhu"  # 斗地主
 
 class PlayerColor(Enum):
     WHITE = "white"
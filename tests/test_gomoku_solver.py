@@ -0,0 +1,25 @@
+import pytest
+
+from backend.game_engine.gomoku_solver import BLACK, MISSED_WIN, WHITE, ThreatSpaceSolver, annotate_moves
+
+# 黑方在第 7 行连成五，五连一端被白子挡住
+FIVE_GAME = [(7, 0), (7, 5), (7, 1), (0, 14), (7, 2), (14, 0), (7, 3), (14, 14), (7, 4)]
+
+
+def _stones(moves):
+    return [(x, y, BLACK if ply % 2 == 0 else WHITE) for ply, (x, y) in enumerate(moves)]
+
+
+@pytest.mark.parametrize('renju', [False, True])
+def test_made_five_counts_as_won(renju):
+    solver = ThreatSpaceSolver(renju=renju)
+    solver.set_position(_stones(FIVE_GAME))
+    assert solver.solve(BLACK, WHITE).winning
+    assert solver.solve(BLACK, BLACK).winning
+
+
+@pytest.mark.parametrize('renju', [False, True])
+def test_winning_move_is_not_a_missed_win(renju):
+    last = annotate_moves(FIVE_GAME, renju=renju)[-1]
+    assert last['winning_move'] == {'x': 7, 'y': 4}
+    assert MISSED_WIN not in last['annotations']